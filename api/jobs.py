@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the report job queue has no room for another job."""
+
+
+class JobStore:
+    """SQLite-backed store for report jobs, so finished work survives restarts."""
+
+    def __init__(self, path: str = "./report_jobs.db"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS report_jobs (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT,
+                    company TEXT NOT NULL,
+                    condition TEXT,
+                    phases TEXT,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    stage_timings TEXT NOT NULL DEFAULT '{}',
+                    report TEXT,
+                    collection_id TEXT,
+                    cache_status TEXT,
+                    error TEXT
+                )
+                """
+            )
+            # Databases created before cache_status was recorded
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(report_jobs)")}
+            if "cache_status" not in columns:
+                self._conn.execute("ALTER TABLE report_jobs ADD COLUMN cache_status TEXT")
+
+    def create(self, company: str, condition: str = None, phases: list = None,
+               user_id: str = None) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO report_jobs (id, user_id, company, condition, phases, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, user_id, company, condition, json.dumps(phases), QUEUED, time.time()),
+            )
+        return job_id
+
+    def mark_running(self, job_id: str) -> None:
+        self._update(job_id, status=RUNNING, started_at=time.time())
+
+    def record_stage_timings(self, job_id: str, stage_timings: dict) -> None:
+        self._update(job_id, stage_timings=json.dumps(stage_timings))
+
+    def complete(self, job_id: str, report: str, collection_id: str, cache_status: str = None) -> None:
+        self._update(job_id, status=SUCCEEDED, finished_at=time.time(),
+                     report=report, collection_id=collection_id, cache_status=cache_status)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._update(job_id, status=FAILED, finished_at=time.time(), error=error)
+
+    def fail_unfinished(self, error: str = "Interrupted by server restart") -> int:
+        """Mark jobs left queued or running by a previous process as failed."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE report_jobs SET status = ?, finished_at = ?, error = ? WHERE status IN (?, ?)",
+                (FAILED, time.time(), error, QUEUED, RUNNING),
+            )
+        return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["phases"] = json.loads(job["phases"]) if job["phases"] else None
+        job["stage_timings"] = json.loads(job["stage_timings"])
+        return job
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _update(self, job_id: str, **fields) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE report_jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+
+
+class ReportJobQueue:
+    """Bounded queue plus a fixed pool of asyncio workers running report builds.
+
+    Jobs go through ``ReportBuilder.build_report``, so identical concurrent jobs
+    share one build.
+
+    Must be started and fed from the event loop that owns the builder's clients.
+    Store writes go through one writer thread, in order, so sqlite commits never
+    block that loop.
+    """
+
+    def __init__(self, builder, store: JobStore, workers: int = 2, max_pending: int = 50):
+        self._builder = builder
+        self._store = store
+        self._workers = workers
+        self._max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._writer: Optional[ThreadPoolExecutor] = None
+
+    async def start(self) -> None:
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-jobs")
+        interrupted = await self._write(self._store.fail_unfinished)
+        if interrupted:
+            logger.warning("Marked %d unfinished report jobs as failed", interrupted)
+        self._queue = asyncio.Queue(maxsize=self._max_pending)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self._workers)]
+
+    async def submit(self, company: str, condition: str = None, phases: list = None,
+                     user_id: str = None) -> str:
+        if self._queue.full():
+            raise QueueFullError("Report queue is full")
+        job_id = await self._write(self._store.create, company, condition, phases, user_id)
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            # Filled up by other submits while this job was being written
+            await self._write(self._store.fail, job_id, "Report queue is full")
+            raise QueueFullError("Report queue is full") from None
+        return job_id
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._writer is not None:
+            # Let queued writes land before the store is closed
+            await asyncio.to_thread(self._writer.shutdown)
+            self._writer = None
+
+    def _write(self, method, *args) -> asyncio.Future:
+        """Run a store call on the writer thread, ordered after every call queued before it."""
+        return asyncio.wrap_future(self._writer.submit(method, *args))
+
+    def _write_later(self, method, *args) -> None:
+        """Queue a store write without waiting for it, e.g. from a synchronous callback."""
+        self._writer.submit(method, *args).add_done_callback(self._log_write_failure)
+
+    @staticmethod
+    def _log_write_failure(future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning("Report job store write failed: %s", future.exception())
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await self._write(self._store.get, job_id)
+        await self._write(self._store.mark_running, job_id)
+        stage_timings = {}
+        last = time.monotonic()
+        result = {}
+
+        def record(event: dict) -> None:
+            nonlocal last
+            now = time.monotonic()
+            stage_timings[event["stage"]] = round(now - last, 3)
+            last = now
+            self._write_later(self._store.record_stage_timings, job_id, dict(stage_timings))
+            if event["stage"] == "done":
+                result.update(event)
+
+        try:
+            report = await self._builder.build_report(
+                job["company"], condition=job["condition"], phases=job["phases"], on_event=record,
+            )
+            await self._write(
+                self._store.complete, job_id, report, result.get("collection_id"), result.get("cache_status"),
+            )
+        except asyncio.CancelledError:
+            self._write_later(self._store.fail, job_id, "Cancelled")
+            raise
+        except Exception:
+            logger.exception("Report job %s failed for company=%s", job_id, job["company"])
+            await self._write(self._store.fail, job_id, "Report generation failed. Please try again.")
@@ -1,10 +1,13 @@
 import asyncio
+import json
 import threading
 import os
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, field_validator
 from typing import Optional, List
 from dotenv import load_dotenv
 
@@ -13,20 +16,70 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from api.dependencies import verify_jwt
-from src.api.clinical_trials import ClinicalTrialsClient
+from api.jobs import JobStore, QueueFullError, ReportJobQueue
+from src.api.clinical_trials import ClinicalTrialsClient, phase_codes
 from src.api.fda import FDAClient
+from src.api.http_cache import HTTPCache
+from src.api.market_data import MarketDataService
 from src.api.sec_edgar import SECEdgarClient
+from src.api.transport import shared_pool, transport_metrics
 from src.ingestion.chunker import Chunker
 from src.ingestion.embedder import Embedder
 from src.rag.retriever import Retriever
 from src.rag.generator import Generator
 from src.report.builder import ReportBuilder
+from src.report.cache import ReportCache
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Pharma DD API")
+
+
+# Created at startup, so importing the module opens no databases or connections
+builder: Optional[ReportBuilder] = None
+job_store: Optional[JobStore] = None
+job_queue: Optional[ReportJobQueue] = None
+
+
+def _on_background_loop(coro):
+    """Await ``coro`` running on the background loop that owns the clients."""
+    return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _BACKGROUND_LOOP))
+
+
+def _log_warmup_failure(future) -> None:
+    """Done-callback for fire-and-forget warm-ups, whose exceptions would otherwise go unseen."""
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Ticker index warm-up failed", exc_info=future.exception())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global builder, job_store, job_queue
+    builder = _init_builder()
+    # Report job queue: bounded worker pool on the background loop
+    job_store = JobStore(os.getenv("REPORT_JOBS_DB", "./report_jobs.db"))
+    job_queue = ReportJobQueue(
+        builder,
+        job_store,
+        workers=int(os.getenv("REPORT_JOB_WORKERS", "2")),
+        max_pending=int(os.getenv("REPORT_JOB_MAX_PENDING", "50")),
+    )
+    await _on_background_loop(job_queue.start())
+    # Load (or fetch) the ticker index at startup rather than on the first report
+    warmup = asyncio.run_coroutine_threadsafe(builder.sec_client.warm_ticker_index(), _BACKGROUND_LOOP)
+    warmup.add_done_callback(_log_warmup_failure)
+    try:
+        yield
+    finally:
+        await _on_background_loop(job_queue.stop())
+        await _on_background_loop(builder.close())
+        # Clients leave the shared keep-alive pool open for each other; close it last
+        await _on_background_loop(shared_pool().close_pool())
+        job_store.close()
+
+
+app = FastAPI(title="Pharma DD API", lifespan=lifespan)
 
 limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
@@ -54,6 +107,49 @@ def _run_async(coro):
     return future.result(timeout=120)
 
 
+# Comment frames keep idle SSE connections alive through proxies while the
+# pipeline is busy fetching or embedding.
+SSE_HEARTBEAT_SECONDS = 15
+
+
+def _sse_frame(event: dict) -> str:
+    return f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def _relay_report_events(req: "ReportRequest"):
+    """Run stream_report on the background loop and relay its events as SSE frames."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for event in builder.stream_report(req.company, condition=req.condition, phases=req.phases):
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+        except Exception:
+            logger.exception("Streaming report failed for company=%s", req.company)
+            loop.call_soon_threadsafe(queue.put_nowait, {
+                "stage": "error", "detail": "Report generation failed. Please try again.",
+            })
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _BACKGROUND_LOOP)
+    try:
+        yield ": stream open\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            yield _sse_frame(event)
+    finally:
+        # Client went away (or stream finished): stop the pipeline if still running
+        future.cancel()
+
+
 def _init_builder():
     anthropic_key = os.getenv("ANTHROPIC_API_KEY")
     openai_key = os.getenv("OPENAI_API_KEY")
@@ -62,26 +158,49 @@ def _init_builder():
     fda_key = os.getenv("OPENFDA_API_KEY")
     sec_agent = os.getenv("SEC_USER_AGENT")
     embedder = Embedder(openai_api_key=openai_key)
+    http_cache_path = os.getenv("HTTP_CACHE_PATH", "./http_cache.db")
+    http_cache = HTTPCache(
+        http_cache_path, max_bytes=int(os.getenv("HTTP_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    ) if http_cache_path else None
     return ReportBuilder(
-        ct_client=ClinicalTrialsClient(),
-        fda_client=FDAClient(api_key=fda_key),
-        sec_client=SECEdgarClient(user_agent=sec_agent),
+        ct_client=ClinicalTrialsClient(http_cache=http_cache),
+        fda_client=FDAClient(api_key=fda_key, http_cache=http_cache),
+        sec_client=SECEdgarClient(
+            user_agent=sec_agent, http_cache=http_cache,
+            ticker_index_path=os.getenv("TICKER_INDEX_PATH", "./ticker_index.json.gz") or None,
+            facts_mode=os.getenv("SEC_FACTS_MODE", "companyfacts"),
+            market_data=MarketDataService(
+                max_workers=int(os.getenv("MARKET_DATA_WORKERS", "4")),
+                quote_ttl=float(os.getenv("MARKET_QUOTE_TTL_SECONDS", "300")),
+                fundamentals_ttl=float(os.getenv("MARKET_FUNDAMENTALS_TTL_SECONDS", "86400")),
+            ),
+        ),
         chunker_cls=Chunker,
         embedder=embedder,
         retriever=Retriever(embedder=embedder),
         generator=Generator(api_key=anthropic_key),
+        report_cache=ReportCache(
+            ttl_seconds=float(os.getenv("REPORT_CACHE_TTL_SECONDS", "3600")),
+            max_entries=int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "128")),
+            eviction=os.getenv("REPORT_CACHE_EVICTION", "lru"),
+        ),
     )
 
 
-builder = _init_builder()
-
-
 # ── Models ──
 class ReportRequest(BaseModel):
     company: str
     condition: Optional[str] = None
     phases: Optional[List[str]] = None
 
+    @field_validator("phases")
+    @classmethod
+    def known_phases(cls, phases):
+        # Rejected here (422) rather than mid-report, where the trials lookup would just fail
+        if phases:
+            phase_codes(phases)
+        return phases
+
 
 class ChatRequest(BaseModel):
     message: str
@@ -95,26 +214,82 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics/upstream")
+def upstream_metrics(_user=Depends(verify_jwt)):
+    """Per-host request, throttle-wait and retry counters for upstream APIs."""
+    return transport_metrics()
+
+
 @app.post("/report")
 @limiter.limit("10/hour")
 def generate_report(request: Request, req: ReportRequest, _user=Depends(verify_jwt)):
+    done = {}
+
+    def capture_done(event):
+        if event["stage"] == "done":
+            done.update(event)
+
     try:
         report = _run_async(builder.build_report(
             req.company,
             condition=req.condition,
             phases=req.phases,
+            on_event=capture_done,
         ))
     except Exception as e:
         logger.exception("Report generation failed for company=%s", req.company)
         raise HTTPException(status_code=500, detail="Report generation failed. Please try again.")
     collection_id = ReportBuilder.sanitize_collection_name(req.company)
-    return {"report": report, "collection_id": collection_id}
+    return {"report": report, "collection_id": collection_id, "cache_status": done.get("cache_status")}
+
+
+@app.post("/report/stream")
+@limiter.limit("10/hour")
+def stream_report(request: Request, req: ReportRequest, _user=Depends(verify_jwt)):
+    return StreamingResponse(
+        _relay_report_events(req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/report/jobs", status_code=202)
+@limiter.limit("10/hour")
+def create_report_job(request: Request, req: ReportRequest, user=Depends(verify_jwt)):
+    try:
+        job_id = _run_async(job_queue.submit(
+            req.company,
+            condition=req.condition,
+            phases=req.phases,
+            user_id=user.get("sub"),
+        ))
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Report queue is full. Please try again later.")
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/report/jobs/{job_id}")
+def get_report_job(job_id: str, user=Depends(verify_jwt)):
+    job = job_store.get(job_id)
+    if job is None or job["user_id"] != user.get("sub"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "company": job["company"],
+        "stage_timings": job["stage_timings"],
+        "report": job["report"],
+        "collection_id": job["collection_id"],
+        "cache_status": job["cache_status"],
+        "error": job["error"],
+    }
 
 
 @app.post("/chat")
 def chat(req: ChatRequest, _user=Depends(verify_jwt)):
     try:
         chunks = builder.retriever.retrieve_for_chat(req.collection_id, req.message)
+        chunks = _run_async(builder.augment_chat_chunks(req.message, chunks))
         response = builder.generator.generate_chat_response(
             req.message, chunks, req.history
         )
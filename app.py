@@ -1,20 +1,28 @@
 # app.py
 import streamlit as st
 import asyncio
+import atexit
+import logging
 import threading
 import os
 from dotenv import load_dotenv
 from src.api.clinical_trials import ClinicalTrialsClient
 from src.api.fda import FDAClient
+from src.api.http_cache import HTTPCache
+from src.api.market_data import MarketDataService
 from src.api.sec_edgar import SECEdgarClient
+from src.api.transport import shared_pool
 from src.ingestion.chunker import Chunker
 from src.ingestion.embedder import Embedder
 from src.rag.retriever import Retriever
 from src.rag.generator import Generator
 from src.report.builder import ReportBuilder
+from src.report.cache import ReportCache
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 st.set_page_config(
     page_title="Pharma DD",
     page_icon="\U0001f9ec",
@@ -337,26 +345,25 @@ st.markdown("""<div class="hero-header">
 </div>""", unsafe_allow_html=True)
 
 
+@st.cache_resource
+def _background_loop():
+    """One long-lived event loop per process, so pooled upstream connections are reused across reruns."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    # Clients leave the shared keep-alive pool open for each other; close it on exit
+    atexit.register(lambda: asyncio.run_coroutine_threadsafe(shared_pool().close_pool(), loop).result(timeout=5))
+    return loop
+
+
+def _log_warmup_failure(future) -> None:
+    """Done-callback for the fire-and-forget ticker index warm-up, whose exceptions would otherwise go unseen."""
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Ticker index warm-up failed", exc_info=future.exception())
+
+
 def _run_async(coro):
-    """Run an async coroutine from synchronous Streamlit context."""
-    result = [None]
-    exception = [None]
-
-    def target():
-        loop = asyncio.new_event_loop()
-        try:
-            result[0] = loop.run_until_complete(coro)
-        except Exception as e:
-            exception[0] = e
-        finally:
-            loop.close()
-
-    thread = threading.Thread(target=target)
-    thread.start()
-    thread.join()
-    if exception[0]:
-        raise exception[0]
-    return result[0]
+    """Run an async coroutine from synchronous Streamlit context on the shared background loop."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
 
 
 @st.cache_resource
@@ -369,9 +376,22 @@ def get_components():
         st.error("Please set ANTHROPIC_API_KEY and OPENAI_API_KEY in your .env file")
         st.stop()
 
-    ct_client = ClinicalTrialsClient()
-    fda_client = FDAClient(api_key=fda_key)
-    sec_client = SECEdgarClient(user_agent=os.getenv("SEC_USER_AGENT"))
+    http_cache_path = os.getenv("HTTP_CACHE_PATH", "./http_cache.db")
+    http_cache = HTTPCache(
+        http_cache_path, max_bytes=int(os.getenv("HTTP_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    ) if http_cache_path else None
+    ct_client = ClinicalTrialsClient(http_cache=http_cache)
+    fda_client = FDAClient(api_key=fda_key, http_cache=http_cache)
+    sec_client = SECEdgarClient(
+        user_agent=os.getenv("SEC_USER_AGENT"), http_cache=http_cache,
+        ticker_index_path=os.getenv("TICKER_INDEX_PATH", "./ticker_index.json.gz") or None,
+        facts_mode=os.getenv("SEC_FACTS_MODE", "companyfacts"),
+        market_data=MarketDataService(
+            max_workers=int(os.getenv("MARKET_DATA_WORKERS", "4")),
+            quote_ttl=float(os.getenv("MARKET_QUOTE_TTL_SECONDS", "300")),
+            fundamentals_ttl=float(os.getenv("MARKET_FUNDAMENTALS_TTL_SECONDS", "86400")),
+        ),
+    )
     embedder = Embedder(openai_api_key=openai_key)
     retriever = Retriever(embedder=embedder)
     generator = Generator(api_key=anthropic_key)
@@ -383,7 +403,15 @@ def get_components():
         embedder=embedder,
         retriever=retriever,
         generator=generator,
+        report_cache=ReportCache(
+            ttl_seconds=float(os.getenv("REPORT_CACHE_TTL_SECONDS", "3600")),
+            max_entries=int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "128")),
+            eviction=os.getenv("REPORT_CACHE_EVICTION", "lru"),
+        ),
     )
+    # Load (or fetch) the ticker index now rather than on the first report
+    warmup = asyncio.run_coroutine_threadsafe(sec_client.warm_ticker_index(), _background_loop())
+    warmup.add_done_callback(_log_warmup_failure)
     return builder, retriever, generator
 
 
@@ -574,6 +602,7 @@ if prompt := st.chat_input("Ask a follow-up question..."):
     with st.chat_message("assistant"):
         if st.session_state.collection_name:
             chunks = retriever.retrieve_for_chat(st.session_state.collection_name, prompt)
+            chunks = _run_async(builder.augment_chat_chunks(prompt, chunks))
         else:
             chunks = []
 
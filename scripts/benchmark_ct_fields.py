@@ -0,0 +1,79 @@
+# scripts/benchmark_ct_fields.py
+"""Compare projected ClinicalTrials.gov pages (STUDY_FIELDS) against full study records.
+
+Fetches the same sponsor search with and without the v2 ``fields`` parameter
+against the live API (no HTTP cache) and reports wall time, bytes downloaded,
+JSON decode time and peak Python allocation per page, and checks that the
+parsed studies are identical either way.
+
+    python -m scripts.benchmark_ct_fields Pfizer Moderna --page-size 100 --runs 3
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+
+import httpx
+
+from src.api.clinical_trials import STUDY_FIELDS, ClinicalTrialsClient
+
+MODES = ("full", "projected")
+
+
+async def _run_once(client: httpx.AsyncClient, sponsor: str, mode: str, page_size: int) -> dict:
+    params = {"query.spons": sponsor, "pageSize": page_size, "format": "json"}
+    if mode == "projected":
+        params["fields"] = ",".join(STUDY_FIELDS)
+
+    start = time.perf_counter()
+    response = await client.get(ClinicalTrialsClient.BASE_URL, params=params)
+    response.raise_for_status()
+    fetched = time.perf_counter() - start
+
+    tracemalloc.start()
+    decode_start = time.perf_counter()
+    data = json.loads(response.content)
+    decoded = time.perf_counter() - decode_start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "seconds": fetched + decoded,
+        "decode_seconds": decoded,
+        "bytes": response.num_bytes_downloaded,
+        "peak_bytes": peak,
+        "studies": data.get("studies", []),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sponsors", nargs="+", help="sponsor names to search for")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    ct_client = ClinicalTrialsClient()
+    parse = ct_client._parse_study
+    print(f"{'sponsor':<12} {'mode':<10} {'median s':>9} {'decode ms':>10} {'KB down':>9} {'peak MB':>8} {'studies':>8}")
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        for sponsor in args.sponsors:
+            parsed = {}
+            for mode in MODES:
+                runs = [await _run_once(client, sponsor, mode, args.page_size) for _ in range(args.runs)]
+                last = runs[-1]
+                parsed[mode] = [parse(s) for s in last["studies"]]
+                print(
+                    f"{sponsor[:12]:<12} {mode:<10} {statistics.median(r['seconds'] for r in runs):>9.2f} "
+                    f"{statistics.median(r['decode_seconds'] for r in runs) * 1000:>10.1f} "
+                    f"{last['bytes'] / 1024:>9.0f} {last['peak_bytes'] / 1e6:>8.1f} {len(last['studies']):>8}"
+                )
+            if parsed["full"] != parsed["projected"]:
+                print(f"  warning: projected studies for {sponsor!r} parse differently from full records")
+    await ct_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+# scripts/benchmark_sec_facts.py
+"""Compare SEC_FACTS_MODE=companyfacts against SEC_FACTS_MODE=concept.
+
+Fetches XBRL facts for each company in both modes against the live SEC API
+(no HTTP cache) and reports wall time, requests, bytes downloaded, peak
+Python allocation and the number of XBRL fields extracted per run.
+
+    python -m scripts.benchmark_sec_facts PFE MRNA JNJ --runs 3
+
+Set SEC_USER_AGENT to your contact string, as SEC fair-access policy requires.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import tracemalloc
+
+from dotenv import load_dotenv
+
+from src.api.sec_edgar import FACTS_MODES, SECEdgarClient
+from src.api.xbrl import XBRL_CONCEPTS
+
+
+async def _run_once(company: str, mode: str, user_agent: str) -> dict:
+    client = SECEdgarClient(user_agent=user_agent, facts_mode=mode)
+    responses = []
+
+    async def record(response):
+        responses.append(response)
+
+    try:
+        match = await client.lookup_company(company)
+        if match is None:
+            raise SystemExit(f"No SEC registrant found for {company!r}")
+        client._client.event_hooks["response"].append(record)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        facts = await client.get_company_facts(match["cik"])
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        await client.close()
+
+    return {
+        "company": match["ticker"],
+        "seconds": elapsed,
+        "requests": len(responses),
+        "bytes": sum(r.num_bytes_downloaded for r in responses),
+        "peak_bytes": peak,
+        # Extracted XBRL fields only, not company_name or the derived trends
+        "fields": sum(key in XBRL_CONCEPTS for key in facts),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("companies", nargs="+", help="tickers or company names")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    load_dotenv()
+    user_agent = os.getenv("SEC_USER_AGENT")
+
+    print(f"{'company':<8} {'mode':<13} {'median s':>9} {'requests':>9} {'KB down':>9} {'peak MB':>8} {'fields':>7}")
+    for company in args.companies:
+        for mode in FACTS_MODES:
+            runs = [await _run_once(company, mode, user_agent) for _ in range(args.runs)]
+            last = runs[-1]
+            print(
+                f"{last['company']:<8} {mode:<13} {statistics.median(r['seconds'] for r in runs):>9.2f} "
+                f"{last['requests']:>9} {last['bytes'] / 1024:>9.0f} {last['peak_bytes'] / 1e6:>8.1f} "
+                f"{last['fields']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,14 @@
 # src/api/clinical_trials.py
 from __future__ import annotations
 
+import asyncio
+import re
 import httpx
 from typing import Optional
 
+from src.api.http_cache import HTTPCache
+from src.api.transport import build_transport
+
 
 PHASE_MAP = {
     "EARLY_PHASE1": "Early Phase 1",
@@ -14,60 +19,227 @@ PHASE_MAP = {
     "NA": "N/A",
 }
 
+# Display phase -> API phase codes for server-side filtering. "Phase 1" also
+# covers Early Phase 1, matching the substring semantics of the old local filter.
+PHASE_FILTER_CODES = {
+    "Early Phase 1": ["EARLY_PHASE1"],
+    "Phase 1": ["EARLY_PHASE1", "PHASE1"],
+    "Phase 2": ["PHASE2"],
+    "Phase 3": ["PHASE3"],
+    "Phase 4": ["PHASE4"],
+    "N/A": ["NA"],
+}
+
+
+def _phase_key(phase: str) -> str:
+    """Case- and punctuation-insensitive phase key: "phase 2", "Phase-2" and "2" all give "PHASE2"."""
+    key = re.sub(r"[^A-Z0-9]", "", phase.upper())
+    return f"PHASE{key}" if key.isdigit() else key
+
+
+_PHASE_KEYS = {_phase_key(name): codes for name, codes in PHASE_FILTER_CODES.items()}
+
+
+def phase_codes(phases: list[str]) -> list[str]:
+    """API phase codes for display names ("Phase 2", any case, or a bare "2") or codes ("PHASE2").
+
+    Raises ValueError for values that name no phase, so a typo can't silently
+    drop the filter.
+    """
+    codes: list[str] = []
+    for phase in phases:
+        code = phase.strip().upper()
+        matched = [code] if code in PHASE_MAP else _PHASE_KEYS.get(_phase_key(phase))
+        if not matched:
+            raise ValueError(f"Unknown trial phase {phase!r}; expected one of {', '.join(PHASE_FILTER_CODES)}")
+        for code in matched:
+            if code not in codes:
+                codes.append(code)
+    return codes
+
+
+# Every study path _parse_study reads. Sent as the v2 ``fields`` projection so
+# pages skip eligibility, contacts/locations, references and other large modules.
+STUDY_FIELDS = (
+    "protocolSection.identificationModule.nctId",
+    "protocolSection.identificationModule.briefTitle",
+    "protocolSection.identificationModule.officialTitle",
+    "protocolSection.statusModule.overallStatus",
+    "protocolSection.statusModule.startDateStruct",
+    "protocolSection.statusModule.primaryCompletionDateStruct",
+    "protocolSection.statusModule.completionDateStruct",
+    "protocolSection.designModule.phases",
+    "protocolSection.designModule.enrollmentInfo",
+    "protocolSection.conditionsModule.conditions",
+    "protocolSection.armsInterventionsModule.interventions.name",
+    "protocolSection.armsInterventionsModule.interventions.type",
+    "protocolSection.outcomesModule.primaryOutcomes",
+    "protocolSection.outcomesModule.secondaryOutcomes",
+    "protocolSection.sponsorCollaboratorsModule.leadSponsor",
+    "protocolSection.sponsorCollaboratorsModule.collaborators.name",
+    "protocolSection.descriptionModule.briefSummary",
+    "hasResults",
+)
+
+
+def _sponsor_or_intervention_query(term: str) -> str:
+    quoted = '"' + term.replace('"', " ").strip() + '"'
+    return f"AREA[SponsorSearch]{quoted} OR AREA[InterventionSearch]{quoted}"
+
+
+def _name_matches(term: str, name: str) -> bool:
+    term, name = term.casefold().strip(), name.casefold()
+    if term in name:
+        return True
+    name_words = set(re.findall(r"\w+", name))
+    return bool(name_words) and all(w in name_words for w in re.findall(r"\w+", term))
+
+
+def _matched_criteria(study: dict, term: str) -> list[str]:
+    """Which side of a sponsor-or-intervention query a study matched.
+
+    The server also matches intervention synonyms we don't download, so a study
+    whose sponsors don't match locally is attributed to its intervention.
+    """
+    matched = []
+    sponsors = [study.get("sponsor", "")] + study.get("collaborators", [])
+    if any(_name_matches(term, s) for s in sponsors if s):
+        matched.append("sponsor")
+    if any(_name_matches(term, i["name"]) for i in study.get("interventions", [])) or not matched:
+        matched.append("intervention")
+    return matched
+
 
 class ClinicalTrialsClient:
     """Async client for the ClinicalTrials.gov v2 API."""
 
     BASE_URL = "https://clinicaltrials.gov/api/v2/studies"
 
-    def __init__(self):
-        self._client = httpx.AsyncClient(timeout=30.0)
+    def __init__(self, http_cache: Optional[HTTPCache] = None):
+        self._client = httpx.AsyncClient(timeout=30.0, transport=build_transport(http_cache))
 
-    async def search_by_sponsor(self, sponsor: str, max_results: int = 100, condition: str = None) -> list[dict]:
-        """Search clinical trials by sponsor name."""
-        params = {"query.spons": sponsor}
-        if condition:
-            params["query.cond"] = condition
+    async def search_by_sponsor(self, sponsor: str, max_results: int = 100, condition: str = None,
+                                phases: list[str] = None, statuses: list[str] = None) -> list[dict]:
+        """Search clinical trials by sponsor name, optionally filtered by phase and status."""
+        params = {"query.spons": sponsor, **self._filter_params(condition, phases, statuses)}
         return await self._search(params=params, max_results=max_results)
 
-    async def search_by_drug(self, drug_name: str, max_results: int = 100, condition: str = None) -> list[dict]:
-        """Search clinical trials by drug / intervention name."""
-        params = {"query.intr": drug_name}
+    async def search_by_drug(self, drug_name: str, max_results: int = 100, condition: str = None,
+                             phases: list[str] = None, statuses: list[str] = None) -> list[dict]:
+        """Search clinical trials by drug / intervention name, optionally filtered by phase and status."""
+        params = {"query.intr": drug_name, **self._filter_params(condition, phases, statuses)}
+        return await self._search(params=params, max_results=max_results)
+
+    async def search_by_sponsor_or_drug(self, term: str, max_results: int = 200, condition: str = None,
+                                        phases: list[str] = None, statuses: list[str] = None) -> list[dict]:
+        """Search trials whose sponsor or intervention matches ``term`` in a single query.
+
+        The API deduplicates studies matching both criteria. Each result carries
+        ``matched_on``: ``"sponsor"`` and/or ``"intervention"``, with sponsor
+        matches listed first like separate sponsor-then-drug searches would.
+        """
+        studies = [study async for study in self.iter_by_sponsor_or_drug(
+            term, max_results=max_results, condition=condition, phases=phases, statuses=statuses,
+        )]
+        studies.sort(key=lambda s: "sponsor" not in s["matched_on"])
+        return studies
+
+    def iter_by_sponsor(self, sponsor: str, max_results: int = 100, condition: str = None,
+                        phases: list[str] = None, statuses: list[str] = None):
+        """Async iterator over parsed sponsor studies, yielded as each page arrives."""
+        params = {"query.spons": sponsor, **self._filter_params(condition, phases, statuses)}
+        return self.iter_studies(params=params, max_results=max_results)
+
+    def iter_by_drug(self, drug_name: str, max_results: int = 100, condition: str = None,
+                     phases: list[str] = None, statuses: list[str] = None):
+        """Async iterator over parsed drug / intervention studies, yielded as each page arrives."""
+        params = {"query.intr": drug_name, **self._filter_params(condition, phases, statuses)}
+        return self.iter_studies(params=params, max_results=max_results)
+
+    async def iter_by_sponsor_or_drug(self, term: str, max_results: int = 200, condition: str = None,
+                                      phases: list[str] = None, statuses: list[str] = None):
+        """Async iterator over ``search_by_sponsor_or_drug`` results, tagged with ``matched_on``, in API order."""
+        params = {"query.term": _sponsor_or_intervention_query(term),
+                  **self._filter_params(condition, phases, statuses)}
+        async for study in self.iter_studies(params=params, max_results=max_results):
+            study["matched_on"] = _matched_criteria(study, term)
+            yield study
+
+    @staticmethod
+    def _filter_params(condition: str = None, phases: list[str] = None, statuses: list[str] = None) -> dict:
+        """Translate condition/phase/status filters into v2 server-side query parameters.
+
+        ``phases`` accepts display names ("Phase 2") or API codes ("PHASE2"), and
+        raises ValueError for anything else;
+        ``statuses`` takes overall status codes such as "RECRUITING".
+        """
+        params = {}
         if condition:
             params["query.cond"] = condition
-        return await self._search(params=params, max_results=max_results)
+        if phases:
+            params["filter.advanced"] = f"AREA[Phase]({' OR '.join(phase_codes(phases))})"
+        if statuses:
+            params["filter.overallStatus"] = ",".join(s.upper() for s in statuses)
+        return params
 
     async def _search(self, params: dict, max_results: int) -> list[dict]:
         """Internal paginated search against the ClinicalTrials.gov v2 API."""
-        all_studies: list[dict] = []
-        page_token: Optional[str] = None
+        return [study async for study in self.iter_studies(params, max_results)]
+
+    async def iter_studies(self, params: dict, max_results: int = 100):
+        """Yield parsed studies with pipelined pagination.
 
-        while len(all_studies) < max_results:
-            request_params = {
-                **params,
-                "pageSize": min(max_results - len(all_studies), 100),
-                "format": "json",
-            }
-            if page_token:
-                request_params["pageToken"] = page_token
+        As soon as a page's ``nextPageToken`` is known the request for the next
+        page is started, so its network time overlaps parsing and consuming the
+        current page.
+        """
+        received = 0
+        pending: Optional[asyncio.Task] = asyncio.create_task(
+            self._fetch_page(params, min(max_results, 100), None)
+        )
+        try:
+            while pending is not None:
+                data = await pending
+                pending = None
+                studies = data.get("studies", [])
+                received += len(studies)
 
-            response = await self._client.get(self.BASE_URL, params=request_params)
-            response.raise_for_status()
-            data = response.json()
+                page_token = data.get("nextPageToken")
+                if page_token and received < max_results:
+                    pending = asyncio.create_task(
+                        self._fetch_page(params, min(max_results - received, 100), page_token)
+                    )
+                    # Let the prefetch put its request on the wire before we parse
+                    await asyncio.sleep(0)
 
-            for study in data.get("studies", []):
-                parsed = self._parse_study(study)
-                if parsed:
-                    all_studies.append(parsed)
+                for study in studies:
+                    parsed = self._parse_study(study)
+                    if parsed:
+                        yield parsed
+        finally:
+            if pending is not None:
+                pending.cancel()
 
-            page_token = data.get("nextPageToken")
-            if not page_token:
-                break
+    async def _fetch_page(self, params: dict, page_size: int, page_token: Optional[str]) -> dict:
+        request_params = {
+            **params,
+            "pageSize": page_size,
+            "format": "json",
+            "fields": ",".join(STUDY_FIELDS),
+        }
+        if page_token:
+            request_params["pageToken"] = page_token
 
-        return all_studies
+        response = await self._client.get(self.BASE_URL, params=request_params)
+        response.raise_for_status()
+        return response.json()
 
     def _parse_study(self, study: dict) -> Optional[dict]:
-        """Parse a raw ClinicalTrials.gov study object into a flat dict."""
+        """Parse a raw ClinicalTrials.gov study object into a flat dict.
+
+        Keep ``STUDY_FIELDS`` in sync when reading new paths here, or they will
+        be missing from the projected API response.
+        """
         protocol = study.get("protocolSection", {})
         id_mod = protocol.get("identificationModule", {})
         status_mod = protocol.get("statusModule", {})
@@ -97,6 +269,7 @@ class ClinicalTrialsClient:
             "primary_completion_date": status_mod.get("primaryCompletionDateStruct", {}).get("date"),
             "completion_date": status_mod.get("completionDateStruct", {}).get("date"),
             "sponsor": sponsor_mod.get("leadSponsor", {}).get("name", ""),
+            "collaborators": [c["name"] for c in sponsor_mod.get("collaborators", []) if c.get("name")],
             "conditions": conditions_mod.get("conditions", []),
             "interventions": interventions,
             "primary_outcomes": outcomes_mod.get("primaryOutcomes", []),
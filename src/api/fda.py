@@ -1,10 +1,15 @@
 # src/api/fda.py
 from __future__ import annotations
 
+import asyncio
 import re
 import httpx
+from urllib.parse import quote_plus
 from typing import Optional
 
+from src.api.http_cache import HTTPCache
+from src.api.transport import build_transport
+
 _LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
 
 
@@ -12,6 +17,45 @@ def _escape_lucene(value: str) -> str:
     return _LUCENE_SPECIAL.sub(r'\\\1', value)
 
 
+# FAERS patient.reaction.reactionoutcome codes
+REACTION_OUTCOMES = {
+    "1": "Recovered/resolved",
+    "2": "Recovering/resolving",
+    "3": "Not recovered/not resolved",
+    "4": "Recovered/resolved with sequelae",
+    "5": "Fatal",
+    "6": "Unknown",
+}
+TOP_REACTIONS = 20
+
+# openFDA caps ``limit`` per request and rejects ``skip`` beyond 25000, so large
+# result sets are paged; pages after the first are fetched concurrently.
+OPENFDA_PAGE_SIZE = 100
+OPENFDA_MAX_SKIP = 25000
+OPENFDA_MAX_RESULTS = 1000
+PAGINATION_CONCURRENCY = 4
+
+# Batched label lookups OR many drug names into one search. openFDA rejects
+# overlong request URLs, so each batch's encoded search stays under this budget.
+LABEL_BATCH_MAX_QUERY_CHARS = 1500
+LABEL_BATCH_PAGE_SIZE = 99
+LABEL_BATCH_MAX_PAGES = 5
+
+# openFDA requests behind one count-mode summary, for callers budgeting fan-out.
+ADVERSE_EVENT_SUMMARY_REQUESTS = 3
+DEVICE_EVENT_SUMMARY_REQUESTS = 4
+
+
+def _normalize_name(value: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", value.lower()).split())
+
+
+def _name_in_field(name: str, values: list) -> bool:
+    """True when ``name`` appears as a whole-word phrase in any value, like a Lucene phrase match."""
+    needle = f" {_normalize_name(name)} "
+    return any(needle in f" {_normalize_name(value)} " for value in values)
+
+
 class FDAClient:
     """Async client for the openFDA API (drugs, devices, labels, adverse events)."""
 
@@ -22,8 +66,8 @@ class FDAClient:
     DEVICE_EVENT_URL = "https://api.fda.gov/device/event.json"
     DEVICE_RECALL_URL = "https://api.fda.gov/device/recall.json"
 
-    def __init__(self, api_key: Optional[str] = None):
-        self._client = httpx.AsyncClient(timeout=30.0)
+    def __init__(self, api_key: Optional[str] = None, http_cache: Optional[HTTPCache] = None):
+        self._client = httpx.AsyncClient(timeout=30.0, transport=build_transport(http_cache))
         self._api_key = api_key
 
     def _base_params(self) -> dict:
@@ -31,22 +75,13 @@ class FDAClient:
             return {"api_key": self._api_key}
         return {}
 
-    async def search_approvals(self, company_or_drug: str, limit: int = 50) -> list[dict]:
+    async def search_approvals(self, company_or_drug: str, limit: int = OPENFDA_MAX_RESULTS) -> list[dict]:
         """Search drug approval records by company or drug name."""
-        params = {
-            **self._base_params(),
-            "search": f'openfda.manufacturer_name:"{_escape_lucene(company_or_drug)}"+openfda.brand_name:"{_escape_lucene(company_or_drug)}"',
-            "limit": min(limit, 99),
-        }
-        response = await self._client.get(self.DRUGSFDA_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if "error" in data:
-            return []
+        search = f'openfda.manufacturer_name:"{_escape_lucene(company_or_drug)}"+openfda.brand_name:"{_escape_lucene(company_or_drug)}"'
+        records = await self._paginate(self.DRUGSFDA_URL, search, limit)
 
         results = []
-        for record in data.get("results", []):
+        for record in records:
             openfda = record.get("openfda", {})
             results.append({
                 "application_number": record.get("application_number", ""),
@@ -65,7 +100,7 @@ class FDAClient:
         """Search drug labeling information by drug name."""
         params = {
             **self._base_params(),
-            "search": f'openfda.brand_name:"{_escape_lucene(drug_name)}"+openfda.generic_name:"{_escape_lucene(drug_name)}"',
+            "search": self._label_search(drug_name),
             "limit": min(limit, 99),
         }
         response = await self._client.get(self.LABEL_URL, params=params)
@@ -75,22 +110,143 @@ class FDAClient:
         if "error" in data:
             return []
 
-        results = []
-        for record in data.get("results", []):
-            openfda = record.get("openfda", {})
-            results.append({
-                "brand_name": (openfda.get("brand_name") or [""])[0],
-                "generic_name": (openfda.get("generic_name") or [""])[0],
-                "manufacturer": (openfda.get("manufacturer_name") or [""])[0],
-                "indications": (record.get("indications_and_usage") or [""])[0],
-                "boxed_warning": (record.get("boxed_warning") or [""])[0],
-                "warnings": (record.get("warnings_and_cautions") or [""])[0],
-                "adverse_reactions": (record.get("adverse_reactions") or [""])[0],
-            })
-        return results
+        return [self._parse_label(record) for record in data.get("results", [])]
+
+    async def search_labels_batch(self, drug_names: list[str], limit: int = 10) -> dict[str, list[dict]]:
+        """Search labels for many drugs at once, returning ``{drug_name: [label, ...]}``.
+
+        Names are OR'ed into as few searches as fit under the URL budget and the
+        batches run concurrently. Each label is fanned back out to every requested
+        name its brand or generic name matches, deduplicated by ``set_id`` and
+        capped at ``limit`` per drug.
+        """
+        drug_names = list(dict.fromkeys(name for name in drug_names if name))
+        batch_results = await asyncio.gather(*(
+            self._search_label_batch(batch, limit) for batch in self._label_batches(drug_names)
+        ))
+        labels_by_drug = {name: [] for name in drug_names}
+        for batch in batch_results:
+            for name, labels in batch.items():
+                labels_by_drug[name] = labels
+        return labels_by_drug
+
+    async def _search_label_batch(self, drug_names: list[str], limit: int) -> dict[str, list[dict]]:
+        search = "+".join(self._label_search(name) for name in drug_names)
+        labels_by_drug = {name: [] for name in drug_names}
+        seen = {name: set() for name in drug_names}
+        skip = 0
+        for _ in range(LABEL_BATCH_MAX_PAGES):
+            params = {
+                **self._base_params(),
+                "search": search,
+                "limit": LABEL_BATCH_PAGE_SIZE,
+                "skip": skip,
+            }
+            response = await self._client.get(self.LABEL_URL, params=params)
+            if response.status_code == 404:
+                break
+            response.raise_for_status()
+            data = response.json()
+            if "error" in data:
+                break
+
+            records = data.get("results", [])
+            for record in records:
+                openfda = record.get("openfda", {})
+                fields = (openfda.get("brand_name") or []) + (openfda.get("generic_name") or [])
+                label = self._parse_label(record)
+                key = label["set_id"] or id(record)
+                for name in drug_names:
+                    if (len(labels_by_drug[name]) < limit and key not in seen[name]
+                            and _name_in_field(name, fields)):
+                        seen[name].add(key)
+                        labels_by_drug[name].append(label)
+
+            skip += len(records)
+            total = data.get("meta", {}).get("results", {}).get("total", 0)
+            if not records or skip >= total or all(len(labels) >= limit for labels in labels_by_drug.values()):
+                break
+        else:
+            # Page cap hit: one prolific name (e.g. a widely genericized ANDA drug) can
+            # fill every page, so names still short of ``limit`` are searched on their own
+            short = [name for name in drug_names if len(labels_by_drug[name]) < limit]
+            results = await asyncio.gather(*(self.search_labels(name, limit) for name in short))
+            for name, labels in zip(short, results):
+                for label in labels:
+                    key = label["set_id"] or id(label)
+                    if len(labels_by_drug[name]) < limit and key not in seen[name]:
+                        seen[name].add(key)
+                        labels_by_drug[name].append(label)
+        return labels_by_drug
+
+    @classmethod
+    def _label_batches(cls, drug_names: list[str]) -> list[list[str]]:
+        """Split names into batches whose OR'ed, URL-encoded search fits the length budget."""
+        batches, batch, length = [], [], 0
+        for name in drug_names:
+            term_length = len(quote_plus(cls._label_search(name))) + len(quote_plus("+"))
+            if batch and length + term_length > LABEL_BATCH_MAX_QUERY_CHARS:
+                batches.append(batch)
+                batch, length = [], 0
+            batch.append(name)
+            length += term_length
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def _label_search(drug_name: str) -> str:
+        escaped = _escape_lucene(drug_name)
+        return f'openfda.brand_name:"{escaped}"+openfda.generic_name:"{escaped}"'
+
+    @staticmethod
+    def _parse_label(record: dict) -> dict:
+        openfda = record.get("openfda", {})
+        return {
+            "set_id": record.get("set_id", ""),
+            "brand_name": (openfda.get("brand_name") or [""])[0],
+            "generic_name": (openfda.get("generic_name") or [""])[0],
+            "manufacturer": (openfda.get("manufacturer_name") or [""])[0],
+            "indications": (record.get("indications_and_usage") or [""])[0],
+            "boxed_warning": (record.get("boxed_warning") or [""])[0],
+            "warnings": (record.get("warnings_and_cautions") or [""])[0],
+            "adverse_reactions": (record.get("adverse_reactions") or [""])[0],
+        }
+
+    async def get_adverse_events_summary(self, drug_name: str, limit: int = 10, mode: str = "count") -> dict:
+        """Get a summary of adverse event reports for a given drug.
+
+        ``mode="count"`` (default) aggregates over every FAERS report server-side
+        with openFDA ``count=`` queries: top reactions, seriousness and outcomes,
+        one small request per dimension. ``mode="sample"`` tallies ``limit`` raw
+        reports locally. Both return ``total_reports``, ``sample_reactions`` and
+        ``serious_count``; count mode adds ``reaction_counts`` and ``outcome_counts``.
+        """
+        if mode == "sample":
+            return await self._sample_adverse_events_summary(drug_name, limit)
+        if mode != "count":
+            raise ValueError(f"mode must be 'count' or 'sample', got {mode!r}")
+
+        search = f'patient.drug.openfda.brand_name:"{_escape_lucene(drug_name)}"'
+        reactions, seriousness, outcomes = await asyncio.gather(
+            self._count(self.EVENTS_URL, search, "patient.reaction.reactionmeddrapt.exact", limit=TOP_REACTIONS),
+            self._count(self.EVENTS_URL, search, "serious"),
+            self._count(self.EVENTS_URL, search, "patient.reaction.reactionoutcome"),
+        )
+
+        # Every report is flagged serious (1) or not (2), so the two buckets sum to the total
+        serious_by_term = {str(r["term"]): r["count"] for r in seriousness}
+        return {
+            "total_reports": sum(serious_by_term.values()),
+            "sample_reactions": [r["term"] for r in reactions],
+            "serious_count": serious_by_term.get("1", 0),
+            "reaction_counts": [{"reaction": r["term"], "count": r["count"]} for r in reactions],
+            "outcome_counts": {
+                REACTION_OUTCOMES.get(str(o["term"]), str(o["term"])): o["count"] for o in outcomes
+            },
+        }
 
-    async def get_adverse_events_summary(self, drug_name: str, limit: int = 10) -> dict:
-        """Get a summary of adverse event reports for a given drug."""
+    async def _sample_adverse_events_summary(self, drug_name: str, limit: int) -> dict:
         params = {
             **self._base_params(),
             "search": f'patient.drug.openfda.brand_name:"{_escape_lucene(drug_name)}"',
@@ -121,23 +277,71 @@ class FDAClient:
             "serious_count": serious_count,
         }
 
-    async def search_device_clearances(self, company_or_device: str, limit: int = 50) -> list[dict]:
-        """Search 510(k) device clearances by company or device name."""
-        escaped = _escape_lucene(company_or_device)
-        params = {
-            **self._base_params(),
-            "search": f'applicant:"{escaped}"+device_name:"{escaped}"',
-            "limit": min(limit, 99),
-        }
-        response = await self._client.get(self.DEVICE_510K_URL, params=params)
+    async def _paginate(self, url: str, search: str, limit: int) -> list[dict]:
+        """Fetch up to ``limit`` raw records for ``search``, paging with ``skip``.
+
+        The first page reports ``meta.results.total``; every remaining page is then
+        requested at once under ``PAGINATION_CONCURRENCY``, so a multi-page result
+        costs about two round trips rather than one per page.
+        """
+        limit = min(limit, OPENFDA_MAX_SKIP + OPENFDA_PAGE_SIZE)
+        first = await self._fetch_page(url, search, 0, min(limit, OPENFDA_PAGE_SIZE))
+        records = first.get("results", [])
+        total = min(first.get("meta", {}).get("results", {}).get("total", len(records)), limit)
+        skips = range(len(records), total, OPENFDA_PAGE_SIZE) if records else range(0)
+        if not skips:
+            return records[:limit]
+
+        semaphore = asyncio.Semaphore(PAGINATION_CONCURRENCY)
+
+        async def fetch(skip: int) -> list[dict]:
+            async with semaphore:
+                page = await self._fetch_page(url, search, skip, min(OPENFDA_PAGE_SIZE, total - skip))
+            return page.get("results", [])
+
+        for page in await asyncio.gather(*(fetch(skip) for skip in skips)):
+            records.extend(page)
+        return records[:limit]
+
+    async def _fetch_page(self, url: str, search: str, skip: int, limit: int) -> dict:
+        """Fetch one page of search results; no matches (404 or an error body) is an empty page."""
+        params = {**self._base_params(), "search": search, "limit": limit}
+        if skip:
+            params["skip"] = skip
+        response = await self._client.get(url, params=params)
+        if response.status_code == 404:
+            return {}
         response.raise_for_status()
         data = response.json()
+        if "error" in data:
+            return {}
+        return data
+
+    async def _count(self, url: str, search: str, field: str, limit: int = 100) -> list[dict]:
+        """Run an openFDA ``count=`` aggregation, returning ``[{"term", "count"}]``.
 
+        openFDA answers 404 when the search matches nothing; that is an empty result here.
+        """
+        params = {**self._base_params(), "search": search, "count": field, "limit": limit}
+        response = await self._client.get(url, params=params)
+        if response.status_code == 404:
+            return []
+        response.raise_for_status()
+        data = response.json()
         if "error" in data:
             return []
+        return data.get("results", [])
+
+    async def search_device_clearances(self, company_or_device: str,
+                                       limit: int = OPENFDA_MAX_RESULTS) -> list[dict]:
+        """Search 510(k) device clearances by company or device name."""
+        escaped = _escape_lucene(company_or_device)
+        records = await self._paginate(
+            self.DEVICE_510K_URL, f'applicant:"{escaped}"+device_name:"{escaped}"', limit,
+        )
 
         results = []
-        for record in data.get("results", []):
+        for record in records:
             results.append({
                 "k_number": record.get("k_number", ""),
                 "applicant": record.get("applicant", ""),
@@ -150,12 +354,59 @@ class FDAClient:
             })
         return results
 
-    async def get_device_adverse_events_summary(self, device_name: str, limit: int = 10) -> dict:
-        """Get a summary of MAUDE adverse event reports for a device."""
-        escaped = _escape_lucene(device_name)
+    async def get_device_adverse_events_summary(self, device_name: str, limit: int = 10,
+                                                mode: str = "count") -> dict:
+        """Get a summary of MAUDE adverse event reports for a device.
+
+        ``mode="count"`` (default) aggregates every matching report with openFDA
+        ``count=`` queries over event type, device class, product code and
+        receipt date; narratives are left out and can be fetched on demand with
+        ``get_device_event_narratives``. ``mode="sample"`` tallies ``limit`` raw
+        reports locally and includes their narratives.
+        """
+        if mode == "sample":
+            return await self._sample_device_adverse_events_summary(device_name, limit)
+        if mode != "count":
+            raise ValueError(f"mode must be 'count' or 'sample', got {mode!r}")
+
+        search = self._device_event_search(device_name)
+        event_types, device_classes, product_codes, received = await asyncio.gather(
+            self._count(self.DEVICE_EVENT_URL, search, "event_type.exact"),
+            self._count(self.DEVICE_EVENT_URL, search, "device.openfda.device_class"),
+            self._count(self.DEVICE_EVENT_URL, search, "device.device_report_product_code.exact", limit=10),
+            self._count(self.DEVICE_EVENT_URL, search, "date_received", limit=1000),
+        )
+
+        event_type_counts = {r["term"]: r["count"] for r in event_types}
+        reports_by_year: dict[str, int] = {}
+        for bucket in received:
+            year = str(bucket.get("time", ""))[:4]
+            if year:
+                reports_by_year[year] = reports_by_year.get(year, 0) + bucket["count"]
+
+        return {
+            "total_reports": sum(event_type_counts.values()),
+            "serious_count": sum(
+                count for event_type, count in event_type_counts.items()
+                if event_type.upper() in ("DEATH", "INJURY")
+            ),
+            "sample_events": [],
+            "event_type_counts": event_type_counts,
+            "device_class_counts": {str(r["term"]): r["count"] for r in device_classes},
+            "product_code_counts": {r["term"]: r["count"] for r in product_codes},
+            "reports_by_year": dict(sorted(reports_by_year.items())),
+        }
+
+    async def get_device_event_narratives(self, device_name: str, limit: int = 5) -> list[str]:
+        """Fetch a few MAUDE event narratives for a device (truncated to 300 chars)."""
+        summary = await self._sample_device_adverse_events_summary(device_name, max(limit, 10), max_events=limit)
+        return summary["sample_events"]
+
+    async def _sample_device_adverse_events_summary(self, device_name: str, limit: int,
+                                                    max_events: int = 5) -> dict:
         params = {
             **self._base_params(),
-            "search": f'device.generic_name:"{escaped}"+device.brand_name:"{escaped}"',
+            "search": self._device_event_search(device_name),
             "limit": min(limit, 99),
         }
         response = await self._client.get(self.DEVICE_EVENT_URL, params=params)
@@ -174,7 +425,7 @@ class FDAClient:
                 serious_count += 1
             for text_entry in report.get("mdr_text", []):
                 narrative = text_entry.get("text", "")
-                if narrative and len(sample_events) < 5:
+                if narrative and len(sample_events) < max_events:
                     sample_events.append(narrative[:300])
 
         return {
@@ -183,23 +434,21 @@ class FDAClient:
             "sample_events": sample_events,
         }
 
-    async def search_device_recalls(self, company_or_device: str, limit: int = 20) -> list[dict]:
+    @staticmethod
+    def _device_event_search(device_name: str) -> str:
+        escaped = _escape_lucene(device_name)
+        return f'device.generic_name:"{escaped}"+device.brand_name:"{escaped}"'
+
+    async def search_device_recalls(self, company_or_device: str,
+                                    limit: int = OPENFDA_MAX_RESULTS) -> list[dict]:
         """Search device recall records by company or product description."""
         escaped = _escape_lucene(company_or_device)
-        params = {
-            **self._base_params(),
-            "search": f'recalling_firm:"{escaped}"+product_description:"{escaped}"',
-            "limit": min(limit, 99),
-        }
-        response = await self._client.get(self.DEVICE_RECALL_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if "error" in data:
-            return []
+        records = await self._paginate(
+            self.DEVICE_RECALL_URL, f'recalling_firm:"{escaped}"+product_description:"{escaped}"', limit,
+        )
 
         results = []
-        for record in data.get("results", []):
+        for record in records:
             results.append({
                 "res_event_number": record.get("res_event_number", ""),
                 "recalling_firm": record.get("recalling_firm", ""),
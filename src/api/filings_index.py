@@ -0,0 +1,143 @@
+# src/api/filings_index.py
+"""Columnar index over a company's EDGAR filing history.
+
+The ``submissions`` document lists filings as parallel arrays (``form``,
+``filingDate``, ``accessionNumber``, ...). Only about the last year, or the last
+thousand filings, is inline under ``filings.recent``; older filings sit in
+overflow pages listed under ``filings.files``. The arrays are kept as NumPy
+columns so a query is a couple of boolean masks and one argsort, and overflow
+pages are fetched only when a query's window reaches back into them.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import time
+from typing import Optional, Union
+
+import numpy as np
+
+DateLike = Union[str, datetime.date, np.datetime64]
+
+# Sorts undated filings after every dated one when ordering newest first.
+_UNDATED = np.iinfo(np.int64).min + 1
+
+
+def _day(value: DateLike) -> np.datetime64:
+    return np.datetime64(str(value)[:10], "D")
+
+
+class FilingsIndex:
+    """Filings as parallel NumPy arrays in submissions order."""
+
+    __slots__ = ("form", "filing_date", "accession", "primary_document", "description")
+
+    def __init__(self, form: np.ndarray, filing_date: np.ndarray, accession: np.ndarray,
+                 primary_document: np.ndarray, description: np.ndarray):
+        self.form = form
+        self.filing_date = filing_date
+        self.accession = accession
+        self.primary_document = primary_document
+        self.description = description
+
+    @classmethod
+    def from_columns(cls, columns: dict) -> "FilingsIndex":
+        """Build from a ``filings.recent`` object or an overflow page, truncated to the shortest required array."""
+        forms = columns.get("form", [])
+        dates = columns.get("filingDate", [])
+        accessions = columns.get("accessionNumber", [])
+        primary_docs = columns.get("primaryDocument", [])
+        descriptions = columns.get("primaryDocDescription", [])
+        length = min(len(forms), len(dates), len(accessions), len(primary_docs))
+        descriptions = list(descriptions[:length]) + [""] * (length - len(descriptions))
+        return cls(
+            np.array(forms[:length], dtype=str),
+            np.array([d or "NaT" for d in dates[:length]], dtype="datetime64[D]"),
+            np.array(accessions[:length], dtype=str),
+            np.array(primary_docs[:length], dtype=str),
+            np.array(descriptions, dtype=str),
+        )
+
+    def __len__(self) -> int:
+        return len(self.form)
+
+    def concat(self, other: "FilingsIndex") -> "FilingsIndex":
+        return FilingsIndex(*(np.concatenate((getattr(self, name), getattr(other, name)))
+                              for name in self.__slots__))
+
+    def query(self, forms: Optional[list[str]] = None, since: Optional[DateLike] = None,
+              until: Optional[DateLike] = None) -> np.ndarray:
+        """Positions of filings matching every given filter, newest first (ties keep submissions order).
+
+        ``since`` and ``until`` are inclusive filing dates; undated filings only
+        match when neither is given.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if forms is not None:
+            mask &= np.isin(self.form, forms)
+        if since is not None:
+            mask &= self.filing_date >= _day(since)
+        if until is not None:
+            mask &= self.filing_date <= _day(until)
+        positions = np.flatnonzero(mask)
+        days = self.filing_date[positions].astype(np.int64)
+        days[np.isnat(self.filing_date[positions])] = _UNDATED
+        return positions[np.argsort(-days, kind="stable")]
+
+    def records(self, positions: np.ndarray, cik: str, company_name: str) -> list[dict]:
+        """Filing dicts in the shape ``get_filings`` returns."""
+        cik_path = cik.lstrip("0")
+        results = []
+        for i in positions:
+            accession = str(self.accession[i])
+            primary_document = str(self.primary_document[i])
+            results.append({
+                "form_type": str(self.form[i]),
+                "filing_date": "" if np.isnat(self.filing_date[i]) else str(self.filing_date[i]),
+                "accession_number": accession,
+                "primary_document": primary_document,
+                "description": str(self.description[i]),
+                "filing_url": (
+                    f"https://www.sec.gov/Archives/edgar/data/"
+                    f"{cik_path}/{accession.replace('-', '')}/{primary_document}"
+                ),
+                "company_name": company_name,
+            })
+        return results
+
+
+class CompanyFilings:
+    """One company's loaded filings plus the overflow pages not fetched yet."""
+
+    def __init__(self, submissions: dict):
+        filings = submissions.get("filings", {})
+        self.company_name = submissions.get("name", "")
+        self.index = FilingsIndex.from_columns(filings.get("recent", {}))
+        self.pending_pages = [page for page in filings.get("files", []) if page.get("name")]
+        self.fetched_at = time.monotonic()
+        # Serializes overflow-page loading between concurrent queries
+        self.lock = asyncio.Lock()
+
+    def next_page(self, since: Optional[DateLike], until: Optional[DateLike],
+                  newer_than: Optional[np.datetime64] = None) -> Optional[dict]:
+        """The first pending page that could hold matches, or None.
+
+        A page is skipped when its date range falls outside ``since``/``until``
+        or ends before ``newer_than``, the date of the oldest result the query
+        would keep.
+        """
+        for page in self.pending_pages:
+            page_from = page.get("filingFrom")
+            page_to = page.get("filingTo")
+            if since is not None and page_to and _day(page_to) < _day(since):
+                continue
+            if until is not None and page_from and _day(page_from) > _day(until):
+                continue
+            if newer_than is not None and page_to and _day(page_to) < newer_than:
+                continue
+            return page
+        return None
+
+    def add_page(self, page: dict, columns: dict) -> None:
+        self.index = self.index.concat(FilingsIndex.from_columns(columns))
+        self.pending_pages.remove(page)
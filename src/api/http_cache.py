@@ -0,0 +1,202 @@
+# src/api/http_cache.py
+"""Disk-backed HTTP response cache for the upstream API clients.
+
+``CacheTransport`` sits above ``RetryingTransport``: fresh hits never touch the
+network or the rate limiter, and stale entries carrying an ``ETag`` or
+``Last-Modified`` validator are revalidated with a conditional request, so an
+unchanged resource costs a 304 instead of a full download. Only GET requests
+matching a configured host/path rule are cached, each rule with its own TTL.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# (host, path prefix, TTL seconds). CT.gov and openFDA refresh daily at most;
+# SEC submissions change whenever a filing lands, so they expire sooner.
+# XBRL companyfacts is deliberately absent: cached bodies are read whole, and
+# those documents run to tens of MB, so they are always streamed from SEC.
+DEFAULT_CACHE_RULES = (
+    ("clinicaltrials.gov", "/api/v2/studies", 12 * 3600),
+    ("api.fda.gov", "/", 24 * 3600),
+    ("www.sec.gov", "/files/company_tickers.json", 24 * 3600),
+    ("data.sec.gov", "/submissions/", 6 * 3600),
+    ("data.sec.gov", "/api/xbrl/companyconcept/", 24 * 3600),
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# openFDA answers 404 for searches with no matches; those are as cacheable as hits.
+CACHEABLE_STATUSES = frozenset({200, 404})
+# Query parameters that identify the caller rather than the resource.
+IGNORED_PARAMS = frozenset({"api_key"})
+# Bodies are stored decoded, so encoding and framing headers no longer apply.
+DROPPED_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection"})
+
+
+class HTTPCache:
+    """SQLite store of response bodies keyed by request, evicted least recently used past ``max_bytes``."""
+
+    def __init__(self, path: str = "./http_cache.db", max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT status, headers, body, expires_at, etag, last_modified FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        status, headers, body, expires_at, etag, last_modified = row
+        return {
+            "status": status,
+            "headers": json.loads(headers),
+            "body": body,
+            "expires_at": expires_at,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    def put(self, key: str, status: int, headers: list, body: bytes, ttl: float) -> None:
+        header_map = {name.lower(): value for name, value in headers}
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, status, headers, body, size, expires_at, etag, last_modified, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, status, json.dumps(headers), body, len(body), now + ttl,
+                 header_map.get("etag"), header_map.get("last-modified"), now),
+            )
+            self._evict()
+
+    def refresh(self, key: str, ttl: float) -> None:
+        """Extend a revalidated entry's lifetime."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET expires_at = ?, last_access = ? WHERE key = ?", (now + ttl, now, key),
+            )
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                return
+
+
+def cache_key(request: httpx.Request) -> str:
+    """Hash of method and URL with caller credentials removed, so keys never hold API keys."""
+    params = sorted((k, v) for k, v in request.url.params.multi_items() if k not in IGNORED_PARAMS)
+    url = request.url.copy_with(query=None)
+    return hashlib.sha256(json.dumps([request.method, str(url), params]).encode()).hexdigest()
+
+
+class CacheTransport(httpx.AsyncBaseTransport):
+    """Serves matching GETs from an ``HTTPCache``, revalidating stale entries when possible."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, cache: HTTPCache, rules: tuple = DEFAULT_CACHE_RULES):
+        self._transport = transport
+        self._cache = cache
+        self._rules = rules
+
+    def ttl_for(self, request: httpx.Request) -> Optional[float]:
+        if request.method != "GET":
+            return None
+        for host, prefix, ttl in self._rules:
+            if request.url.host == host and request.url.path.startswith(prefix):
+                return ttl
+        return None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        ttl = self.ttl_for(request)
+        if ttl is None:
+            return await self._transport.handle_async_request(request)
+
+        key = cache_key(request)
+        entry = await asyncio.to_thread(self._cache.get, key)
+        if entry is not None and entry["expires_at"] > time.time():
+            return self._cached_response(request, entry, "HIT")
+
+        if entry is not None:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = await self._transport.handle_async_request(request)
+        if response.status_code == 304 and entry is not None:
+            await response.aclose()
+            await asyncio.to_thread(self._cache.refresh, key, ttl)
+            return self._cached_response(request, entry, "REVALIDATED")
+        if response.status_code not in CACHEABLE_STATUSES:
+            return response
+
+        body = await response.aread()
+        await response.aclose()
+        headers = [(name, value) for name, value in response.headers.items()
+                   if name.lower() not in DROPPED_HEADERS]
+        try:
+            await asyncio.to_thread(self._cache.put, key, response.status_code, headers, body, ttl)
+        except sqlite3.Error as e:
+            logger.warning("HTTP cache write failed for %s: %s", request.url.host, e)
+        return httpx.Response(
+            response.status_code, headers=headers + [("X-Cache", "MISS")], content=body,
+            request=request, extensions=response.extensions,
+        )
+
+    @staticmethod
+    def _cached_response(request: httpx.Request, entry: dict, cache_status: str) -> httpx.Response:
+        return httpx.Response(
+            entry["status"], headers=entry["headers"] + [["X-Cache", cache_status]],
+            content=entry["body"], request=request,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
@@ -0,0 +1,284 @@
+# src/api/market_data.py
+"""Market data with TTL caching, batched refresh and a pluggable backend.
+
+Quotes go stale in minutes and fundamentals in about a day, so the two are
+fetched and cached separately: a report for a ticker seen recently needs at most
+one quote refresh, and valuation ratios are recomputed from the fresh price and
+the cached fundamentals. Stale tickers are refreshed in one batched backend call
+on a process-wide worker pool, since backends (yfinance) are blocking. Reports
+asking for a ticker that is already being fetched wait for that fetch, and
+tickers the backend has no data for are remembered briefly as missing.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+QUOTE_TTL_SECONDS = 300
+FUNDAMENTALS_TTL_SECONDS = 24 * 3600
+# Tickers the backend returned nothing for are not re-queried until this passes.
+MISSING_TTL_SECONDS = 300
+MARKET_DATA_WORKERS = 4
+# Tickers kept per cache; expired entries are swept first, then the oldest.
+MAX_CACHED_TICKERS = 1024
+
+# Fields of the merged market-data dict, as rendered by Chunker.chunk_company_financials
+FUNDAMENTAL_FIELDS = (
+    "total_revenue", "revenue_growth", "gross_margins", "operating_margins", "total_cash",
+    "total_debt", "free_cash_flow", "sector", "industry", "full_time_employees", "beta",
+)
+
+
+class MarketDataBackend(ABC):
+    """Blocking source of market data. Implementations receive batches of upper-case tickers.
+
+    ``fetch_quotes`` returns ``{ticker: {"price", "fifty_two_week_high",
+    "fifty_two_week_low"}}``; ``fetch_fundamentals`` returns ``{ticker: {...}}``
+    with ``FUNDAMENTAL_FIELDS`` plus ``shares_outstanding``, ``trailing_eps``,
+    ``forward_eps`` and ``book_value`` for recomputing ratios. Tickers without
+    data are omitted.
+    """
+
+    @abstractmethod
+    def fetch_quotes(self, tickers: list[str]) -> dict[str, dict]:
+        ...
+
+    @abstractmethod
+    def fetch_fundamentals(self, tickers: list[str]) -> dict[str, dict]:
+        ...
+
+
+class YFinanceBackend(MarketDataBackend):
+    """Yahoo Finance via yfinance: one batched price download for quotes, ``.info`` for fundamentals."""
+
+    def fetch_quotes(self, tickers: list[str]) -> dict[str, dict]:
+        try:
+            import yfinance as yf
+        except ImportError:
+            return {}
+
+        history = yf.download(
+            tickers, period="1y", interval="1d", group_by="ticker", progress=False, threads=False,
+        )
+        quotes = {}
+        for ticker in tickers:
+            try:
+                # Columns are (ticker, field) pairs except for some single-ticker downloads
+                frame = history[ticker] if history.columns.nlevels > 1 else history
+                closes = frame["Close"].dropna()
+            except KeyError:
+                continue
+            if closes.empty:
+                continue
+            quotes[ticker] = {
+                "price": float(closes.iloc[-1]),
+                "fifty_two_week_high": float(frame["High"].max()),
+                "fifty_two_week_low": float(frame["Low"].min()),
+            }
+        return quotes
+
+    def fetch_fundamentals(self, tickers: list[str]) -> dict[str, dict]:
+        try:
+            import yfinance as yf
+        except ImportError:
+            return {}
+
+        batch = yf.Tickers(" ".join(tickers))
+        fundamentals = {}
+        for ticker in tickers:
+            try:
+                info = batch.tickers[ticker].info
+            except Exception as e:
+                logger.warning("yfinance fundamentals failed for %s: %s", ticker, e)
+                continue
+            if not info:
+                continue
+            fundamentals[ticker] = {
+                "total_revenue": info.get("totalRevenue"),
+                "revenue_growth": info.get("revenueGrowth"),
+                "gross_margins": info.get("grossMargins"),
+                "operating_margins": info.get("operatingMargins"),
+                "total_cash": info.get("totalCash"),
+                "total_debt": info.get("totalDebt"),
+                "free_cash_flow": info.get("freeCashflow"),
+                "sector": info.get("sector"),
+                "industry": info.get("industry"),
+                "full_time_employees": info.get("fullTimeEmployees"),
+                "beta": info.get("beta"),
+                "shares_outstanding": info.get("sharesOutstanding"),
+                "trailing_eps": info.get("trailingEps"),
+                "forward_eps": info.get("forwardEps"),
+                "book_value": info.get("bookValue"),
+            }
+        return fundamentals
+
+
+class _TTLCache:
+    """Thread-safe TTL cache that drops expired entries and caps its size."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = MAX_CACHED_TICKERS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Insertion-ordered and re-inserted on every put, so the front is the oldest
+        self._entries: dict[str, tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put_many(self, values: dict[str, dict], ttl_seconds: Optional[float] = None) -> None:
+        now = time.monotonic()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            for key, value in values.items():
+                self._entries.pop(key, None)
+                self._entries[key] = (expires_at, value)
+            if len(self._entries) > self.max_entries:
+                for key in [k for k, (expiry, _) in self._entries.items() if expiry <= now]:
+                    del self._entries[key]
+                while len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def _ratio(numerator, denominator) -> Optional[float]:
+    if numerator is None or not denominator or denominator <= 0:
+        return None
+    return numerator / denominator
+
+
+class MarketDataService:
+    """Process-wide market data access with per-kind TTL caches and batched refresh."""
+
+    def __init__(self, backend: Optional[MarketDataBackend] = None, max_workers: int = MARKET_DATA_WORKERS,
+                 quote_ttl: float = QUOTE_TTL_SECONDS, fundamentals_ttl: float = FUNDAMENTALS_TTL_SECONDS,
+                 missing_ttl: float = MISSING_TTL_SECONDS):
+        self._backend = backend or YFinanceBackend()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="market-data")
+        self._quotes = _TTLCache(quote_ttl)
+        self._fundamentals = _TTLCache(fundamentals_ttl)
+        self._missing_ttl = missing_ttl
+        # (backend method name, ticker) -> fetch in progress; concurrent.futures so any loop can wait on it
+        self._inflight: dict[tuple[str, str], Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    async def get(self, ticker: str) -> Optional[dict]:
+        """Market data for one ticker, or None when no quote is available."""
+        return (await self.get_many([ticker])).get(ticker.upper().strip())
+
+    async def get_many(self, tickers: list[str]) -> dict[str, dict]:
+        """Market data keyed by upper-case ticker; only stale tickers hit the backend, in one batch per kind."""
+        tickers = list(dict.fromkeys(t.upper().strip() for t in tickers if t and t.strip()))
+        await self._refresh(tickers)
+        results = {}
+        for ticker in tickers:
+            data = self._merge(ticker)
+            if data is not None:
+                results[ticker] = data
+        return results
+
+    async def refresh(self, tickers: Optional[list[str]] = None) -> None:
+        """Re-fetch stale entries for ``tickers`` (default: every cached ticker), e.g. from a warm-up task."""
+        await self._refresh(tickers if tickers is not None else self._quotes.keys())
+
+    async def _refresh(self, tickers: list[str]) -> None:
+        stale_quotes = [t for t in tickers if self._quotes.get(t) is None]
+        stale_fundamentals = [t for t in tickers if self._fundamentals.get(t) is None]
+        await asyncio.gather(
+            self._fetch(self._backend.fetch_quotes, stale_quotes, self._quotes),
+            self._fetch(self._backend.fetch_fundamentals, stale_fundamentals, self._fundamentals),
+        )
+
+    async def _fetch(self, fetch, tickers: list[str], cache: _TTLCache) -> None:
+        """Fetch ``tickers`` into ``cache``, joining fetches already in flight instead of repeating them."""
+        owned, joined = [], []
+        with self._inflight_lock:
+            for ticker in tickers:
+                key = (fetch.__name__, ticker)
+                future = self._inflight.get(key)
+                if future is None:
+                    self._inflight[key] = Future()
+                    owned.append(ticker)
+                else:
+                    joined.append(future)
+
+        if owned:
+            try:
+                loop = asyncio.get_running_loop()
+                values = await loop.run_in_executor(self._executor, fetch, owned)
+            except Exception as e:
+                logger.warning("Market data %s failed for %s: %s", fetch.__name__, ",".join(owned), e)
+            else:
+                cache.put_many(values)
+                # Empty entries read as "no data" without going back to the backend
+                cache.put_many({t: {} for t in owned if t not in values}, ttl_seconds=self._missing_ttl)
+            finally:
+                with self._inflight_lock:
+                    for ticker in owned:
+                        self._inflight.pop((fetch.__name__, ticker)).set_result(None)
+
+        for future in joined:
+            # Shielded: a cancelled waiter must not cancel the fetch other reports share
+            await asyncio.shield(asyncio.wrap_future(future))
+
+    def _merge(self, ticker: str) -> Optional[dict]:
+        quote = self._quotes.get(ticker)
+        if not quote or quote.get("price") is None or not math.isfinite(quote["price"]):
+            return None
+        fundamentals = self._fundamentals.get(ticker) or {}
+        price = quote["price"]
+        shares = fundamentals.get("shares_outstanding")
+        market_cap = price * shares if shares else None
+        enterprise_value = None
+        if market_cap is not None:
+            enterprise_value = market_cap + (fundamentals.get("total_debt") or 0) - (fundamentals.get("total_cash") or 0)
+        return {
+            "ticker": ticker,
+            "current_price": price,
+            "market_cap": market_cap,
+            "enterprise_value": enterprise_value,
+            "trailing_pe": _ratio(price, fundamentals.get("trailing_eps")),
+            "forward_pe": _ratio(price, fundamentals.get("forward_eps")),
+            "price_to_book": _ratio(price, fundamentals.get("book_value")),
+            "fifty_two_week_high": quote.get("fifty_two_week_high"),
+            "fifty_two_week_low": quote.get("fifty_two_week_low"),
+            **{field: fundamentals.get(field) for field in FUNDAMENTAL_FIELDS},
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+_DEFAULT_SERVICE: Optional[MarketDataService] = None
+_DEFAULT_SERVICE_LOCK = threading.Lock()
+
+
+def default_market_data_service() -> MarketDataService:
+    """The process-wide service used by clients that aren't given one."""
+    global _DEFAULT_SERVICE
+    with _DEFAULT_SERVICE_LOCK:
+        if _DEFAULT_SERVICE is None:
+            _DEFAULT_SERVICE = MarketDataService()
+        return _DEFAULT_SERVICE
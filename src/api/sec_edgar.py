@@ -2,200 +2,216 @@
 from __future__ import annotations
 
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
+from collections import OrderedDict
 from typing import Optional
 
 import httpx
 
-_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+from src.api.filings_index import CompanyFilings, DateLike
+from src.api.http_cache import HTTPCache
+from src.api.market_data import MarketDataService, default_market_data_service
+from src.api.ticker_index import TickerIndex
+from src.api.transport import build_transport
+from src.api.xbrl import XBRL_CONCEPTS, extract_facts, latest_annual, read_company_facts
+
+logger = logging.getLogger(__name__)
+
+# SEC refreshes company_tickers.json daily; an older index is still served while
+# a fresh one is fetched in the background.
+TICKER_INDEX_MAX_AGE = 24 * 3600
+
+# Parsed submissions are reused for repeat queries until this old; SEC updates
+# them as filings are accepted.
+FILINGS_INDEX_MAX_AGE = 3600
+FILINGS_INDEX_MAX_COMPANIES = 64
+
+# "companyfacts" downloads every fact a company has filed in one document;
+# "concept" requests just the mapped concepts from the per-concept endpoint.
+FACTS_MODES = ("companyfacts", "concept")
 
 
 class SECEdgarClient:
-    """Async client for SEC EDGAR filings and yfinance market data."""
+    """Async client for SEC EDGAR filings and market data."""
 
     TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
     SUBMISSIONS_URL = "https://data.sec.gov/submissions/CIK{cik}.json"
+    SUBMISSIONS_PAGE_URL = "https://data.sec.gov/submissions/{name}"
     COMPANY_FACTS_URL = "https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json"
+    COMPANY_CONCEPT_URL = "https://data.sec.gov/api/xbrl/companyconcept/CIK{cik}/{taxonomy}/{concept}.json"
 
-    def __init__(self, user_agent: Optional[str] = None):
+    def __init__(self, user_agent: Optional[str] = None, http_cache: Optional[HTTPCache] = None,
+                 ticker_index_path: Optional[str] = None, facts_mode: str = "companyfacts",
+                 market_data: Optional[MarketDataService] = None):
+        if facts_mode not in FACTS_MODES:
+            raise ValueError(f"facts_mode must be one of {FACTS_MODES}, got {facts_mode!r}")
         ua = user_agent or "Pharma DD Chatbot contact@example.com"
         self._client = httpx.AsyncClient(
             timeout=30.0,
+            transport=build_transport(http_cache),
             headers={"User-Agent": ua, "Accept-Encoding": "gzip, deflate"},
         )
-        self._tickers_cache: Optional[dict] = None
+        self._ticker_index_path = ticker_index_path
+        self._facts_mode = facts_mode
+        self._ticker_index: Optional[TickerIndex] = None
+        self._ticker_refresh: Optional[asyncio.Task] = None
+        self._filings: OrderedDict[str, CompanyFilings] = OrderedDict()
+        self._market_data = market_data or default_market_data_service()
+
+    async def _load_ticker_index(self) -> TickerIndex:
+        """The ticker index, loaded from disk on first use and fetched only when none is saved.
+
+        A stale index is returned as-is while a refresh runs in the background.
+        """
+        if self._ticker_index is None and self._ticker_index_path:
+            # No max_age: any saved index beats blocking the first lookup on the download
+            self._ticker_index = await asyncio.to_thread(TickerIndex.load, self._ticker_index_path)
+        if self._ticker_index is None:
+            return await asyncio.shield(self._start_ticker_refresh())
+        if self._ticker_index.is_stale(TICKER_INDEX_MAX_AGE):
+            self._start_ticker_refresh()
+        return self._ticker_index
+
+    async def warm_ticker_index(self) -> None:
+        """Load or fetch the ticker index ahead of the first lookup, e.g. at process start."""
+        try:
+            await self._load_ticker_index()
+        except Exception as e:
+            # Not just HTTP errors: a malformed download must not go unnoticed either
+            logger.warning("Ticker index warm-up failed: %s", e)
+
+    def _start_ticker_refresh(self) -> asyncio.Task:
+        """Start fetching a fresh index unless a fetch is already running; concurrent callers share it."""
+        if self._ticker_refresh is None or self._ticker_refresh.done():
+            self._ticker_refresh = asyncio.create_task(self._refresh_ticker_index())
+            if self._ticker_index is not None:
+                self._ticker_refresh.add_done_callback(self._log_refresh_failure)
+        return self._ticker_refresh
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background ticker index refresh failed: %s", task.exception())
 
-    async def _load_tickers(self) -> dict:
-        if self._tickers_cache is not None:
-            return self._tickers_cache
+    async def _refresh_ticker_index(self) -> TickerIndex:
         response = await self._client.get(self.TICKERS_URL)
         response.raise_for_status()
-        self._tickers_cache = response.json()
-        return self._tickers_cache
+        index = await asyncio.to_thread(TickerIndex.from_sec_json, response.json())
+        self._ticker_index = index
+        if self._ticker_index_path:
+            try:
+                await asyncio.to_thread(index.save, self._ticker_index_path)
+            except OSError as e:
+                logger.warning("Could not persist ticker index to %s: %s", self._ticker_index_path, e)
+        return index
 
     async def lookup_company(self, query: str) -> Optional[dict]:
         """Find a company by ticker or name. Returns {cik, ticker, name} or None."""
-        tickers = await self._load_tickers()
-        query_upper = query.upper().strip()
-        query_lower = query.lower().strip()
-
-        # Pass 1: exact ticker match
-        for entry in tickers.values():
-            if entry.get("ticker", "").upper() == query_upper:
-                cik = str(entry["cik_str"]).zfill(10)
-                return {"cik": cik, "ticker": entry["ticker"], "name": entry["title"]}
-
-        # Pass 2: company name contains query
-        for entry in tickers.values():
-            if query_lower in entry.get("title", "").lower():
-                cik = str(entry["cik_str"]).zfill(10)
-                return {"cik": cik, "ticker": entry["ticker"], "name": entry["title"]}
-
-        return None
-
-    async def get_filings(self, cik: str, filing_types: list[str] = None,
-                          limit: int = 10) -> list[dict]:
-        """Get recent filings for a CIK. Filters to 10-K, 10-Q, 8-K by default."""
+        index = await self._load_ticker_index()
+        return index.lookup(query)
+
+    async def get_filings(self, cik: str, filing_types: list[str] = None, limit: Optional[int] = 10,
+                          since: Optional[DateLike] = None, until: Optional[DateLike] = None) -> list[dict]:
+        """Get a CIK's filings, newest first. Filters to 10-K, 10-Q, 8-K by default.
+
+        ``since``/``until`` bound the filing date (inclusive) and ``limit=None``
+        returns every match; a ``limit`` of zero or less returns none. Older
+        overflow pages of the filing history are fetched only when the recent
+        filings can't fill the request.
+        """
+        if limit is not None and limit <= 0:
+            return []
         if filing_types is None:
             filing_types = ["10-K", "10-Q", "8-K"]
-
-        url = self.SUBMISSIONS_URL.format(cik=cik.zfill(10))
+        cik = cik.zfill(10)
+        filings = await self._company_filings(cik)
+
+        async with filings.lock:
+            while True:
+                matches = filings.index.query(filing_types, since, until)
+                if limit is not None and len(matches) >= limit:
+                    page = filings.next_page(since, until, filings.index.filing_date[matches[limit - 1]])
+                else:
+                    page = filings.next_page(since, until)
+                if page is None:
+                    break
+                try:
+                    columns = await self._get_json(self.SUBMISSIONS_PAGE_URL.format(name=page["name"]))
+                except httpx.HTTPError as e:
+                    logger.warning("Could not load filings page %s: %s", page["name"], e)
+                    break
+                filings.add_page(page, columns)
+
+        return filings.index.records(matches[:limit], cik, filings.company_name)
+
+    async def _company_filings(self, cik: str) -> CompanyFilings:
+        """Parsed submissions for a zero-padded CIK, reused until ``FILINGS_INDEX_MAX_AGE``."""
+        filings = self._filings.get(cik)
+        if filings is None or time.monotonic() - filings.fetched_at > FILINGS_INDEX_MAX_AGE:
+            filings = CompanyFilings(await self._get_json(self.SUBMISSIONS_URL.format(cik=cik)))
+            self._filings[cik] = filings
+            if len(self._filings) > FILINGS_INDEX_MAX_COMPANIES:
+                self._filings.popitem(last=False)
+        self._filings.move_to_end(cik)
+        return filings
+
+    async def _get_json(self, url: str):
         response = await self._client.get(url)
         response.raise_for_status()
-        data = response.json()
-
-        company_name = data.get("name", "")
-        recent = data.get("filings", {}).get("recent", {})
-
-        forms = recent.get("form", [])
-        dates = recent.get("filingDate", [])
-        accessions = recent.get("accessionNumber", [])
-        primary_docs = recent.get("primaryDocument", [])
-        descriptions = recent.get("primaryDocDescription", [])
-
-        # Use the shortest array length to avoid index errors on malformed data
-        length = min(len(forms), len(dates), len(accessions), len(primary_docs))
-
-        results = []
-        for i in range(length):
-            if forms[i] not in filing_types:
-                continue
-            accession_clean = accessions[i].replace("-", "")
-            filing_url = (
-                f"https://www.sec.gov/Archives/edgar/data/"
-                f"{cik.lstrip('0')}/{accession_clean}/{primary_docs[i]}"
-            )
-            results.append({
-                "form_type": forms[i],
-                "filing_date": dates[i],
-                "accession_number": accessions[i],
-                "primary_document": primary_docs[i],
-                "description": descriptions[i] if i < len(descriptions) else "",
-                "filing_url": filing_url,
-                "company_name": company_name,
-            })
-            if len(results) >= limit:
-                break
-
-        return results
+        return response.json()
 
     async def get_company_facts(self, cik: str) -> dict:
-        """Get XBRL financial facts: revenue, net income, assets, etc."""
+        """Get XBRL financial facts: revenue, net income, assets, etc.
+
+        Depending on ``facts_mode`` this reads one ``companyfacts`` document or
+        a handful of per-concept documents; the result is the same either way.
+        """
+        if self._facts_mode == "concept":
+            return await self._get_company_facts_by_concept(cik)
         url = self.COMPANY_FACTS_URL.format(cik=cik.zfill(10))
-        response = await self._client.get(url)
-        response.raise_for_status()
-        data = response.json()
-
-        company_name = data.get("entityName", "")
-        us_gaap = data.get("facts", {}).get("us-gaap", {})
-
-        def _latest_annual(concept_name: str) -> Optional[dict]:
-            concept = us_gaap.get(concept_name, {})
-            units = concept.get("units", {})
-            values = units.get("USD", units.get("USD/shares", units.get("shares", [])))
-            if not values:
-                return None
-            annual = [v for v in values if v.get("form") == "10-K"]
-            if not annual:
-                annual = values
-            annual.sort(key=lambda v: v.get("end", ""), reverse=True)
-            if annual:
-                return {"value": annual[0].get("val"), "period_end": annual[0].get("end"),
-                        "form": annual[0].get("form", "")}
-            return None
+        # Streamed, so only the wanted concepts are ever decoded and held in memory
+        async with self._client.stream("GET", url) as response:
+            response.raise_for_status()
+            company_name, us_gaap = await read_company_facts(response)
+        return extract_facts(company_name, us_gaap)
 
-        concepts = {
-            "revenue": ["Revenues", "RevenueFromContractWithCustomerExcludingAssessedTax",
-                        "SalesRevenueNet", "RevenueFromContractWithCustomerIncludingAssessedTax"],
-            "net_income": ["NetIncomeLoss", "ProfitLoss"],
-            "total_assets": ["Assets"],
-            "total_liabilities": ["Liabilities"],
-            "stockholders_equity": ["StockholdersEquity",
-                                    "StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest"],
-            "cash_and_equivalents": ["CashAndCashEquivalentsAtCarryingValue",
-                                     "CashCashEquivalentsAndShortTermInvestments"],
-            "total_debt": ["LongTermDebt", "LongTermDebtAndCapitalLeaseObligations"],
-            "research_and_development": ["ResearchAndDevelopmentExpense"],
-            "operating_income": ["OperatingIncomeLoss"],
-            "eps": ["EarningsPerShareDiluted", "EarningsPerShareBasic"],
-        }
-
-        facts = {"company_name": company_name}
-        for key, concept_names in concepts.items():
-            for name in concept_names:
-                result = _latest_annual(name)
-                if result is not None:
-                    facts[key] = result
-                    break
+    async def _get_company_facts_by_concept(self, cik: str) -> dict:
+        """Fetch each report field's concepts concurrently, trying alternate names in order.
 
-        return facts
+        Alternates are only requested when the preferred concept is missing or
+        has no usable values; the shared transport keeps this under SEC's rate limit.
+        """
+        cik = cik.zfill(10)
 
-    async def get_market_data(self, ticker: str) -> Optional[dict]:
-        """Fetch real-time market data from yfinance (runs in thread executor)."""
-        loop = asyncio.get_event_loop()
-        try:
-            return await loop.run_in_executor(_EXECUTOR, self._fetch_yfinance, ticker)
-        except Exception:
+        async def fetch_field(concept_names: list[str]) -> Optional[tuple[str, dict]]:
+            for name in concept_names:
+                concept = await self._get_concept(cik, name)
+                if concept is not None and latest_annual(concept) is not None:
+                    return name, concept
             return None
 
-    @staticmethod
-    def _fetch_yfinance(ticker: str) -> Optional[dict]:
-        try:
-            import yfinance as yf
-        except ImportError:
-            return None
+        results = await asyncio.gather(*(fetch_field(names) for names in XBRL_CONCEPTS.values()))
+        us_gaap = dict(result for result in results if result is not None)
+        company_name = next((c.get("entityName") for c in us_gaap.values() if c.get("entityName")), "")
+        return extract_facts(company_name, us_gaap)
 
-        try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            if not info or info.get("regularMarketPrice") is None:
-                return None
-            return {
-                "ticker": ticker.upper(),
-                "current_price": info.get("currentPrice") or info.get("regularMarketPrice"),
-                "market_cap": info.get("marketCap"),
-                "enterprise_value": info.get("enterpriseValue"),
-                "trailing_pe": info.get("trailingPE"),
-                "forward_pe": info.get("forwardPE"),
-                "price_to_book": info.get("priceToBook"),
-                "total_revenue": info.get("totalRevenue"),
-                "revenue_growth": info.get("revenueGrowth"),
-                "gross_margins": info.get("grossMargins"),
-                "operating_margins": info.get("operatingMargins"),
-                "total_cash": info.get("totalCash"),
-                "total_debt": info.get("totalDebt"),
-                "free_cash_flow": info.get("freeCashflow"),
-                "fifty_two_week_high": info.get("fiftyTwoWeekHigh"),
-                "fifty_two_week_low": info.get("fiftyTwoWeekLow"),
-                "sector": info.get("sector"),
-                "industry": info.get("industry"),
-                "full_time_employees": info.get("fullTimeEmployees"),
-                "beta": info.get("beta"),
-            }
-        except Exception:
+    async def _get_concept(self, cik: str, concept: str, taxonomy: str = "us-gaap") -> Optional[dict]:
+        """One concept's observations, or None when the company never reported it."""
+        url = self.COMPANY_CONCEPT_URL.format(cik=cik, taxonomy=taxonomy, concept=concept)
+        response = await self._client.get(url)
+        if response.status_code == 404:
             return None
+        response.raise_for_status()
+        return response.json()
+
+    async def get_market_data(self, ticker: str) -> Optional[dict]:
+        """Current quote and fundamentals for a ticker, served from the shared market data cache."""
+        return await self._market_data.get(ticker)
 
     async def close(self):
+        if self._ticker_refresh is not None and not self._ticker_refresh.done():
+            self._ticker_refresh.cancel()
         await self._client.aclose()
 
     async def __aenter__(self):
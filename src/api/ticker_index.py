@@ -0,0 +1,186 @@
+# src/api/ticker_index.py
+"""In-memory index over SEC ``company_tickers.json`` for company resolution.
+
+Lookups try, in order: exact ticker, exact normalized company name (legal
+suffixes like "Inc" and "Corp" dropped), then a ranked token search over an
+inverted index, falling back to fuzzy token matches for misspellings. Ties go to
+the entry listed first, which in the SEC file is the larger company.
+
+Saved indexes are gzipped column-oriented JSON holding the entries, each
+entry's normalized name and the postings; the exact-match dicts are cheap to
+rederive on load, so they are not stored.
+"""
+from __future__ import annotations
+
+import difflib
+import gzip
+import json
+import os
+import re
+import time
+from typing import Optional
+
+INDEX_VERSION = 2
+
+LEGAL_SUFFIXES = frozenset({
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited",
+    "plc", "llc", "lp", "sa", "ag", "nv", "se", "the",
+})
+# Applied to titles and queries alike, so either spelling finds the other.
+ABBREVIATIONS = {
+    "labs": "laboratories", "lab": "laboratories", "pharma": "pharmaceuticals",
+    "pharmaceutical": "pharmaceuticals", "intl": "international", "hldgs": "holdings",
+    "tech": "technologies", "technology": "technologies", "therapeutic": "therapeutics",
+}
+FUZZY_CUTOFF = 0.8
+MIN_PREFIX_LENGTH = 3
+
+
+def normalize_tokens(name: str) -> list[str]:
+    tokens = [ABBREVIATIONS.get(t, t) for t in re.sub(r"[^a-z0-9]+", " ", name.lower()).split()]
+    return [t for t in tokens if t not in LEGAL_SUFFIXES] or tokens
+
+
+class TickerIndex:
+    """Exact ticker and name dicts plus a token inverted index over SEC company tickers."""
+
+    def __init__(self, entries: list[tuple[str, str, str]], created_at: Optional[float] = None,
+                 _structures: Optional[dict] = None):
+        self.entries = entries
+        self.created_at = created_at if created_at is not None else time.time()
+        if _structures is None:
+            _structures = self._build(entries)
+        self._names: list[str] = _structures["names"]
+        self._postings: dict[str, list[int]] = _structures["postings"]
+        self._by_ticker: dict[str, int] = {}
+        self._by_name: dict[str, int] = {}
+        self._token_counts: list[int] = []
+        for i, ((_, ticker, _), name) in enumerate(zip(entries, self._names)):
+            self._by_ticker.setdefault(ticker.upper(), i)
+            self._by_name.setdefault(name, i)
+            self._token_counts.append(len(name.split()))
+        self._vocab_by_initial: dict[str, list[str]] = {}
+        for token in self._postings:
+            self._vocab_by_initial.setdefault(token[0], []).append(token)
+
+    @staticmethod
+    def _build(entries: list[tuple[str, str, str]]) -> dict:
+        names, postings = [], {}
+        for i, (_, _, title) in enumerate(entries):
+            tokens = normalize_tokens(title)
+            names.append(" ".join(tokens))
+            for token in dict.fromkeys(tokens):
+                postings.setdefault(token, []).append(i)
+        return {"names": names, "postings": postings}
+
+    @classmethod
+    def from_sec_json(cls, data: dict) -> "TickerIndex":
+        """Build from the ``company_tickers.json`` payload."""
+        return cls([
+            (str(entry["cik_str"]).zfill(10), entry.get("ticker", ""), entry.get("title", ""))
+            for entry in data.values()
+        ])
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def is_stale(self, max_age: float) -> bool:
+        return time.time() - self.created_at > max_age
+
+    def lookup(self, query: str) -> Optional[dict]:
+        """Resolve a ticker or company name to ``{cik, ticker, name}``, or None."""
+        query = query.strip()
+        if not query:
+            return None
+        i = self._by_ticker.get(query.upper())
+        if i is None:
+            tokens = normalize_tokens(query)
+            if not tokens:
+                return None
+            i = self._by_name.get(" ".join(tokens))
+            if i is None:
+                i = self._search(tokens)
+        if i is None:
+            return None
+        cik, ticker, title = self.entries[i]
+        return {"cik": cik, "ticker": ticker, "name": title}
+
+    def _search(self, tokens: list[str]) -> Optional[int]:
+        """Rank entries matching every query token (exactly, by prefix or fuzzily).
+
+        Score is the summed match quality over the entry's token count, so
+        "Pfizer" prefers "PFIZER INC" over "PFIZER BIOPHARMA HOLDINGS".
+        """
+        scores: Optional[dict[int, float]] = None
+        for token in tokens:
+            token_scores: dict[int, float] = {}
+            for candidate, quality in self._candidate_tokens(token):
+                for i in self._postings[candidate]:
+                    if quality > token_scores.get(i, 0.0):
+                        token_scores[i] = quality
+            if not token_scores:
+                return None
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {i: score + token_scores[i] for i, score in scores.items() if i in token_scores}
+                if not scores:
+                    return None
+        if not scores:
+            return None
+        return max(scores, key=lambda i: (scores[i] / self._token_counts[i], -i))
+
+    def _candidate_tokens(self, token: str) -> list[tuple[str, float]]:
+        if token in self._postings:
+            return [(token, 1.0)]
+        vocab = self._vocab_by_initial.get(token[0], [])
+        if len(token) >= MIN_PREFIX_LENGTH:
+            prefixed = [(t, 0.9) for t in vocab if t.startswith(token)]
+            if prefixed:
+                return prefixed
+        return [
+            (t, difflib.SequenceMatcher(None, token, t).ratio() * 0.8)
+            for t in difflib.get_close_matches(token, vocab, n=5, cutoff=FUZZY_CUTOFF)
+        ]
+
+    def save(self, path: str) -> None:
+        """Persist entries and built lookup structures atomically, so a cold start skips the rebuild."""
+        ciks, tickers, titles = zip(*self.entries) if self.entries else ((), (), ())
+        payload = {
+            "version": INDEX_VERSION,
+            "created_at": self.created_at,
+            "ciks": [int(cik) for cik in ciks],
+            "tickers": tickers,
+            "titles": titles,
+            "names": self._names,
+            "postings": self._postings,
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", compresslevel=6) as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, max_age: Optional[float] = None) -> Optional["TickerIndex"]:
+        """Load a saved index, or None when missing, unreadable, outdated or older than ``max_age``."""
+        try:
+            with gzip.open(path, "rt") as f:
+                data = json.load(f)
+        except (OSError, EOFError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return None
+        created_at = data.get("created_at", 0)
+        if max_age is not None and time.time() - created_at > max_age:
+            return None
+        try:
+            entries = [
+                (str(cik).zfill(10), ticker, title)
+                for cik, ticker, title in zip(data["ciks"], data["tickers"], data["titles"], strict=True)
+            ]
+            structures = {"names": data["names"], "postings": data["postings"]}
+            if len(structures["names"]) != len(entries):
+                return None
+            return cls(entries, created_at=created_at, _structures=structures)
+        except (KeyError, TypeError, ValueError):
+            return None
@@ -0,0 +1,299 @@
+# src/api/transport.py
+"""Shared httpx transport layer for the upstream API clients.
+
+All clients send over one keep-alive connection pool (``SharedPoolTransport``,
+HTTP/2 when ``h2`` is installed), so repeat requests to a host skip the TCP and
+TLS handshakes. Every client routes requests through ``RetryingTransport``, which takes a token
+from a per-host bucket before sending and retries throttled (429), unavailable
+(5xx) and dropped requests with jittered exponential backoff, honoring
+``Retry-After``. The buckets live in one process-wide ``RateLimiter`` so
+concurrent reports share each upstream's quota instead of each assuming it has
+the whole of it.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import email.utils
+import importlib.util
+import logging
+import random
+import threading
+import time
+import weakref
+from typing import Optional
+
+import httpx
+
+from src.api.http_cache import CacheTransport, HTTPCache
+
+logger = logging.getLogger(__name__)
+
+# (requests per second, burst) keyed by host suffix. SEC fair access allows
+# 10 req/s across all of sec.gov; openFDA allows 240 req/min per key;
+# ClinicalTrials.gov asks for about 50 req/min per client.
+HOST_RATE_LIMITS = {
+    "sec.gov": (10.0, 10),
+    "api.fda.gov": (4.0, 8),
+    "clinicaltrials.gov": (50 / 60, 10),
+}
+DEFAULT_RATE_LIMIT = (10.0, 10)
+
+# Keep-alive pool shared by every client on a loop. Report fan-out peaks around
+# a few dozen concurrent requests across three hosts.
+POOL_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=90.0)
+
+# Set by callers that want to hear about rate-limit waits in their task, e.g.
+# to keep a per-item timeout from counting time spent queued for a token.
+throttle_listener: contextvars.ContextVar = contextvars.ContextVar("throttle_listener", default=None)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_METHODS = frozenset({"GET", "HEAD"})
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+MAX_RETRY_AFTER = 60.0
+
+
+class TokenBucket:
+    """Token bucket that hands out send times, so waiting happens outside the lock.
+
+    Guarded by a threading lock rather than asyncio primitives: the Streamlit app
+    and the API server drive clients from more than one event loop.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning how many seconds the caller must wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class TransportMetrics:
+    """Per-host counters for requests, throttle waits and retries."""
+
+    FIELDS = ("requests", "throttled", "throttle_wait_seconds", "retries", "retry_wait_seconds", "gave_up")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: dict[str, dict] = {}
+
+    def record(self, host: str, **increments) -> None:
+        with self._lock:
+            counters = self._hosts.setdefault(host, dict.fromkeys(self.FIELDS, 0))
+            for name, value in increments.items():
+                counters[name] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                host: {name: round(value, 3) if isinstance(value, float) else value
+                       for name, value in counters.items()}
+                for host, counters in self._hosts.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+
+class RateLimiter:
+    """Per-host token buckets; hosts sharing a configured suffix share one bucket."""
+
+    def __init__(self, limits: Optional[dict] = None, default: tuple = DEFAULT_RATE_LIMIT,
+                 metrics: Optional[TransportMetrics] = None):
+        self._limits = HOST_RATE_LIMITS if limits is None else limits
+        self._default = default
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.metrics = metrics or TransportMetrics()
+
+    def bucket_for(self, host: str) -> TokenBucket:
+        key = next(
+            (suffix for suffix in self._limits if host == suffix or host.endswith("." + suffix)),
+            host,
+        )
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(*self._limits.get(key, self._default))
+                self._buckets[key] = bucket
+            return bucket
+
+    async def acquire(self, host: str) -> float:
+        """Wait for the host's next send slot; returns the seconds spent waiting."""
+        wait = self.bucket_for(host).reserve()
+        if wait > 0:
+            self.metrics.record(host, requests=1, throttled=1, throttle_wait_seconds=wait)
+            listener = throttle_listener.get()
+            if listener is not None:
+                listener(wait)
+            await asyncio.sleep(wait)
+        else:
+            self.metrics.record(host, requests=1)
+        return wait
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse ``Retry-After`` as delta-seconds or an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """Full-jitter exponential backoff for the given 0-based retry attempt."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class RetryingTransport(httpx.AsyncBaseTransport):
+    """Rate-limits each request per host and retries transient failures.
+
+    Only idempotent methods are retried. After ``max_retries`` the last response
+    is returned (so callers' ``raise_for_status`` still reports it) or the last
+    transport error is raised.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 limiter: Optional[RateLimiter] = None, max_retries: int = MAX_RETRIES,
+                 backoff_base: float = BACKOFF_BASE):
+        self._transport = transport or shared_pool()
+        self._limiter = limiter or default_rate_limiter()
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        # Host and path only: query strings can carry API keys
+        target = f"{host}{request.url.path}"
+        metrics = self._limiter.metrics
+        retryable = request.method in RETRY_METHODS
+        attempt = 0
+        while True:
+            await self._limiter.acquire(host)
+            try:
+                response = await self._transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                if not retryable or attempt >= self._max_retries:
+                    metrics.record(host, gave_up=1)
+                    raise
+                delay = backoff_delay(attempt, self._backoff_base)
+                logger.warning("%s %s failed (%s); retrying in %.2fs", request.method, target, e, delay)
+            else:
+                if response.status_code not in RETRY_STATUSES or not retryable:
+                    return response
+                if attempt >= self._max_retries:
+                    metrics.record(host, gave_up=1)
+                    return response
+                retry_after = _retry_after_seconds(response)
+                delay = (min(retry_after, MAX_RETRY_AFTER) if retry_after is not None
+                         else backoff_delay(attempt, self._backoff_base))
+                await response.aclose()
+                logger.warning("%s %s returned %d; retrying in %.2fs",
+                               request.method, target, response.status_code, delay)
+            metrics.record(host, retries=1, retry_wait_seconds=delay)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def http2_available() -> bool:
+    """httpx negotiates HTTP/2 only when the optional ``h2`` package is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class SharedPoolTransport(httpx.AsyncBaseTransport):
+    """Routes requests onto one keep-alive, HTTP/2-capable pool per event loop.
+
+    Connections belong to the loop that opened them, so pools are keyed by the
+    running loop; both entry points drive every client from one long-lived loop,
+    which makes this a single process-wide pool in practice. Closing a client
+    leaves the pool open for the others; ``close_pool`` tears it down, and both
+    entry points call it at shutdown.
+    """
+
+    def __init__(self, limits: httpx.Limits = POOL_LIMITS, http2: Optional[bool] = None):
+        self._limits = limits
+        self._http2 = http2_available() if http2 is None else http2
+        self._pools: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def pool(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                pool = httpx.AsyncHTTPTransport(http2=self._http2, limits=self._limits)
+                self._pools[loop] = pool
+            return pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.pool().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """No-op: the pool outlives any one client."""
+
+    async def close_pool(self) -> None:
+        """Close the current loop's pool, e.g. at application shutdown."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.pop(loop, None)
+        if pool is not None:
+            await pool.aclose()
+
+
+_SHARED_POOL: Optional[SharedPoolTransport] = None
+_DEFAULT_LIMITER: Optional[RateLimiter] = None
+_DEFAULT_LIMITER_LOCK = threading.Lock()
+
+
+def default_rate_limiter() -> RateLimiter:
+    """The process-wide limiter shared by every upstream client."""
+    global _DEFAULT_LIMITER
+    with _DEFAULT_LIMITER_LOCK:
+        if _DEFAULT_LIMITER is None:
+            _DEFAULT_LIMITER = RateLimiter()
+        return _DEFAULT_LIMITER
+
+
+def shared_pool() -> SharedPoolTransport:
+    """The process-wide connection pool shared by every upstream client."""
+    global _SHARED_POOL
+    with _DEFAULT_LIMITER_LOCK:
+        if _SHARED_POOL is None:
+            _SHARED_POOL = SharedPoolTransport()
+        return _SHARED_POOL
+
+
+def transport_metrics() -> dict:
+    """Snapshot of throttle and retry counters for the shared limiter, keyed by host."""
+    return default_rate_limiter().metrics.snapshot()
+
+
+def build_transport(http_cache: Optional[HTTPCache] = None) -> httpx.AsyncBaseTransport:
+    """Transport stack for an upstream client: optional response cache over rate limiting and retry."""
+    transport = RetryingTransport()
+    if http_cache is not None:
+        transport = CacheTransport(transport, http_cache)
+    return transport
@@ -0,0 +1,324 @@
+# src/api/xbrl.py
+"""Extraction of the XBRL concepts we report on from SEC ``companyfacts`` JSON.
+
+A large filer's ``companyfacts`` document runs to tens of megabytes, nearly
+all of it concepts we never read. The response is scanned as it streams in and
+only the wanted us-gaap concepts are decoded, so peak memory is about one
+concept and decode time scales with what we keep rather than the document size.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Optional
+
+import httpx
+import numpy as np
+
+# Report field -> us-gaap concept names, in order of preference.
+XBRL_CONCEPTS = {
+    "revenue": ["Revenues", "RevenueFromContractWithCustomerExcludingAssessedTax",
+                "SalesRevenueNet", "RevenueFromContractWithCustomerIncludingAssessedTax"],
+    "net_income": ["NetIncomeLoss", "ProfitLoss"],
+    "total_assets": ["Assets"],
+    "total_liabilities": ["Liabilities"],
+    "stockholders_equity": ["StockholdersEquity",
+                            "StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest"],
+    "cash_and_equivalents": ["CashAndCashEquivalentsAtCarryingValue",
+                             "CashCashEquivalentsAndShortTermInvestments"],
+    "total_debt": ["LongTermDebt", "LongTermDebtAndCapitalLeaseObligations"],
+    "research_and_development": ["ResearchAndDevelopmentExpense"],
+    "operating_income": ["OperatingIncomeLoss"],
+    "eps": ["EarningsPerShareDiluted", "EarningsPerShareBasic"],
+    "operating_cash_flow": ["NetCashProvidedByUsedInOperatingActivities",
+                            "NetCashProvidedByUsedInOperatingActivitiesContinuingOperations"],
+}
+WANTED_CONCEPTS = frozenset(name for names in XBRL_CONCEPTS.values() for name in names)
+
+# Top-level taxonomies under "facts"; concept names are only unique within one.
+TAXONOMIES = ("dei", "us-gaap", "ifrs-full", "srt", "invest")
+
+_STRUCTURE = re.compile(rb'[{}"]')
+_STRING_REST = re.compile(rb'(?:[^"\\]|\\.)*"', re.S)
+_JSON_STRING = re.compile(rb'"(?:[^"\\]|\\.)*"', re.S)
+
+
+class ConceptScanner:
+    """Incremental scanner pulling wanted us-gaap concepts out of a companyfacts byte stream.
+
+    Between wanted concepts it only runs a C-level regex search for the keys it
+    cares about (an exact ``"Name":`` can only be an object key, never string
+    content), so unwanted concepts are skipped without being decoded. Each wanted
+    concept is buffered until its closing brace and decoded on its own.
+    """
+
+    def __init__(self, wanted: frozenset = WANTED_CONCEPTS):
+        self._wanted = wanted
+        names = sorted({*wanted, *TAXONOMIES, "entityName"}, key=len, reverse=True)
+        self._keys = re.compile(rb'"(' + b"|".join(re.escape(n.encode()) for n in names) + rb')"\s*:\s*')
+        self._tail = max(len(n) for n in names) + 16
+        self._buffer = b""
+        self._taxonomy: Optional[str] = None
+        self._capture: Optional[tuple[str, int, int]] = None  # (concept, scan position, brace depth)
+        self.company_name = ""
+        self.concepts: dict = {}
+
+    def feed(self, chunk: bytes) -> None:
+        self._buffer += chunk
+        while self._scan_object() if self._capture is not None else self._seek():
+            pass
+
+    def finish(self) -> tuple[str, dict]:
+        if self._capture is not None:
+            raise ValueError(f"companyfacts document ended inside concept {self._capture[0]}")
+        return self.company_name, self.concepts
+
+    def _seek(self) -> bool:
+        """Advance to the next interesting key; False when more data is needed."""
+        buffer = self._buffer
+        match = self._keys.search(buffer)
+        if match is None:
+            self._buffer = buffer[-self._tail:]
+            return False
+        rest = match.end()
+        if rest == len(buffer):
+            self._buffer = buffer[match.start():]
+            return False
+        key = match.group(1).decode()
+        if key == "entityName":
+            value = _JSON_STRING.match(buffer, rest)
+            if value is None and buffer[rest:rest + 1] == b'"':
+                self._buffer = buffer[match.start():]
+                return False
+            if value is not None:
+                self.company_name = json.loads(value.group(0))
+                rest = value.end()
+        elif key in TAXONOMIES:
+            self._taxonomy = key
+        elif self._taxonomy == "us-gaap" and key in self._wanted and buffer[rest:rest + 1] == b"{":
+            self._capture = (key, 0, 0)
+        self._buffer = buffer[rest:]
+        return True
+
+    def _scan_object(self) -> bool:
+        """Find the end of the captured concept object; False when more data is needed."""
+        name, pos, depth = self._capture
+        buffer = self._buffer
+        while True:
+            match = _STRUCTURE.search(buffer, pos)
+            if match is None:
+                self._capture = (name, len(buffer), depth)
+                return False
+            if match.group() == b'"':
+                string_end = _STRING_REST.match(buffer, match.end())
+                if string_end is None:
+                    self._capture = (name, match.start(), depth)
+                    return False
+                pos = string_end.end()
+                continue
+            pos = match.end()
+            depth += 1 if match.group() == b"{" else -1
+            if depth == 0:
+                self.concepts[name] = json.loads(buffer[:pos])
+                self._buffer = buffer[pos:]
+                self._capture = None
+                return True
+
+
+async def read_company_facts(response: httpx.Response,
+                             wanted: frozenset = WANTED_CONCEPTS) -> tuple[str, dict]:
+    """Read ``(entityName, {concept: concept_json})`` for the wanted us-gaap concepts.
+
+    ``response`` should be unread (opened with ``client.stream``) so the body is
+    consumed chunk by chunk rather than buffered whole.
+    """
+    scanner = ConceptScanner(wanted)
+    async for chunk in response.aiter_bytes():
+        scanner.feed(chunk)
+    return scanner.finish()
+
+
+def _unit_values(concept: dict) -> list:
+    units = concept.get("units", {})
+    return units.get("USD", units.get("USD/shares", units.get("shares", [])))
+
+
+def latest_annual(concept: dict) -> Optional[dict]:
+    """Newest 10-K observation of a concept (or newest of any form when no 10-K exists)."""
+    values = _unit_values(concept)
+    if not values:
+        return None
+    annual = [v for v in values if v.get("form") == "10-K"]
+    if not annual:
+        annual = values
+    latest = max(annual, key=lambda v: v.get("end", ""))
+    return {"value": latest.get("val"), "period_end": latest.get("end"), "form": latest.get("form", "")}
+
+
+# Reporting-period lengths in days. 10-Q cash flow statements report
+# year-to-date durations, which fall between the two.
+ANNUAL_DAYS = (330, 400)
+QUARTER_DAYS = (80, 100)
+_NO_START = np.iinfo(np.int64).min
+
+
+class ConceptSeries:
+    """One concept's observations as parallel NumPy arrays, sorted by period end.
+
+    Each fiscal period appears once: a figure repeated in later filings (every
+    10-K restates prior years) keeps its most recently filed value. Instants
+    (balance-sheet items) have no ``start`` and a ``days`` of -1.
+    """
+
+    __slots__ = ("start", "end", "value", "form", "days")
+
+    def __init__(self, start: np.ndarray, end: np.ndarray, value: np.ndarray, form: np.ndarray):
+        self.start = start
+        self.end = end
+        self.value = value
+        self.form = form
+        has_start = start != _NO_START
+        self.days = np.full(len(end), -1, dtype=np.int64)
+        self.days[has_start] = end[has_start] - start[has_start]
+
+    @classmethod
+    def from_concept(cls, concept: dict) -> Optional["ConceptSeries"]:
+        values = [v for v in _unit_values(concept) if v.get("end") and v.get("val") is not None]
+        if not values:
+            return None
+        end = np.array([v["end"] for v in values], dtype="datetime64[D]").astype(np.int64)
+        start = np.array([v.get("start") or "NaT" for v in values], dtype="datetime64[D]").astype(np.int64)
+        filed = np.array([v.get("filed") or "NaT" for v in values], dtype="datetime64[D]").astype(np.int64)
+        value = np.array([v["val"] for v in values], dtype=np.float64)
+        form = np.array([v.get("form", "") for v in values], dtype="U8")
+
+        # Sort by period then filing date, and keep the last filing of each period
+        order = np.lexsort((filed, start, end))
+        end, start, value, form = end[order], start[order], value[order], form[order]
+        last = np.ones(len(end), dtype=bool)
+        last[:-1] = (end[1:] != end[:-1]) | (start[1:] != start[:-1])
+        return cls(start[last], end[last], value[last], form[last])
+
+    def __len__(self) -> int:
+        return len(self.end)
+
+    def _take(self, mask: np.ndarray) -> "ConceptSeries":
+        return ConceptSeries(self.start[mask], self.end[mask], self.value[mask], self.form[mask])
+
+    def annual(self) -> "ConceptSeries":
+        """Full-year durations, or 10-K balances for instant concepts."""
+        instant = self.days < 0
+        return self._take(
+            (self.days >= ANNUAL_DAYS[0]) & (self.days <= ANNUAL_DAYS[1])
+            | instant & (np.char.startswith(self.form, "10-K"))
+        )
+
+    def quarterly(self) -> "ConceptSeries":
+        """Three-month durations, or every period-end balance for instant concepts."""
+        return self._take((self.days >= QUARTER_DAYS[0]) & (self.days <= QUARTER_DAYS[1]) | (self.days < 0))
+
+    def year_to_date(self) -> "ConceptSeries":
+        return self._take((self.days > QUARTER_DAYS[1]) & (self.days < ANNUAL_DAYS[0]))
+
+    def latest(self) -> Optional[tuple[float, str]]:
+        if not len(self):
+            return None
+        return float(self.value[-1]), _date(self.end[-1])
+
+
+def _date(day: np.int64) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def yoy_growth(annual: ConceptSeries) -> np.ndarray:
+    """Growth over the prior fiscal year; NaN where the prior year is missing or zero."""
+    growth = np.full(len(annual), np.nan)
+    if len(annual) < 2:
+        return growth
+    prior, current = annual.value[:-1], annual.value[1:]
+    gap = np.diff(annual.end)
+    valid = (gap >= ANNUAL_DAYS[0]) & (gap <= ANNUAL_DAYS[1]) & (prior != 0)
+    growth[1:] = np.where(valid, (current - prior) / np.abs(np.where(prior == 0, 1, prior)), np.nan)
+    return growth
+
+
+def trailing_twelve_months(series: ConceptSeries) -> Optional[tuple[float, str]]:
+    """Trailing-twelve-month total of a flow concept, and the period it runs through.
+
+    Prefers the last four contiguous three-month quarters; otherwise rolls the
+    latest fiscal year forward with year-to-date filings (annual + YTD - prior
+    YTD), as 10-Q cash flow statements only report year-to-date; otherwise the
+    latest fiscal year.
+    """
+    annual = series.annual()
+    quarters = series.quarterly()
+    if len(quarters) >= 4:
+        last4 = quarters._take(np.arange(len(quarters) - 4, len(quarters)))
+        gaps = np.diff(last4.end)
+        contiguous = np.all((gaps >= QUARTER_DAYS[0]) & (gaps <= QUARTER_DAYS[1]))
+        if contiguous and (not len(annual) or last4.end[-1] >= annual.end[-1]):
+            return float(last4.value.sum()), _date(last4.end[-1])
+    if not len(annual):
+        return None
+    ytd = series.year_to_date()
+    if len(ytd) and ytd.end[-1] > annual.end[-1]:
+        # Prior-year YTD: same length, ending about a year earlier
+        match = (np.abs(ytd.end - (ytd.end[-1] - 365)) <= 7) & (np.abs(ytd.days - ytd.days[-1]) <= 7)
+        if match.any():
+            prior = ytd.value[match][-1]
+            return float(annual.value[-1] + ytd.value[-1] - prior), _date(ytd.end[-1])
+    return float(annual.value[-1]), _date(annual.end[-1])
+
+
+def trend_metrics(series: dict[str, ConceptSeries]) -> dict:
+    """Multi-year revenue growth, trailing R&D, cash burn and runway from concept series."""
+    trends = {}
+    revenue = series.get("revenue")
+    if revenue is not None:
+        annual = revenue.annual()
+        growth = yoy_growth(annual)
+        trends["revenue_history"] = [
+            {"period_end": _date(end), "value": float(value),
+             "yoy_growth": None if np.isnan(g) else round(float(g), 4)}
+            for end, value, g in zip(annual.end[-5:], annual.value[-5:], growth[-5:])
+        ]
+
+    for key, field in (("rd_ttm", "research_and_development"), ("operating_cash_flow_ttm", "operating_cash_flow"),
+                       ("net_income_ttm", "net_income")):
+        if series.get(field) is not None:
+            ttm = trailing_twelve_months(series[field])
+            if ttm is not None:
+                trends[key] = {"value": ttm[0], "period_end": ttm[1]}
+
+    # Burn is negative operating cash flow, or net loss when cash flow isn't reported
+    flow = trends.get("operating_cash_flow_ttm") or trends.get("net_income_ttm")
+    cash = series["cash_and_equivalents"].latest() if series.get("cash_and_equivalents") is not None else None
+    if flow is not None:
+        quarterly_burn = max(-flow["value"], 0.0) / 4
+        trends["quarterly_cash_burn"] = quarterly_burn
+        if cash is not None and quarterly_burn > 0:
+            trends["cash_runway_quarters"] = round(cash[0] / quarterly_burn, 1)
+            trends["cash_as_of"] = cash[1]
+    return trends
+
+
+def extract_facts(company_name: str, us_gaap: dict) -> dict:
+    """Map us-gaap concepts onto report fields, taking the first concept name with data.
+
+    Alongside each field's latest annual value, the chosen concepts' full
+    histories feed ``trends`` (see ``trend_metrics``).
+    """
+    facts = {"company_name": company_name}
+    series = {}
+    for key, concept_names in XBRL_CONCEPTS.items():
+        for name in concept_names:
+            concept = us_gaap.get(name, {})
+            result = latest_annual(concept)
+            if result is not None:
+                facts[key] = result
+                series[key] = ConceptSeries.from_concept(concept)
+                break
+    trends = trend_metrics(series)
+    if trends:
+        facts["trends"] = trends
+    return facts
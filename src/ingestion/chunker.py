@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+from typing import Iterator
+
 
 class Chunker:
+    """Turns source records into ``{"text", "metadata"}`` chunks, yielded lazily."""
+
     @staticmethod
-    def chunk_clinical_trial(trial: dict) -> list[dict]:
+    def chunk_clinical_trial(trial: dict) -> Iterator[dict]:
         outcomes_text = ""
         for outcome in trial.get("primary_outcomes", []):
             outcomes_text += f"  - {outcome.get('measure', 'N/A')} ({outcome.get('timeFrame', 'N/A')})\n"
@@ -13,6 +17,9 @@ class Chunker:
         phase = trial.get("phase", "N/A")
         status = trial.get("status", "Unknown")
         source_url = f"https://clinicaltrials.gov/study/{nct_id}"
+        # Whether the searched company runs the trial or only its drug is studied in it
+        matched_on = ", ".join(trial.get("matched_on", []))
+        matched_on_text = f"Matched On: {matched_on}\n" if matched_on else ""
         text = (
             f"Clinical Trial: {trial.get('title', 'Untitled')}\n"
             f"NCT ID: {nct_id}\n"
@@ -20,6 +27,7 @@ class Chunker:
             f"Phase: {phase}\n"
             f"Status: {status}\n"
             f"Sponsor: {sponsor}\n"
+            f"{matched_on_text}"
             f"Enrollment: {trial.get('enrollment', 'N/A')}\n"
             f"Conditions: {', '.join(trial.get('conditions', []))}\n"
             f"Interventions: {interventions_text}\n"
@@ -28,7 +36,7 @@ class Chunker:
             f"Primary Outcomes:\n{outcomes_text}"
             f"Summary: {trial.get('brief_summary', '')}"
         )
-        return [{"text": text, "metadata": {
+        yield {"text": text, "metadata": {
             "source": "clinicaltrials",
             "source_url": source_url,
             "nct_id": nct_id,
@@ -37,10 +45,10 @@ class Chunker:
             "phase": phase,
             "status": status,
             "date": trial.get("start_date", ""),
-        }}]
+        }}
 
     @staticmethod
-    def chunk_fda_approval(approval: dict) -> list[dict]:
+    def chunk_fda_approval(approval: dict) -> Iterator[dict]:
         products_text = ""
         for p in approval.get("products", []):
             ingredients = ", ".join(
@@ -76,17 +84,16 @@ class Chunker:
             f"Products:\n{products_text}"
             f"Submissions:\n{submissions_text}"
         )
-        return [{"text": text, "metadata": {
+        yield {"text": text, "metadata": {
             "source": "fda_approval",
             "source_url": source_url,
             "drug_name": approval.get("brand_name", "Unknown"),
             "company": approval.get("manufacturer", ""),
             "application_number": app_num,
-        }}]
+        }}
 
     @staticmethod
-    def chunk_fda_label(label: dict) -> list[dict]:
-        chunks = []
+    def chunk_fda_label(label: dict) -> Iterator[dict]:
         drug_name = label.get("brand_name", "Unknown")
         company = label.get("manufacturer", "")
         source_url = f"https://dailymed.nlm.nih.gov/dailymed/search.cfm?labeltype=all&query={drug_name.replace(' ', '+')}"
@@ -96,23 +103,25 @@ class Chunker:
             "warnings": label.get("warnings", ""),
             "adverse_reactions": label.get("adverse_reactions", ""),
         }
+        found = False
         for section_name, content in sections.items():
             if not content:
                 continue
+            found = True
             text = (
                 f"FDA Label - {drug_name} ({label.get('generic_name', '')}) "
                 f"- {section_name.replace('_', ' ').title()}\n"
                 f"Source: {source_url}\n\n{content}"
             )
-            chunks.append({"text": text, "metadata": {
+            yield {"text": text, "metadata": {
                 "source": "fda_label",
                 "source_url": source_url,
                 "drug_name": drug_name,
                 "company": company,
                 "section": section_name,
-            }})
-        if not chunks:
-            chunks = [{"text": (
+            }}
+        if not found:
+            yield {"text": (
                 f"FDA Label for {drug_name}: "
                 "No detailed label information available."
             ), "metadata": {
@@ -121,11 +130,10 @@ class Chunker:
                 "drug_name": drug_name,
                 "company": company,
                 "section": "summary",
-            }}]
-        return chunks
+            }}
 
     @staticmethod
-    def chunk_device_clearance(clearance: dict) -> list[dict]:
+    def chunk_device_clearance(clearance: dict) -> Iterator[dict]:
         k_number = clearance.get("k_number", "")
         source_url = f"https://www.accessdata.fda.gov/scripts/cdrh/cfdocs/cfpmn/pmn.cfm?ID={k_number}"
         decision_raw = clearance.get("decision_date", "")
@@ -144,16 +152,16 @@ class Chunker:
             f"Product Code: {clearance.get('product_code', '')}\n"
             f"Advisory Committee: {clearance.get('advisory_committee_description', '')}"
         )
-        return [{"text": text, "metadata": {
+        yield {"text": text, "metadata": {
             "source": "fda_device_clearance",
             "source_url": source_url,
             "device_name": clearance.get("device_name", ""),
             "company": clearance.get("applicant", ""),
             "clearance_number": k_number,
-        }}]
+        }}
 
     @staticmethod
-    def chunk_device_recalls(company: str, recalls: list[dict]) -> list[dict]:
+    def chunk_device_recalls(company: str, recalls: list[dict]) -> Iterator[dict]:
         source_url = "https://www.accessdata.fda.gov/scripts/cdrh/cfdocs/cfres/res.cfm"
         recall_lines = []
         for r in recalls:
@@ -168,15 +176,37 @@ class Chunker:
             f"Total Recalls: {len(recalls)}\n"
             + "\n".join(recall_lines)
         )
-        return [{"text": text, "metadata": {
+        yield {"text": text, "metadata": {
             "source": "fda_device_recall",
             "source_url": source_url,
             "company": company,
-        }}]
+        }}
 
     @staticmethod
-    def chunk_device_adverse_events(device_name: str, ae_summary: dict) -> list[dict]:
+    def chunk_device_adverse_events(device_name: str, ae_summary: dict) -> Iterator[dict]:
         source_url = "https://www.accessdata.fda.gov/scripts/cdrh/cfdocs/cfmaude/search.cfm"
+        if ae_summary.get("event_type_counts") is not None:
+            # Aggregated over every MAUDE report (openFDA count queries); narratives are fetched on demand
+            def _counts(counts: dict) -> str:
+                return ", ".join(f"{term}: {count:,}" for term, count in counts.items()) or "N/A"
+
+            text = (
+                f"MAUDE Adverse Events Summary for {device_name}\n"
+                f"Source: {source_url}\n"
+                f"Total MAUDE Reports: {ae_summary.get('total_reports', 0):,}\n"
+                f"Serious Reports (Death/Injury): {ae_summary.get('serious_count', 0):,}\n"
+                f"Reports by Event Type: {_counts(ae_summary['event_type_counts'])}\n"
+                f"Reports by Device Class: {_counts(ae_summary.get('device_class_counts') or {})}\n"
+                f"Top Product Codes: {_counts(ae_summary.get('product_code_counts') or {})}\n"
+                f"Reports Received by Year: {_counts(ae_summary.get('reports_by_year') or {})}"
+            )
+            yield {"text": text, "metadata": {
+                "source": "fda_device_events",
+                "source_url": source_url,
+                "device_name": device_name,
+            }}
+            return
+
         events_text = ""
         for i, event in enumerate(ae_summary.get("sample_events", []), 1):
             events_text += f"  {i}. {event}\n"
@@ -191,16 +221,33 @@ class Chunker:
             f"Total MAUDE Reports: {ae_summary.get('total_reports', 0):,}\n"
             f"Serious Reports (Death/Injury) in Sample: {ae_summary.get('serious_count', 0)}"
         )
-        return [{"text": text, "metadata": {
+        yield {"text": text, "metadata": {
             "source": "fda_device_events",
             "source_url": source_url,
             "device_name": device_name,
-        }}]
+        }}
 
     @staticmethod
-    def chunk_sec_filings(company_name: str, filings: list[dict]) -> list[dict]:
+    def chunk_device_event_narratives(device_name: str, narratives: list[str]) -> Iterator[dict]:
+        if not narratives:
+            return
+        source_url = "https://www.accessdata.fda.gov/scripts/cdrh/cfdocs/cfmaude/search.cfm"
+        events_text = "".join(f"  {i}. {event}\n" for i, event in enumerate(narratives, 1))
+        text = (
+            f"MAUDE Event Narratives for {device_name}\n"
+            f"Source: {source_url}\n"
+            f"Sample Event Narratives:\n{events_text}"
+        )
+        yield {"text": text, "metadata": {
+            "source": "fda_device_event_narratives",
+            "source_url": source_url,
+            "device_name": device_name,
+        }}
+
+    @staticmethod
+    def chunk_sec_filings(company_name: str, filings: list[dict]) -> Iterator[dict]:
         if not filings:
-            return []
+            return
         filing_lines = []
         for f in filings:
             filing_lines.append(
@@ -215,32 +262,31 @@ class Chunker:
             f"Recent Filings ({len(filings)}):\n"
             + "\n".join(filing_lines)
         )
-        return [{"text": text, "metadata": {
+        yield {"text": text, "metadata": {
             "source": "sec_filings",
             "source_url": source_url,
             "company": company_name,
-        }}]
+        }}
 
     @staticmethod
-    def chunk_company_financials(company_name: str, facts: dict, market_data: dict = None) -> list[dict]:
-        chunks = []
-
+    def chunk_company_financials(company_name: str, facts: dict, market_data: dict = None) -> Iterator[dict]:
         def _fmt_dollars(val_dict):
             if val_dict is None:
                 return "N/A"
             val = val_dict.get("value")
             period = val_dict.get("period_end", "")
+            suffix = f" (period ending {period})" if period else ""
             if val is None:
                 return "N/A"
             try:
                 val = float(val)
             except (TypeError, ValueError):
-                return f"{val} (period ending {period})"
+                return f"{val}{suffix}"
             if abs(val) >= 1_000_000_000:
-                return f"${val / 1_000_000_000:.2f}B (period ending {period})"
+                return f"${val / 1_000_000_000:.2f}B{suffix}"
             elif abs(val) >= 1_000_000:
-                return f"${val / 1_000_000:.1f}M (period ending {period})"
-            return f"${val:,.0f} (period ending {period})"
+                return f"${val / 1_000_000:.1f}M{suffix}"
+            return f"${val:,.0f}{suffix}"
 
         xbrl_lines = []
         for label, key in [
@@ -253,6 +299,7 @@ class Chunker:
             ("Total Debt", "total_debt"),
             ("R&D Expense", "research_and_development"),
             ("Operating Income", "operating_income"),
+            ("Operating Cash Flow", "operating_cash_flow"),
         ]:
             if key in facts:
                 xbrl_lines.append(f"  {label}: {_fmt_dollars(facts[key])}")
@@ -263,6 +310,33 @@ class Chunker:
             if eps_val is not None:
                 xbrl_lines.append(f"  EPS (Diluted): ${eps_val:.2f} (period ending {eps_period})")
 
+        trends = facts.get("trends") or {}
+        trend_lines = []
+        history = trends.get("revenue_history") or []
+        if len(history) > 1:
+            trend_lines.append("  Revenue by fiscal year:")
+            for point in history:
+                growth = point.get("yoy_growth")
+                growth_text = f" ({growth:+.1%} YoY)" if growth is not None else ""
+                trend_lines.append(f"    {_fmt_dollars(point)}{growth_text}")
+        for label, key in [
+            ("R&D Expense (trailing 12 months)", "rd_ttm"),
+            ("Operating Cash Flow (trailing 12 months)", "operating_cash_flow_ttm"),
+        ]:
+            if key in trends:
+                trend_lines.append(f"  {label}: {_fmt_dollars(trends[key])}")
+        if trends.get("quarterly_cash_burn") is not None:
+            burn = trends["quarterly_cash_burn"]
+            if burn > 0:
+                trend_lines.append(f"  Quarterly Cash Burn: {_fmt_dollars({'value': burn})}")
+            else:
+                trend_lines.append("  Quarterly Cash Burn: none (cash flow positive over trailing 12 months)")
+        if trends.get("cash_runway_quarters") is not None:
+            trend_lines.append(
+                f"  Cash Runway: {trends['cash_runway_quarters']:.1f} quarters at current burn "
+                f"(cash as of {trends.get('cash_as_of', 'N/A')})"
+            )
+
         if xbrl_lines:
             text = (
                 f"SEC XBRL Financial Data for {company_name}\n"
@@ -270,11 +344,13 @@ class Chunker:
                 f"Key Financial Metrics (from annual filings):\n"
                 + "\n".join(xbrl_lines)
             )
-            chunks.append({"text": text, "metadata": {
+            if trend_lines:
+                text += "\nMulti-Year Trends and Cash Runway:\n" + "\n".join(trend_lines)
+            yield {"text": text, "metadata": {
                 "source": "sec_financials",
                 "source_url": "https://data.sec.gov/api/xbrl/companyfacts/",
                 "company": company_name,
-            }})
+            }}
 
         if market_data:
             def _fmt(val, fmt="dollar"):
@@ -323,28 +399,46 @@ class Chunker:
                 f"Source: {source_url}\n"
                 + "\n".join(lines)
             )
-            chunks.append({"text": text, "metadata": {
+            yield {"text": text, "metadata": {
                 "source": "market_data",
                 "source_url": source_url,
                 "company": company_name,
                 "ticker": ticker,
-            }})
-
-        return chunks
+            }}
 
     @staticmethod
-    def chunk_adverse_events(drug_name: str, ae_summary: dict) -> list[dict]:
-        reactions_text = ", ".join(ae_summary.get("sample_reactions") or [])
+    def chunk_adverse_events(drug_name: str, ae_summary: dict) -> Iterator[dict]:
         source_url = f"https://fis.fda.gov/extensions/FPD-QDE-FAERS/FPD-QDE-FAERS.html"
-        text = (
-            f"Adverse Events Summary for {drug_name}\n"
-            f"Source: {source_url}\n"
-            f"Total FAERS Reports: {ae_summary.get('total_reports', 0):,}\n"
-            f"Serious Reports in Sample: {ae_summary.get('serious_count', 0)}\n"
-            f"Common Reactions: {reactions_text}"
-        )
-        return [{"text": text, "metadata": {
+        total = ae_summary.get("total_reports", 0)
+        if ae_summary.get("reaction_counts") is not None:
+            # Aggregated over every FAERS report (openFDA count queries)
+            serious = ae_summary.get("serious_count", 0)
+            serious_pct = f" ({serious / total:.1%})" if total else ""
+            reactions_text = ", ".join(
+                f"{r['reaction']} ({r['count']:,})" for r in ae_summary["reaction_counts"]
+            )
+            outcomes_text = ", ".join(
+                f"{outcome}: {count:,}" for outcome, count in (ae_summary.get("outcome_counts") or {}).items()
+            )
+            text = (
+                f"Adverse Events Summary for {drug_name}\n"
+                f"Source: {source_url}\n"
+                f"Total FAERS Reports: {total:,}\n"
+                f"Serious Reports: {serious:,}{serious_pct}\n"
+                f"Top Reactions (report counts): {reactions_text}\n"
+                f"Reaction Outcomes: {outcomes_text or 'N/A'}"
+            )
+        else:
+            reactions_text = ", ".join(ae_summary.get("sample_reactions") or [])
+            text = (
+                f"Adverse Events Summary for {drug_name}\n"
+                f"Source: {source_url}\n"
+                f"Total FAERS Reports: {total:,}\n"
+                f"Serious Reports in Sample: {ae_summary.get('serious_count', 0)}\n"
+                f"Common Reactions: {reactions_text}"
+            )
+        yield {"text": text, "metadata": {
             "source": "fda_adverse_events",
             "source_url": source_url,
             "drug_name": drug_name,
-        }}]
+        }}
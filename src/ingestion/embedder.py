@@ -9,6 +9,11 @@ BATCH_SIZE = 100
 logger = logging.getLogger(__name__)
 
 
+def chunk_id(chunk: dict) -> str:
+    """Stable Chroma id for a chunk: the md5 of its text."""
+    return hashlib.md5(chunk["text"].encode()).hexdigest()
+
+
 class Embedder:
     def __init__(self, openai_api_key: str, chroma_path: str = "./chroma_db"):
         self._openai = OpenAI(api_key=openai_api_key)
@@ -21,24 +26,32 @@ class Embedder:
         return response.data[0].embedding
 
     def embed_and_store(self, chunks: list, collection_name: str) -> None:
+        """Embed and upsert chunks one ``BATCH_SIZE`` batch at a time.
+
+        Chunks already stored (ids are content hashes) are not re-embedded, so
+        rebuilding a report over unchanged data costs no embedding calls.
+        """
         if not chunks:
             return
-        collection = self._chroma.get_or_create_collection(
-            name=collection_name, metadata={"hnsw:space": "cosine"}
-        )
-        all_embeddings = []
-        texts = [c["text"] for c in chunks]
-        for i in range(0, len(texts), BATCH_SIZE):
-            batch = texts[i : i + BATCH_SIZE]
+        collection = self.get_collection(collection_name)
+        for i in range(0, len(chunks), BATCH_SIZE):
+            batch = list({chunk_id(chunk): chunk for chunk in chunks[i : i + BATCH_SIZE]}.items())
+            existing = set(collection.get(ids=[cid for cid, _ in batch], include=[])["ids"])
+            batch = [(cid, chunk) for cid, chunk in batch if cid not in existing]
+            if not batch:
+                continue
+            texts = [chunk["text"] for _, chunk in batch]
             try:
-                response = self._openai.embeddings.create(model=EMBEDDING_MODEL, input=batch)
-                all_embeddings.extend([item.embedding for item in response.data])
+                response = self._openai.embeddings.create(model=EMBEDDING_MODEL, input=texts)
             except Exception as e:
                 logger.error("OpenAI embedding API call failed: %s", e)
                 raise RuntimeError(f"Failed to generate embeddings: {e}") from e
-        ids = [hashlib.md5(chunk["text"].encode()).hexdigest() for chunk in chunks]
-        metadatas = [chunk["metadata"] for chunk in chunks]
-        collection.upsert(ids=ids, documents=texts, embeddings=all_embeddings, metadatas=metadatas)
+            collection.upsert(
+                ids=[cid for cid, _ in batch],
+                documents=texts,
+                embeddings=[item.embedding for item in response.data],
+                metadatas=[chunk["metadata"] for _, chunk in batch],
+            )
 
     def get_collection(self, collection_name: str):
         return self._chroma.get_or_create_collection(
@@ -65,22 +65,31 @@ class Generator:
         self._client = Anthropic(api_key=api_key)
 
     def generate_report(self, company_or_drug: str, chunks: list[dict]) -> str:
+        response = self._client.messages.create(**self._report_request(company_or_drug, chunks))
+        if not response.content:
+            return "Unable to generate report — the AI returned an empty response. Please try again."
+        return response.content[0].text
+
+    def stream_report(self, company_or_drug: str, chunks: list[dict]):
+        """Yield the report text incrementally as Claude generates it."""
+        with self._client.messages.stream(**self._report_request(company_or_drug, chunks)) as stream:
+            yield from stream.text_stream
+
+    @staticmethod
+    def _report_request(company_or_drug: str, chunks: list[dict]) -> dict:
         if not chunks:
             context = "No data was found for this query in ClinicalTrials.gov or FDA databases."
         else:
             context = "\n\n---\n\n".join(chunk["text"] for chunk in chunks)
-        response = self._client.messages.create(
-            model=MODEL,
-            max_tokens=4096,
-            system=REPORT_SYSTEM_PROMPT,
-            messages=[{
+        return {
+            "model": MODEL,
+            "max_tokens": 4096,
+            "system": REPORT_SYSTEM_PROMPT,
+            "messages": [{
                 "role": "user",
                 "content": f"Generate a due diligence report for: {company_or_drug}\n\nData:\n{context}"
             }],
-        )
-        if not response.content:
-            return "Unable to generate report — the AI returned an empty response. Please try again."
-        return response.content[0].text
+        }
 
     def generate_chat_response(self, question: str, chunks: list[dict], history: list[dict]) -> str:
         context = "\n\n---\n\n".join(chunk["text"] for chunk in chunks) if chunks else "No relevant data found."
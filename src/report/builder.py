@@ -1,16 +1,47 @@
 # src/report/builder.py
+import asyncio
+import concurrent.futures
+import contextlib
 import logging
-from typing import Optional
+import threading
+from typing import Iterable, Optional
 from src.api.clinical_trials import ClinicalTrialsClient
-from src.api.fda import FDAClient
+from src.api.fda import ADVERSE_EVENT_SUMMARY_REQUESTS, DEVICE_EVENT_SUMMARY_REQUESTS, FDAClient
 from src.api.sec_edgar import SECEdgarClient
+from src.api.transport import throttle_listener
 from src.ingestion.chunker import Chunker
-from src.ingestion.embedder import Embedder
+from src.ingestion.embedder import BATCH_SIZE, Embedder, chunk_id
 from src.rag.retriever import Retriever
 from src.rag.generator import Generator
+from src.report.cache import ReportCache, fingerprint_ids, is_volatile
 
 logger = logging.getLogger(__name__)
 
+# openFDA allows 240 requests/minute per API key (4/s). With ~1 s round trips,
+# four in-flight enrichment calls keep a report near that quota without 429s.
+ENRICHMENT_CONCURRENCY = 4
+# Per item, counted from the item's last rate-limiter turn so that queueing
+# behind other reports for openFDA tokens doesn't time items out.
+ENRICHMENT_TIMEOUT = 20.0
+# openFDA requests a report may spend on per-product enrichment: about 30 s at
+# the 4 req/s limit, leaving the rest of the /report budget for generation.
+# Split evenly between drugs (FAERS) and devices (MAUDE).
+ENRICHMENT_REQUEST_BUDGET = 120
+MAX_ENRICHED_DRUGS = ENRICHMENT_REQUEST_BUDGET // 2 // ADVERSE_EVENT_SUMMARY_REQUESTS
+MAX_ENRICHED_DEVICES = ENRICHMENT_REQUEST_BUDGET // 2 // DEVICE_EVENT_SUMMARY_REQUESTS
+
+# Reports embed aggregated MAUDE counts only; chat questions matching these
+# keywords pull event narratives for the devices in the retrieved context.
+NARRATIVE_KEYWORDS = (
+    "narrative", "describe", "description", "what happened", "incident", "injur",
+    "death", "died", "malfunction", "complaint", "event",
+)
+MAX_NARRATIVE_DEVICES = 3
+
+# Chunks are embedded in BATCH_SIZE batches while sources are still being
+# fetched; producers wait once this many batches are queued.
+EMBED_QUEUE_BATCHES = 2
+
 
 def _sanitize_collection_name(name: str) -> str:
     sanitized = "".join(c if c.isalnum() else "_" for c in name.lower())
@@ -20,6 +51,197 @@ def _sanitize_collection_name(name: str) -> str:
     return sanitized
 
 
+async def _guarded(coro, default, errors: list, log_message: str, error_message: str):
+    """Await ``coro``; on failure log it, record it in ``errors`` and return ``default``."""
+    try:
+        return await coro
+    except Exception as e:
+        logger.error("%s: %s", log_message, e)
+        errors.append(f"{error_message}: {e}")
+        return default
+
+
+async def _resolved(value):
+    return value
+
+
+async def _discard(chunks):
+    pass
+
+
+async def _supervised(*coros) -> list:
+    """Like ``asyncio.gather``, but the first failure cancels the rest and is re-raised as-is."""
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(coro) for coro in coros]
+    except BaseExceptionGroup as failures:
+        raise failures.exceptions[0]
+    return [task.result() for task in tasks]
+
+
+_EXHAUSTED = object()
+
+
+async def _iterate_in_thread(iterator):
+    """Drain a blocking iterator (e.g. an SDK stream) without stalling the event loop."""
+    iterator = iter(iterator)
+    try:
+        while True:
+            item = await asyncio.to_thread(next, iterator, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await asyncio.to_thread(close)
+
+
+class _EnrichmentExecutor:
+    """Runs per-item lookups under a shared concurrency cap and per-item timeout.
+
+    Results come back in input order; failed or timed-out items yield ``default``
+    and are recorded in ``errors`` like any other source failure.
+    """
+
+    def __init__(self, concurrency: int, timeout: float, errors: list):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._timeout = timeout
+        self._errors = errors
+
+    async def map(self, fetch, items: list, default, log_message: str, error_message: str) -> list:
+        async def run(item):
+            async with self._semaphore:
+                return await _guarded(
+                    self._with_timeout(fetch(item)), default, self._errors,
+                    log_message.format(item), error_message.format(item),
+                )
+
+        return await asyncio.gather(*(run(item) for item in items))
+
+    async def _with_timeout(self, coro):
+        """Await ``coro`` with ``timeout`` measured from its latest rate-limiter turn."""
+        loop = asyncio.get_running_loop()
+        try:
+            async with asyncio.timeout(self._timeout) as deadline:
+                def restart_after(wait: float) -> None:
+                    deadline.reschedule(max(deadline.when(), loop.time() + wait + self._timeout))
+
+                token = throttle_listener.set(restart_after)
+                try:
+                    return await coro
+                finally:
+                    throttle_listener.reset(token)
+        except TimeoutError:
+            raise TimeoutError(f"timed out after {self._timeout:g}s") from None
+
+
+class _EmbeddingPipeline:
+    """Embeds and stores chunks batch by batch while sources are still being fetched.
+
+    Sources ``feed`` chunks as they are produced; a worker hands every full
+    ``BATCH_SIZE`` batch to the embedder, and ``finish`` flushes the remainder.
+    The queue is bounded, so embeddings in flight are capped by queue depth
+    rather than company size. After an embedding failure the worker keeps
+    draining (so producers never block) and ``finish`` re-raises it.
+
+    Chunks are not kept once embedded: only a count and the ids that make up
+    the report cache fingerprint.
+    """
+
+    def __init__(self, embedder: Embedder, collection_name: str, batch_size: int = BATCH_SIZE,
+                 max_pending_batches: int = EMBED_QUEUE_BATCHES):
+        self._embedder = embedder
+        self._collection_name = collection_name
+        self._batch_size = batch_size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=batch_size * max_pending_batches)
+        self._error: Optional[BaseException] = None
+        self.count = 0
+        self._fingerprint_ids: set[str] = set()
+        self._worker = asyncio.create_task(self._run())
+
+    async def feed(self, chunks: Iterable[dict]) -> None:
+        for chunk in chunks:
+            self.count += 1
+            if not is_volatile(chunk):
+                self._fingerprint_ids.add(chunk_id(chunk))
+            await self._queue.put(chunk)
+
+    def fingerprint(self) -> str:
+        """Cache fingerprint of every chunk fed so far."""
+        return fingerprint_ids(self._fingerprint_ids)
+
+    async def finish(self) -> int:
+        """Embed whatever is still queued and return the number of chunks fed."""
+        await self._queue.put(_EXHAUSTED)
+        await self._worker
+        if self._error is not None:
+            raise self._error
+        return self.count
+
+    def cancel(self) -> None:
+        """Stop without embedding the final partial batch, e.g. on a report cache hit."""
+        self._worker.cancel()
+
+    async def _run(self) -> None:
+        batch = []
+        while True:
+            chunk = await self._queue.get()
+            if chunk is not _EXHAUSTED:
+                batch.append(chunk)
+            if batch and (len(batch) >= self._batch_size or chunk is _EXHAUSTED):
+                if self._error is None:
+                    try:
+                        await asyncio.to_thread(
+                            self._embedder.embed_and_store, batch, collection_name=self._collection_name,
+                        )
+                    except Exception as e:
+                        self._error = e
+                batch = []
+            if chunk is _EXHAUSTED:
+                return
+
+
+class _SingleFlight:
+    """Coalesces concurrent calls sharing a key onto one in-flight execution.
+
+    Backed by ``concurrent.futures`` so callers on any event loop can join a
+    build. A follower that is cancelled stops waiting without cancelling the
+    shared build for the leader or the other followers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: dict = {}
+
+    async def do(self, key, factory) -> tuple:
+        """Return ``(result, shared)``; ``shared`` is True for callers that joined a running call."""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+        if not leader:
+            # Shielded: cancelling the wrapper would otherwise cancel the shared future
+            return await asyncio.shield(asyncio.wrap_future(future)), True
+
+        try:
+            result = await factory()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            if isinstance(e, Exception):
+                future.set_exception(e)
+            else:
+                future.set_exception(RuntimeError("Shared report build was cancelled"))
+            raise
+        with self._lock:
+            del self._inflight[key]
+        future.set_result(result)
+        return result, False
+
+
 class ReportBuilder:
     def __init__(
         self,
@@ -30,6 +252,9 @@ class ReportBuilder:
         embedder: Embedder = None,
         retriever: Retriever = None,
         generator: Generator = None,
+        enrichment_concurrency: int = ENRICHMENT_CONCURRENCY,
+        enrichment_timeout: float = ENRICHMENT_TIMEOUT,
+        report_cache: Optional[ReportCache] = None,
     ):
         self.ct_client = ct_client
         self.fda_client = fda_client
@@ -38,173 +263,322 @@ class ReportBuilder:
         self.embedder = embedder
         self.retriever = retriever
         self.generator = generator
+        self.enrichment_concurrency = enrichment_concurrency
+        self.enrichment_timeout = enrichment_timeout
+        self.report_cache = report_cache
+        self._single_flight = _SingleFlight()
 
     @staticmethod
     def sanitize_collection_name(name: str) -> str:
         return _sanitize_collection_name(name)
 
-    async def build_report(self, company_or_drug: str, condition: str = None, phases: list = None) -> str:
+    async def build_report(
+        self, company_or_drug: str, condition: str = None, phases: list = None, on_event=None,
+    ) -> str:
+        """Build a report, sharing one in-flight build between identical concurrent requests.
+
+        ``on_event`` is called with each stage event of the build. Callers that
+        joined another caller's build only see its final ``done`` event.
+        """
+        key = self.report_key(company_or_drug, condition, phases)
+        done, shared = await self._single_flight.do(
+            key, lambda: self._run_report(company_or_drug, condition, phases, on_event),
+        )
+        if shared and on_event:
+            on_event(dict(done))
+        return done["report"]
+
+    @staticmethod
+    def report_key(company_or_drug: str, condition: str = None, phases: list = None) -> tuple:
+        """Identity of a report request: sanitized collection name, condition and phases."""
+        return (
+            _sanitize_collection_name(company_or_drug),
+            condition.strip().lower() if condition else None,
+            tuple(sorted(phases)) if phases else None,
+        )
+
+    async def _run_report(self, company_or_drug: str, condition: str, phases: list, on_event) -> dict:
+        done = None
+        async for event in self.stream_report(company_or_drug, condition, phases, stream_tokens=False):
+            if on_event:
+                on_event(event)
+            if event["stage"] == "done":
+                done = event
+        return done
+
+    async def stream_report(
+        self, company_or_drug: str, condition: str = None, phases: list = None, stream_tokens: bool = True,
+    ):
+        """Run the report pipeline, yielding a stage event dict as each step completes.
+
+        Stages, in order: ``sources`` (per-source record counts), ``chunked``,
+        ``embedded``, ``retrieved``, ``token`` (report text deltas, only when
+        ``stream_tokens`` is set) and finally ``done`` with the full report and
+        its ``cache_status`` (``hit``, ``miss`` or ``disabled``). A cache hit
+        skips any embedding still pending and generation, and goes straight to ``done``.
+        """
         collection_name = _sanitize_collection_name(company_or_drug)
+        cache_status = "disabled" if self.report_cache is None else "miss"
         errors = []
 
-        # 1. Fetch data from APIs (continue on partial failure)
-        # Search by both sponsor name and drug/intervention name for broader coverage
-        trials = []
+        # 1. Fetch data from APIs concurrently (continue on partial failure), chunking
+        # each source as it arrives and embedding full batches while the rest are fetched
+        pipeline = _EmbeddingPipeline(self.embedder, collection_name)
         try:
-            sponsor_trials = await self.ct_client.search_by_sponsor(company_or_drug, condition=condition)
-            trials.extend(sponsor_trials)
-        except Exception as e:
-            logger.error("ClinicalTrials.gov sponsor search error: %s", e)
-            errors.append(f"ClinicalTrials.gov sponsor lookup failed: {e}")
+            sources = await self._fetch_sources(company_or_drug, condition, phases, errors, pipeline.feed)
+            yield {
+                "stage": "sources",
+                "counts": {
+                    "trials": sources["trial_count"],
+                    "approvals": len(sources["approvals"]),
+                    "labels": len(sources["labels"]),
+                    "adverse_events": len(sources["ae_summaries"]),
+                    "device_clearances": len(sources["device_clearances"]),
+                    "device_adverse_events": len(sources["device_ae_summaries"]),
+                    "device_recalls": len(sources["device_recalls"]),
+                    "sec_filings": len(sources["sec_filings"]),
+                    "financials": int(bool(sources["company_facts"] or sources["market_data"])),
+                },
+                "errors": len(errors),
+            }
 
-        try:
-            drug_trials = await self.ct_client.search_by_drug(company_or_drug, condition=condition)
-            # Deduplicate by NCT ID
-            existing_ids = {t["nct_id"] for t in trials}
-            for t in drug_trials:
-                if t["nct_id"] not in existing_ids:
-                    trials.append(t)
-                    existing_ids.add(t["nct_id"])
-        except Exception as e:
-            logger.error("ClinicalTrials.gov drug search error: %s", e)
-            errors.append(f"ClinicalTrials.gov drug lookup failed: {e}")
-
-        # Filter by phase if specified
-        if phases and trials:
-            trials = [t for t in trials if any(p in t.get("phase", "") for p in phases)]
-
-        approvals = []
-        try:
-            approvals = await self.fda_client.search_approvals(company_or_drug)
-        except Exception as e:
-            logger.error("openFDA approvals API error: %s", e)
-            errors.append(f"FDA approvals lookup failed: {e}")
-
-        # Get labels and adverse events for each approved drug
-        drug_names = list({a["brand_name"] for a in approvals if a["brand_name"]})
-        labels = []
-        ae_summaries = []
-        for drug_name in drug_names:
-            try:
-                drug_labels = await self.fda_client.search_labels(drug_name)
-                labels.extend(drug_labels)
-            except Exception as e:
-                logger.error("openFDA labels API error for %s: %s", drug_name, e)
-                errors.append(f"FDA labels lookup failed for {drug_name}: {e}")
-            try:
-                ae_summary = await self.fda_client.get_adverse_events_summary(drug_name)
-                ae_summaries.append((drug_name, ae_summary))
-            except Exception as e:
-                logger.error("openFDA adverse events API error for %s: %s", drug_name, e)
-                errors.append(f"FDA adverse events lookup failed for {drug_name}: {e}")
-
-        # Device data (510(k) clearances, MAUDE adverse events, recalls)
-        device_clearances = []
-        try:
-            device_clearances = await self.fda_client.search_device_clearances(company_or_drug)
-        except Exception as e:
-            logger.error("openFDA device clearances API error: %s", e)
-            errors.append(f"FDA device clearances lookup failed: {e}")
-
-        device_names = list({d["device_name"] for d in device_clearances if d.get("device_name")})
-        device_ae_summaries = []
-        for device_name in device_names:
-            try:
-                ae = await self.fda_client.get_device_adverse_events_summary(device_name)
-                device_ae_summaries.append((device_name, ae))
-            except Exception as e:
-                logger.error("MAUDE adverse events API error for %s: %s", device_name, e)
-                errors.append(f"MAUDE adverse events lookup failed for {device_name}: {e}")
-
-        device_recalls = []
-        try:
-            device_recalls = await self.fda_client.search_device_recalls(company_or_drug)
-        except Exception as e:
-            logger.error("openFDA device recalls API error: %s", e)
-            errors.append(f"FDA device recalls lookup failed: {e}")
+            # 2. Chunks were produced per source as it resolved
+            chunk_count = pipeline.count
+            yield {"stage": "chunked", "chunks": chunk_count}
 
-        # SEC EDGAR + Market Data
-        sec_company = None
-        sec_filings = []
-        company_facts = {}
-        market_data = None
+            if not chunk_count:
+                error_detail = "\n".join(errors) if errors else ""
+                msg = f"No data found for '{company_or_drug}' in ClinicalTrials.gov or FDA databases."
+                if error_detail:
+                    msg += f"\n\nErrors encountered:\n{error_detail}"
+                yield {"stage": "done", "report": msg, "collection_id": collection_name, "cache_status": cache_status}
+                return
 
-        if self.sec_client:
-            try:
-                sec_company = await self.sec_client.lookup_company(company_or_drug)
-            except Exception as e:
-                logger.error("SEC EDGAR company lookup error: %s", e)
-                errors.append(f"SEC company lookup failed: {e}")
+            # Serve a cached report if the underlying data hasn't changed
+            cache_key = self.report_key(company_or_drug, condition, phases)
+            fingerprint = None
+            if self.report_cache is not None:
+                fingerprint = pipeline.fingerprint()
+                cached = self.report_cache.get(cache_key, fingerprint)
+                if cached is not None:
+                    yield {"stage": "done", "report": cached, "collection_id": collection_name, "cache_status": "hit"}
+                    return
 
-            if sec_company:
-                cik = sec_company["cik"]
-                ticker = sec_company.get("ticker", "")
+            # 3. Embed and store the final partial batch
+            await pipeline.finish()
+        finally:
+            # Only does anything when the build ends early (no data, cache hit, failure)
+            pipeline.cancel()
+        yield {"stage": "embedded", "chunks": chunk_count}
 
-                try:
-                    sec_filings = await self.sec_client.get_filings(cik)
-                except Exception as e:
-                    logger.error("SEC EDGAR filings error: %s", e)
-                    errors.append(f"SEC filings lookup failed: {e}")
+        # 4. Retrieve all chunks for report
+        report_chunks = await asyncio.to_thread(
+            self.retriever.retrieve_for_report, collection_name, company_or_drug,
+        )
+        yield {"stage": "retrieved", "chunks": len(report_chunks)}
 
-                try:
-                    company_facts = await self.sec_client.get_company_facts(cik)
-                except Exception as e:
-                    logger.error("SEC XBRL company facts error: %s", e)
-                    errors.append(f"SEC financial data lookup failed: {e}")
+        # 5. Generate report
+        if stream_tokens:
+            parts = []
+            async for text in _iterate_in_thread(self.generator.stream_report(company_or_drug, report_chunks)):
+                parts.append(text)
+                yield {"stage": "token", "text": text}
+            report = "".join(parts)
+        else:
+            report = await asyncio.to_thread(self.generator.generate_report, company_or_drug, report_chunks)
+
+        if self.report_cache is not None and report:
+            self.report_cache.put(cache_key, fingerprint, report)
+
+        # Errors logged but not shown to user
+
+        yield {"stage": "done", "report": report, "collection_id": collection_name, "cache_status": cache_status}
+
+    async def augment_chat_chunks(self, question: str, chunks: list) -> list:
+        """Add MAUDE event narratives to chat context when the question asks about device events."""
+        question_lower = question.lower()
+        if not any(keyword in question_lower for keyword in NARRATIVE_KEYWORDS):
+            return chunks
+        device_names = list(dict.fromkeys(
+            c["metadata"]["device_name"] for c in chunks
+            if c.get("metadata", {}).get("source") == "fda_device_events" and c["metadata"].get("device_name")
+        ))[:MAX_NARRATIVE_DEVICES]
+        if not device_names:
+            return chunks
 
-                if ticker:
+        enrich = _EnrichmentExecutor(self.enrichment_concurrency, self.enrichment_timeout, [])
+        results = await enrich.map(
+            self.fda_client.get_device_event_narratives, device_names, [],
+            "MAUDE narratives API error for {}", "MAUDE narratives lookup failed for {}",
+        )
+        narrative_chunks = []
+        for device_name, narratives in zip(device_names, results):
+            narrative_chunks.extend(self.chunker_cls.chunk_device_event_narratives(device_name, narratives))
+        return chunks + narrative_chunks
+
+    async def _fetch_sources(self, company_or_drug: str, condition: str, phases: list, errors: list,
+                             emit=None) -> dict:
+        """Fetch every upstream source, running independent lookups concurrently.
+
+        Dependent lookups start as soon as their input resolves: labels and
+        adverse events once approvals arrive, MAUDE events once clearances
+        arrive, and filings/facts/market data once the SEC company resolves.
+        Failures are logged and appended to ``errors`` without aborting the rest.
+        Anything else a branch raises (e.g. from the chunker) cancels its
+        siblings, so none is left blocked on a full embedding queue, and propagates.
+
+        Per-drug and per-device openFDA enrichment shares one bounded executor,
+        so latency tracks the slowest item rather than the sum of all items.
+
+        Each source's chunks are generated and passed to the ``emit`` coroutine
+        as soon as that source resolves (trials as each page arrives), rather
+        than after every source is in.
+        Without ``emit`` nothing is chunked.
+        """
+        chunker = self.chunker_cls
+        emit = emit or _discard
+        enrich = _EnrichmentExecutor(self.enrichment_concurrency, self.enrichment_timeout, errors)
+
+        async def fetch_trials():
+            # One OR query over sponsor and intervention name for broad coverage; the API
+            # deduplicates, and the phase filter is applied server-side. Trials are
+            # chunked page by page as they arrive; on failure the pages already in are kept.
+            # Only the search is guarded: chunking errors propagate like other sources'.
+            trial_count = 0
+            async with contextlib.aclosing(self.ct_client.iter_by_sponsor_or_drug(
+                company_or_drug, condition=condition, phases=phases,
+            )) as trials:
+                while True:
                     try:
-                        market_data = await self.sec_client.get_market_data(ticker)
+                        trial = await anext(trials)
+                    except StopAsyncIteration:
+                        break
                     except Exception as e:
-                        logger.error("yfinance market data error: %s", e)
-                        errors.append(f"Market data lookup failed: {e}")
-
-        # 2. Chunk all data
-        all_chunks = []
-        for trial in trials:
-            all_chunks.extend(self.chunker_cls.chunk_clinical_trial(trial))
-        for approval in approvals:
-            all_chunks.extend(self.chunker_cls.chunk_fda_approval(approval))
-        for label in labels:
-            all_chunks.extend(self.chunker_cls.chunk_fda_label(label))
-        for drug_name, ae_summary in ae_summaries:
-            all_chunks.extend(self.chunker_cls.chunk_adverse_events(drug_name, ae_summary))
-        for clearance in device_clearances:
-            all_chunks.extend(self.chunker_cls.chunk_device_clearance(clearance))
-        if device_recalls:
-            all_chunks.extend(self.chunker_cls.chunk_device_recalls(company_or_drug, device_recalls))
-        for device_name, ae in device_ae_summaries:
-            all_chunks.extend(self.chunker_cls.chunk_device_adverse_events(device_name, ae))
-        if sec_filings:
-            company_display = sec_company.get("name", company_or_drug) if sec_company else company_or_drug
-            all_chunks.extend(self.chunker_cls.chunk_sec_filings(company_display, sec_filings))
-        if company_facts or market_data:
-            company_display = company_facts.get("company_name") or (sec_company or {}).get("name", company_or_drug)
-            all_chunks.extend(self.chunker_cls.chunk_company_financials(company_display, company_facts, market_data))
-
-        if not all_chunks:
-            error_detail = "\n".join(errors) if errors else ""
-            msg = f"No data found for '{company_or_drug}' in ClinicalTrials.gov or FDA databases."
-            if error_detail:
-                msg += f"\n\nErrors encountered:\n{error_detail}"
-            return msg
-
-        # 3. Embed and store
-        self.embedder.embed_and_store(all_chunks, collection_name=collection_name)
+                        logger.error("ClinicalTrials.gov search error: %s", e)
+                        errors.append(f"ClinicalTrials.gov lookup failed: {e}")
+                        break
+                    trial_count += 1
+                    await emit(chunker.chunk_clinical_trial(trial))
+            return trial_count
 
-        # 4. Retrieve all chunks for report
-        report_chunks = self.retriever.retrieve_for_report(collection_name, company_or_drug)
+        async def fetch_drugs():
+            approvals = await _guarded(
+                self.fda_client.search_approvals(company_or_drug), [], errors,
+                "openFDA approvals API error", "FDA approvals lookup failed",
+            )
+            await emit(c for approval in approvals for c in chunker.chunk_fda_approval(approval))
+            # Labels for the whole portfolio in a few batched searches; adverse events per drug
+            drug_names = list(dict.fromkeys(a["brand_name"] for a in approvals if a["brand_name"]))
+            drug_names = drug_names[:MAX_ENRICHED_DRUGS]
+            labels_by_drug, ae_results = await _supervised(
+                _guarded(
+                    self.fda_client.search_labels_batch(drug_names), {}, errors,
+                    "openFDA labels API error", "FDA labels lookup failed",
+                ) if drug_names else _resolved({}),
+                enrich.map(
+                    self.fda_client.get_adverse_events_summary, drug_names, None,
+                    "openFDA adverse events API error for {}", "FDA adverse events lookup failed for {}",
+                ),
+            )
+            # A label matching several brand names is embedded once
+            labels = list({
+                label["set_id"] or id(label): label
+                for drug_labels in labels_by_drug.values() for label in drug_labels
+            }.values())
+            ae_summaries = [
+                (drug_name, ae_summary)
+                for drug_name, ae_summary in zip(drug_names, ae_results)
+                if ae_summary is not None
+            ]
+            await emit(c for label in labels for c in chunker.chunk_fda_label(label))
+            await emit(c for drug_name, ae_summary in ae_summaries
+                       for c in chunker.chunk_adverse_events(drug_name, ae_summary))
+            return approvals, labels, ae_summaries
 
-        # If retrieval returns nothing, fall back to all chunks
-        if not report_chunks:
-            report_chunks = all_chunks
+        async def fetch_devices():
+            # Device data (510(k) clearances and MAUDE adverse events)
+            device_clearances = await _guarded(
+                self.fda_client.search_device_clearances(company_or_drug), [], errors,
+                "openFDA device clearances API error", "FDA device clearances lookup failed",
+            )
+            await emit(c for clearance in device_clearances for c in chunker.chunk_device_clearance(clearance))
+            device_names = list(dict.fromkeys(d["device_name"] for d in device_clearances if d.get("device_name")))
+            device_names = device_names[:MAX_ENRICHED_DEVICES]
+            device_ae_results = await enrich.map(
+                self.fda_client.get_device_adverse_events_summary, device_names, None,
+                "MAUDE adverse events API error for {}", "MAUDE adverse events lookup failed for {}",
+            )
+            device_ae_summaries = [
+                (device_name, ae)
+                for device_name, ae in zip(device_names, device_ae_results)
+                if ae is not None
+            ]
+            await emit(c for device_name, ae in device_ae_summaries
+                       for c in chunker.chunk_device_adverse_events(device_name, ae))
+            return device_clearances, device_ae_summaries
 
-        # 5. Generate report
-        report = self.generator.generate_report(company_or_drug, report_chunks)
+        async def fetch_recalls():
+            device_recalls = await _guarded(
+                self.fda_client.search_device_recalls(company_or_drug), [], errors,
+                "openFDA device recalls API error", "FDA device recalls lookup failed",
+            )
+            if device_recalls:
+                await emit(chunker.chunk_device_recalls(company_or_drug, device_recalls))
+            return device_recalls
 
-        # Errors logged but not shown to user
+        async def fetch_sec():
+            # SEC EDGAR + Market Data
+            if not self.sec_client:
+                return None, [], {}, None
+            sec_company = await _guarded(
+                self.sec_client.lookup_company(company_or_drug), None, errors,
+                "SEC EDGAR company lookup error", "SEC company lookup failed",
+            )
+            if not sec_company:
+                return None, [], {}, None
+
+            cik = sec_company["cik"]
+            ticker = sec_company.get("ticker", "")
+            sec_filings, company_facts, market_data = await _supervised(
+                _guarded(
+                    self.sec_client.get_filings(cik), [], errors,
+                    "SEC EDGAR filings error", "SEC filings lookup failed",
+                ),
+                _guarded(
+                    self.sec_client.get_company_facts(cik), {}, errors,
+                    "SEC XBRL company facts error", "SEC financial data lookup failed",
+                ),
+                _guarded(
+                    self.sec_client.get_market_data(ticker), None, errors,
+                    "yfinance market data error", "Market data lookup failed",
+                ) if ticker else _resolved(None),
+            )
+            if sec_filings:
+                await emit(chunker.chunk_sec_filings(sec_company.get("name", company_or_drug), sec_filings))
+            if company_facts or market_data:
+                company_display = company_facts.get("company_name") or sec_company.get("name", company_or_drug)
+                await emit(chunker.chunk_company_financials(company_display, company_facts, market_data))
+            return sec_company, sec_filings, company_facts, market_data
 
-        return report
+        trial_count, drugs, devices, device_recalls, sec = await _supervised(
+            fetch_trials(), fetch_drugs(), fetch_devices(), fetch_recalls(), fetch_sec(),
+        )
+        approvals, labels, ae_summaries = drugs
+        device_clearances, device_ae_summaries = devices
+        sec_company, sec_filings, company_facts, market_data = sec
+        return {
+            "trial_count": trial_count,
+            "approvals": approvals,
+            "labels": labels,
+            "ae_summaries": ae_summaries,
+            "device_clearances": device_clearances,
+            "device_ae_summaries": device_ae_summaries,
+            "device_recalls": device_recalls,
+            "sec_company": sec_company,
+            "sec_filings": sec_filings,
+            "company_facts": company_facts,
+            "market_data": market_data,
+        }
 
     async def close(self):
         await self.ct_client.close()
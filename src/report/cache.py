@@ -0,0 +1,72 @@
+# src/report/cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 128
+EVICTION_POLICIES = ("lru", "fifo")
+
+# Sources whose chunk text changes minute to minute (live quotes). They are left
+# out of the fingerprint so they don't defeat the cache; the TTL bounds staleness.
+VOLATILE_SOURCES = {"market_data"}
+
+
+def is_volatile(chunk: dict) -> bool:
+    """Whether a chunk is left out of report fingerprints."""
+    return chunk.get("metadata", {}).get("source") in VOLATILE_SOURCES
+
+
+def fingerprint_ids(ids) -> str:
+    """Order-independent fingerprint of the ids of the non-volatile chunks a report was built from."""
+    return hashlib.md5("\n".join(sorted(ids)).encode()).hexdigest()
+
+
+class ReportCache:
+    """Bounded in-memory cache of generated reports.
+
+    Entries are keyed by ``ReportBuilder.report_key`` and only served while the
+    fingerprint of freshly fetched data still matches and the TTL has not run
+    out, so any upstream change produces an automatic miss.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, eviction: str = "lru"):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"eviction must be one of {EVICTION_POLICIES}, got {eviction!r}")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.eviction = eviction
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, fingerprint: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_fingerprint, report, stored_at = entry
+            if stored_fingerprint != fingerprint or time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            if self.eviction == "lru":
+                self._entries.move_to_end(key)
+            return report
+
+    def put(self, key, fingerprint: str, report: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (fingerprint, report, time.monotonic())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,11 +1,29 @@
+import pytest
 from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock
 from api.main import app
+from src.api.sec_edgar import SECEdgarClient
+from src.api.transport import shared_pool
 import jwt as jose_jwt
 import time
 
-client = TestClient(app)
 
-def test_health():
+@pytest.fixture
+def app_env(tmp_path, monkeypatch):
+    """Databases under ``tmp_path`` and no SEC warm-up for an app started in the test."""
+    monkeypatch.setenv("REPORT_JOBS_DB", str(tmp_path / "report_jobs.db"))
+    monkeypatch.setenv("HTTP_CACHE_PATH", str(tmp_path / "http_cache.db"))
+    monkeypatch.setenv("TICKER_INDEX_PATH", str(tmp_path / "ticker_index.json.gz"))
+    monkeypatch.setattr(SECEdgarClient, "warm_ticker_index", AsyncMock())
+
+
+@pytest.fixture
+def client(app_env):
+    """App started through its lifespan."""
+    with TestClient(app) as started:
+        yield started
+
+def test_health(client):
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
@@ -16,16 +34,16 @@ def _make_token(secret=FAKE_SECRET, exp_offset=3600):
     payload = {"sub": "user-123", "exp": int(time.time()) + exp_offset}
     return jose_jwt.encode(payload, secret, algorithm="HS256")
 
-def test_protected_route_no_token():
+def test_protected_route_no_token(client):
     response = client.post("/report", json={"company": "Pfizer"})
     assert response.status_code == 401
 
-def test_protected_route_valid_token(monkeypatch):
+def test_protected_route_valid_token(client, monkeypatch):
     monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
     token = _make_token()
 
     import api.main as main_module
-    async def mock_build_report(company, condition=None, phases=None):
+    async def mock_build_report(company, condition=None, phases=None, on_event=None):
         return "stub"
     main_module.builder.build_report = mock_build_report
 
@@ -37,7 +55,7 @@ def test_protected_route_valid_token(monkeypatch):
     assert response.status_code == 200
     assert response.json()["report"] == "stub"
 
-def test_protected_route_expired_token(monkeypatch):
+def test_protected_route_expired_token(client, monkeypatch):
     monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
     token = _make_token(exp_offset=-1)
     response = client.post(
@@ -47,7 +65,7 @@ def test_protected_route_expired_token(monkeypatch):
     )
     assert response.status_code == 401
 
-def test_protected_route_wrong_secret(monkeypatch):
+def test_protected_route_wrong_secret(client, monkeypatch):
     monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
     token = _make_token(secret="completely-different-secret-here!")
     response = client.post(
@@ -57,12 +75,12 @@ def test_protected_route_wrong_secret(monkeypatch):
     )
     assert response.status_code == 401
 
-def test_report_returns_report_and_collection_id(monkeypatch):
+def test_report_returns_report_and_collection_id(client, monkeypatch):
     monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
     token = _make_token()
 
     import api.main as main_module
-    async def mock_build_report(company, condition=None, phases=None):
+    async def mock_build_report(company, condition=None, phases=None, on_event=None):
         return "## Report for test company"
     main_module.builder.build_report = mock_build_report
     # Note: sanitize_collection_name is a static class method; "TestCo" -> "testco"
@@ -77,7 +95,25 @@ def test_report_returns_report_and_collection_id(monkeypatch):
     assert data["report"] == "## Report for test company"
     assert data["collection_id"] == "testco"  # actual sanitized value of "TestCo"
 
-def test_chat_returns_response(monkeypatch):
+def test_report_includes_cache_status(client, monkeypatch):
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
+    token = _make_token()
+
+    import api.main as main_module
+    async def mock_build_report(company, condition=None, phases=None, on_event=None):
+        on_event({"stage": "done", "report": "## Cached", "collection_id": "testco", "cache_status": "hit"})
+        return "## Cached"
+    main_module.builder.build_report = mock_build_report
+
+    response = client.post(
+        "/report",
+        json={"company": "TestCo"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200
+    assert response.json()["cache_status"] == "hit"
+
+def test_chat_returns_response(client, monkeypatch):
     monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
     token = _make_token()
 
@@ -93,19 +129,28 @@ def test_chat_returns_response(monkeypatch):
     assert response.status_code == 200
     assert response.json()["response"] == "mock answer"
 
-def test_chat_requires_auth():
+def test_chat_requires_auth(client):
     response = client.post(
         "/chat",
         json={"message": "test", "collection_id": "x", "history": []},
     )
     assert response.status_code == 401
 
-def test_report_returns_500_on_pipeline_error(monkeypatch):
+def test_report_rejects_unknown_phase(client, monkeypatch):
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
+    response = client.post(
+        "/report",
+        json={"company": "Pfizer", "phases": ["Phase 9"]},
+        headers={"Authorization": f"Bearer {_make_token()}"},
+    )
+    assert response.status_code == 422
+
+def test_report_returns_500_on_pipeline_error(client, monkeypatch):
     monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
     token = _make_token()
 
     import api.main as main_module
-    async def failing_build_report(company, condition=None, phases=None):
+    async def failing_build_report(company, condition=None, phases=None, on_event=None):
         raise RuntimeError("pipeline exploded")
     main_module.builder.build_report = failing_build_report
 
@@ -116,3 +161,103 @@ def test_report_returns_500_on_pipeline_error(monkeypatch):
     )
     assert response.status_code == 500
     assert response.json()["detail"] == "Report generation failed. Please try again."
+
+def test_report_stream_relays_stage_events(client, monkeypatch):
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
+    token = _make_token()
+
+    import api.main as main_module
+    async def mock_stream_report(company, condition=None, phases=None):
+        yield {"stage": "sources", "counts": {"trials": 2}, "errors": 0}
+        yield {"stage": "token", "text": "## Report"}
+        yield {"stage": "done", "report": "## Report", "collection_id": "testco"}
+    main_module.builder.stream_report = mock_stream_report
+
+    with client.stream(
+        "POST",
+        "/report/stream",
+        json={"company": "TestCo"},
+        headers={"Authorization": f"Bearer {token}"},
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    assert "event: sources" in body
+    assert "event: token" in body
+    assert 'event: done\ndata: {"stage": "done", "report": "## Report", "collection_id": "testco"}' in body
+
+def test_report_job_can_be_polled_to_completion(client, monkeypatch):
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
+    token = _make_token()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    import api.main as main_module
+    async def mock_build_report(company, condition=None, phases=None, on_event=None):
+        on_event({"stage": "sources", "counts": {"trials": 2}, "errors": 0})
+        on_event({"stage": "done", "report": "## Queued report", "collection_id": "testco", "cache_status": "hit"})
+        return "## Queued report"
+    main_module.builder.build_report = mock_build_report
+
+    response = client.post("/report/jobs", json={"company": "TestCo"}, headers=headers)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    for _ in range(100):
+        data = client.get(f"/report/jobs/{job_id}", headers=headers).json()
+        if data["status"] == "succeeded":
+            break
+        time.sleep(0.01)
+    assert data["status"] == "succeeded"
+    assert data["report"] == "## Queued report"
+    assert data["collection_id"] == "testco"
+    assert data["cache_status"] == "hit"
+    assert "sources" in data["stage_timings"]
+
+def test_report_job_unknown_id_returns_404(client, monkeypatch):
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
+    token = _make_token()
+    response = client.get("/report/jobs/does-not-exist", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+
+
+def test_upstream_metrics_requires_auth_and_returns_hosts(client, monkeypatch):
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", FAKE_SECRET)
+    assert client.get("/metrics/upstream").status_code in (401, 403)
+
+    response = client.get("/metrics/upstream", headers={"Authorization": f"Bearer {_make_token()}"})
+    assert response.status_code == 200
+    assert isinstance(response.json(), dict)
+
+
+def test_startup_warms_ticker_index_off_the_request_path(client):
+    for _ in range(100):
+        if SECEdgarClient.warm_ticker_index.await_count:
+            break
+        time.sleep(0.01)
+    SECEdgarClient.warm_ticker_index.assert_awaited_once()
+
+
+def test_startup_logs_a_failed_ticker_index_warm_up(app_env, caplog):
+    SECEdgarClient.warm_ticker_index.side_effect = RuntimeError("boom")
+    with TestClient(app):
+        for _ in range(100):
+            if "Ticker index warm-up failed" in caplog.text:
+                break
+            time.sleep(0.01)
+    assert "Ticker index warm-up failed" in caplog.text
+
+
+def test_startup_keeps_databases_out_of_the_working_directory(client, tmp_path):
+    import os
+    assert (tmp_path / "report_jobs.db").exists()
+    assert (tmp_path / "http_cache.db").exists()
+    assert not os.path.exists("report_jobs.db") and not os.path.exists("http_cache.db")
+
+
+def test_shutdown_closes_the_shared_connection_pool(app_env, monkeypatch):
+    close_pool = AsyncMock()
+    monkeypatch.setattr(shared_pool(), "close_pool", close_pool)
+    with TestClient(app):
+        close_pool.assert_not_awaited()
+    close_pool.assert_awaited_once()
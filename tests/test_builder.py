@@ -1,7 +1,28 @@
 # tests/test_builder.py
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from src.ingestion.chunker import Chunker
+from src.ingestion.embedder import BATCH_SIZE
 from src.report.builder import ReportBuilder
+from src.report.cache import ReportCache
+
+TRIAL = {"nct_id": "NCT123", "title": "Test Trial", "sponsor": "TestPharma", "phase": "Phase 3",
+         "status": "RECRUITING", "enrollment": 100, "conditions": ["Cancer"],
+         "interventions": [{"name": "DrugX", "type": "DRUG"}], "primary_outcomes": [],
+         "brief_summary": "A test trial", "start_date": "2024-01-01",
+         "primary_completion_date": "2026-01-01", "has_results": False}
+
+
+def studies(trials, wait_for=None):
+    """Side effect for ``iter_by_sponsor_or_drug``: yields ``trials`` once ``wait_for()`` (if given) resolves."""
+    async def iterate(*args, **kwargs):
+        if wait_for is not None:
+            await wait_for()
+        for trial in trials:
+            yield trial
+    return iterate
 
 
 @pytest.fixture
@@ -13,22 +34,15 @@ def mock_deps():
     retriever = MagicMock()
     generator = MagicMock()
 
-    ct_client.search_by_sponsor.return_value = [
-        {"nct_id": "NCT123", "title": "Test Trial", "sponsor": "TestPharma", "phase": "Phase 3",
-         "status": "RECRUITING", "enrollment": 100, "conditions": ["Cancer"],
-         "interventions": [{"name": "DrugX", "type": "DRUG"}], "primary_outcomes": [],
-         "brief_summary": "A test trial", "start_date": "2024-01-01",
-         "primary_completion_date": "2026-01-01", "has_results": False}
-    ]
-    ct_client.search_by_drug.return_value = []
+    ct_client.iter_by_sponsor_or_drug = MagicMock(side_effect=studies([TRIAL]))
     fda_client.search_approvals.return_value = [
         {"application_number": "NDA123", "brand_name": "DrugX", "generic_name": "drugx",
          "manufacturer": "TestPharma", "products": [], "submissions": []}
     ]
-    fda_client.search_labels.return_value = [
-        {"brand_name": "DrugX", "generic_name": "drugx", "manufacturer": "TestPharma",
+    fda_client.search_labels_batch.return_value = {"DrugX": [
+        {"set_id": "label-1", "brand_name": "DrugX", "generic_name": "drugx", "manufacturer": "TestPharma",
          "indications": "For cancer", "boxed_warning": "", "warnings": "", "adverse_reactions": "Nausea"}
-    ]
+    ]}
     fda_client.get_adverse_events_summary.return_value = {
         "total_reports": 100, "sample_reactions": ["Nausea"], "serious_count": 5
     }
@@ -62,8 +76,316 @@ async def test_build_report(mock_deps):
     report = await builder.build_report("TestPharma")
 
     assert "Due Diligence Report" in report
-    mock_deps["ct_client"].search_by_sponsor.assert_called_once_with("TestPharma", condition=None)
-    mock_deps["ct_client"].search_by_drug.assert_called_once_with("TestPharma", condition=None)
+    mock_deps["ct_client"].iter_by_sponsor_or_drug.assert_called_once_with("TestPharma", condition=None, phases=None)
     mock_deps["fda_client"].search_approvals.assert_called_once()
     mock_deps["embedder"].embed_and_store.assert_called_once()
     mock_deps["generator"].generate_report.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_build_report_fetches_independent_sources_concurrently(mock_deps):
+    approvals_started = asyncio.Event()
+    approvals = mock_deps["fda_client"].search_approvals.return_value
+
+    async def sponsor_search():
+        # Would deadlock if sources were still fetched one after another
+        await asyncio.wait_for(approvals_started.wait(), timeout=1)
+
+    async def approvals_search(*args, **kwargs):
+        approvals_started.set()
+        return approvals
+
+    mock_deps["ct_client"].iter_by_sponsor_or_drug.side_effect = studies([], wait_for=sponsor_search)
+    mock_deps["fda_client"].search_approvals.side_effect = approvals_search
+    builder = ReportBuilder(**mock_deps)
+    report = await builder.build_report("TestPharma")
+
+    assert "Due Diligence Report" in report
+    mock_deps["fda_client"].search_labels_batch.assert_called_once_with(["DrugX"])
+
+
+@pytest.mark.asyncio
+async def test_build_report_continues_when_a_source_fails(mock_deps):
+    mock_deps["fda_client"].search_approvals.side_effect = RuntimeError("openFDA down")
+    builder = ReportBuilder(**mock_deps)
+    report = await builder.build_report("TestPharma")
+
+    assert "Due Diligence Report" in report
+    mock_deps["fda_client"].search_labels_batch.assert_not_called()
+    mock_deps["embedder"].embed_and_store.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_enrichment_is_bounded_ordered_and_times_out(mock_deps):
+    drugs = ["DrugA", "DrugB", "DrugC", "DrugD", "SlowDrug"]
+    mock_deps["fda_client"].search_approvals.return_value = [
+        {"application_number": f"NDA{i}", "brand_name": name, "products": [], "submissions": []}
+        for i, name in enumerate(drugs)
+    ]
+    in_flight = 0
+    peak = 0
+    finished = []
+
+    async def ae_summary(drug_name):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            # Earlier drugs take longer, so lookups finish out of input order
+            await asyncio.sleep(5 if drug_name == "SlowDrug" else 0.05 - 0.01 * drugs.index(drug_name))
+            finished.append(drug_name)
+            return {"total_reports": len(drug_name), "sample_reactions": [], "serious_count": 0}
+        finally:
+            in_flight -= 1
+
+    mock_deps["fda_client"].get_adverse_events_summary.side_effect = ae_summary
+    builder = ReportBuilder(**mock_deps, enrichment_concurrency=2, enrichment_timeout=0.2)
+    errors = []
+    sources = await builder._fetch_sources("TestPharma", None, None, errors)
+
+    assert peak <= 2
+    names = [name for name, _ in sources["ae_summaries"]]
+    assert finished != drugs[:4]
+    assert names == ["DrugA", "DrugB", "DrugC", "DrugD"]
+    assert all(ae["total_reports"] == len(name) for name, ae in sources["ae_summaries"])
+    assert any("SlowDrug" in e and "timed out" in e for e in errors)
+
+
+@pytest.mark.asyncio
+async def test_stream_report_emits_stage_events(mock_deps):
+    mock_deps["generator"].stream_report.return_value = iter(["## Due Diligence", " Report"])
+    builder = ReportBuilder(**mock_deps)
+    events = [event async for event in builder.stream_report("TestPharma")]
+
+    stages = [e["stage"] for e in events]
+    assert stages == ["sources", "chunked", "embedded", "retrieved", "token", "token", "done"]
+    assert events[0]["counts"]["trials"] == 1
+    assert events[0]["counts"]["approvals"] == 1
+    assert events[-1] == {
+        "stage": "done", "report": "## Due Diligence Report", "collection_id": "testpharma",
+        "cache_status": "disabled",
+    }
+    mock_deps["generator"].generate_report.assert_not_called()
+
+
+async def _consume(chunks):
+    list(chunks)
+
+
+@pytest.mark.asyncio
+async def test_a_failing_source_cancels_its_siblings(mock_deps):
+    search_cancelled = asyncio.Event()
+
+    async def stuck_search(*args, **kwargs):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            search_cancelled.set()
+            raise
+        yield TRIAL
+
+    mock_deps["ct_client"].iter_by_sponsor_or_drug.side_effect = stuck_search
+    mock_deps["chunker_cls"].chunk_fda_approval.side_effect = ValueError("malformed approval")
+    builder = ReportBuilder(**mock_deps)
+    errors = []
+
+    with pytest.raises(ValueError, match="malformed approval"):
+        await asyncio.wait_for(builder._fetch_sources("TestPharma", None, None, errors, _consume), timeout=1)
+    assert search_cancelled.is_set()
+    assert errors == []
+
+
+@pytest.mark.asyncio
+async def test_chunking_errors_are_not_reported_as_trial_search_failures(mock_deps):
+    mock_deps["chunker_cls"].chunk_clinical_trial.side_effect = ValueError("malformed trial")
+    builder = ReportBuilder(**mock_deps)
+    errors = []
+
+    with pytest.raises(ValueError, match="malformed trial"):
+        await builder._fetch_sources("TestPharma", None, None, errors, _consume)
+    assert not any("ClinicalTrials.gov" in e for e in errors)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_builds_share_one_pipeline_run(mock_deps):
+    release = asyncio.Event()
+    mock_deps["ct_client"].iter_by_sponsor_or_drug.side_effect = studies([TRIAL], wait_for=release.wait)
+    builder = ReportBuilder(**mock_deps)
+    follower_events = []
+
+    leader = asyncio.create_task(builder.build_report("TestPharma", phases=["Phase 3"]))
+    follower = asyncio.create_task(
+        builder.build_report("testpharma ", phases=["Phase 3"], on_event=follower_events.append)
+    )
+    other = asyncio.create_task(builder.build_report("TestPharma", phases=["Phase 2"]))
+    await asyncio.sleep(0.01)
+    release.set()
+    reports = await asyncio.gather(leader, follower, other)
+
+    assert reports[0] == reports[1]
+    # Phase 2 is a different request and gets its own build
+    assert mock_deps["ct_client"].iter_by_sponsor_or_drug.call_count == 2
+    assert mock_deps["generator"].generate_report.call_count == 2
+    assert [e["stage"] for e in follower_events] == ["done"]
+    assert not builder._single_flight._inflight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_failures_to_waiters(mock_deps):
+    release = asyncio.Event()
+    mock_deps["ct_client"].iter_by_sponsor_or_drug.side_effect = studies([], wait_for=release.wait)
+    mock_deps["embedder"].embed_and_store.side_effect = RuntimeError("embedding down")
+    builder = ReportBuilder(**mock_deps)
+
+    first = asyncio.create_task(builder.build_report("TestPharma"))
+    second = asyncio.create_task(builder.build_report("TestPharma"))
+    await asyncio.sleep(0.01)
+    release.set()
+    results = await asyncio.gather(first, second, return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert mock_deps["embedder"].embed_and_store.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_a_cancelled_follower(mock_deps):
+    release = asyncio.Event()
+    mock_deps["ct_client"].iter_by_sponsor_or_drug.side_effect = studies([TRIAL], wait_for=release.wait)
+    builder = ReportBuilder(**mock_deps)
+
+    leader = asyncio.create_task(builder.build_report("TestPharma"))
+    await asyncio.sleep(0.01)
+    cancelled = asyncio.create_task(builder.build_report("TestPharma"))
+    follower = asyncio.create_task(builder.build_report("TestPharma"))
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+    await asyncio.sleep(0.01)
+    release.set()
+
+    results = await asyncio.gather(leader, cancelled, follower, return_exceptions=True)
+    assert "Due Diligence Report" in results[0]
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert results[2] == results[0]
+    assert mock_deps["generator"].generate_report.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_report_cache_serves_hits_until_data_changes(mock_deps):
+    builder = ReportBuilder(**mock_deps, report_cache=ReportCache())
+    statuses = []
+
+    def record(event):
+        if event["stage"] == "done":
+            statuses.append(event["cache_status"])
+
+    first = await builder.build_report("TestPharma", on_event=record)
+    second = await builder.build_report("TestPharma", on_event=record)
+    assert first == second
+    assert mock_deps["generator"].generate_report.call_count == 1
+    assert mock_deps["embedder"].embed_and_store.call_count == 1
+
+    # New upstream data changes the chunk fingerprint and forces a rebuild
+    mock_deps["chunker_cls"].chunk_clinical_trial.return_value = [
+        {"text": "updated trial chunk", "metadata": {"source": "clinicaltrials"}}
+    ]
+    await builder.build_report("TestPharma", on_event=record)
+    assert mock_deps["generator"].generate_report.call_count == 2
+    assert statuses == ["miss", "hit", "miss"]
+
+
+@pytest.mark.asyncio
+async def test_augment_chat_chunks_fetches_device_narratives_on_demand(mock_deps):
+    mock_deps["chunker_cls"] = Chunker
+    mock_deps["fda_client"].get_device_event_narratives.return_value = ["Device overheated during use."]
+    builder = ReportBuilder(**mock_deps)
+    chunks = [{"text": "MAUDE summary", "metadata": {"source": "fda_device_events", "device_name": "ScanPro"}}]
+
+    unchanged = await builder.augment_chat_chunks("What is the market cap?", chunks)
+    assert unchanged == chunks
+    mock_deps["fda_client"].get_device_event_narratives.assert_not_called()
+
+    augmented = await builder.augment_chat_chunks("Describe the injury events for ScanPro", chunks)
+    mock_deps["fda_client"].get_device_event_narratives.assert_called_once_with("ScanPro")
+    assert len(augmented) == 2
+    assert "Device overheated during use." in augmented[1]["text"]
+
+
+@pytest.mark.asyncio
+async def test_full_batches_are_embedded_while_sources_are_still_fetching(mock_deps):
+    embedder = mock_deps["embedder"]
+    mock_deps["chunker_cls"].chunk_clinical_trial.return_value = [
+        {"text": f"trial chunk {i}", "metadata": {"source": "clinicaltrials"}} for i in range(BATCH_SIZE)
+    ]
+    approvals = mock_deps["fda_client"].search_approvals.return_value
+
+    async def slow_approvals(*args, **kwargs):
+        # Resolves only once the trial chunks have been embedded
+        for _ in range(100):
+            if embedder.embed_and_store.call_count:
+                return approvals
+            await asyncio.sleep(0.01)
+        raise AssertionError("embedding waited for every source")
+
+    mock_deps["fda_client"].search_approvals.side_effect = slow_approvals
+    builder = ReportBuilder(**mock_deps)
+    stages = []
+    await builder.build_report("TestPharma", on_event=lambda e: stages.append(e))
+
+    assert mock_deps["fda_client"].search_labels_batch.called
+    batches = [c.args[0] for c in embedder.embed_and_store.call_args_list]
+    assert [len(b) for b in batches] == [BATCH_SIZE, 3]
+    assert {c["text"] for c in batches[1]} == {"approval chunk", "label chunk", "ae chunk"}
+    chunked = next(e for e in stages if e["stage"] == "chunked")
+    assert chunked["chunks"] == BATCH_SIZE + 3
+
+
+@pytest.mark.asyncio
+async def test_trial_pages_are_embedded_before_the_search_finishes(mock_deps):
+    embedder = mock_deps["embedder"]
+    mock_deps["chunker_cls"].chunk_clinical_trial.side_effect = lambda trial: [
+        {"text": f"trial chunk {trial['nct_id']}", "metadata": {"source": "clinicaltrials"}}
+    ]
+
+    async def paged_search(*args, **kwargs):
+        for i in range(BATCH_SIZE):
+            yield {**TRIAL, "nct_id": f"NCT{i}"}
+        # The next page is only served once the first one has been embedded
+        for _ in range(100):
+            if embedder.embed_and_store.call_count:
+                break
+            await asyncio.sleep(0.01)
+        else:
+            raise AssertionError("trials were embedded only after the search finished")
+        yield {**TRIAL, "nct_id": "NCT-last"}
+
+    mock_deps["ct_client"].iter_by_sponsor_or_drug.side_effect = paged_search
+    builder = ReportBuilder(**mock_deps)
+    stages = []
+    await builder.build_report("TestPharma", on_event=stages.append)
+
+    assert stages[0]["counts"]["trials"] == BATCH_SIZE + 1
+    assert [len(c.args[0]) for c in embedder.embed_and_store.call_args_list] == [BATCH_SIZE, 4]
+
+
+@pytest.mark.asyncio
+async def test_enrichment_timeout_excludes_rate_limit_waits():
+    from src.api.transport import RateLimiter
+    from src.report.builder import _EnrichmentExecutor
+
+    limiter = RateLimiter(limits={"api.fda.gov": (10.0, 1)})
+
+    async def throttled_lookup(item):
+        # Three requests through a 10/s bucket with no burst: ~0.2 s queued for tokens
+        for _ in range(3):
+            await limiter.acquire("api.fda.gov")
+        return item
+
+    async def slow_lookup(item):
+        await asyncio.sleep(0.3)
+        return item
+
+    errors = []
+    enrich = _EnrichmentExecutor(concurrency=2, timeout=0.15, errors=errors)
+    assert await enrich.map(throttled_lookup, ["DrugA"], None, "{}", "{}") == ["DrugA"]
+    assert await enrich.map(slow_lookup, ["DrugB"], None, "{}", "lookup failed for {}") == [None]
+    assert errors == ["lookup failed for DrugB: timed out after 0.15s"]
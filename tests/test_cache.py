@@ -0,0 +1,60 @@
+# tests/test_cache.py
+import pytest
+from unittest.mock import patch
+from src.ingestion.embedder import chunk_id
+from src.report.cache import ReportCache, fingerprint_ids, is_volatile
+
+
+CHUNKS = [
+    {"text": "trial chunk", "metadata": {"source": "clinicaltrials"}},
+    {"text": "approval chunk", "metadata": {"source": "fda_approval"}},
+]
+
+
+def fingerprint(chunks):
+    return fingerprint_ids({chunk_id(chunk) for chunk in chunks if not is_volatile(chunk)})
+
+
+def test_fingerprint_ignores_order_and_live_quotes():
+    quotes = {"text": "Current Price: $101.20", "metadata": {"source": "market_data"}}
+    moved = {"text": "Current Price: $99.80", "metadata": {"source": "market_data"}}
+    assert fingerprint(CHUNKS + [quotes]) == fingerprint([moved] + CHUNKS[::-1])
+    assert fingerprint(CHUNKS) != fingerprint(CHUNKS[:1])
+
+
+def test_cache_hit_requires_matching_fingerprint():
+    cache = ReportCache()
+    key = ("testpharma", None, None)
+    cache.put(key, fingerprint(CHUNKS), "report")
+
+    assert cache.get(key, fingerprint(CHUNKS)) == "report"
+    assert cache.get(key, fingerprint(CHUNKS[:1])) is None
+    # A fingerprint mismatch drops the stale entry
+    assert cache.get(key, fingerprint(CHUNKS)) is None
+
+
+def test_cache_entries_expire_after_ttl():
+    cache = ReportCache(ttl_seconds=60)
+    with patch("src.report.cache.time.monotonic", return_value=1000.0):
+        cache.put("key", "fp", "report")
+    with patch("src.report.cache.time.monotonic", return_value=1059.0):
+        assert cache.get("key", "fp") == "report"
+    with patch("src.report.cache.time.monotonic", return_value=1061.0):
+        assert cache.get("key", "fp") is None
+
+
+@pytest.mark.parametrize("eviction, survivor", [("lru", "a"), ("fifo", "b")])
+def test_cache_eviction_policy(eviction, survivor):
+    cache = ReportCache(max_entries=2, eviction=eviction)
+    cache.put("a", "fp", "A")
+    cache.put("b", "fp", "B")
+    cache.get("a", "fp")
+    cache.put("c", "fp", "C")
+
+    assert len(cache) == 2
+    assert cache.get(survivor, "fp") is not None
+
+
+def test_cache_rejects_unknown_eviction_policy():
+    with pytest.raises(ValueError):
+        ReportCache(eviction="random")
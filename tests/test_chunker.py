@@ -18,7 +18,7 @@ def test_chunk_clinical_trial():
         "brief_summary": "This study evaluates Drug X.",
         "has_results": False,
     }
-    chunks = Chunker.chunk_clinical_trial(trial)
+    chunks = list(Chunker.chunk_clinical_trial(trial))
     assert len(chunks) >= 1
     chunk = chunks[0]
     assert "NCT12345678" in chunk["text"]
@@ -28,6 +28,13 @@ def test_chunk_clinical_trial():
     assert chunk["metadata"]["nct_id"] == "NCT12345678"
     assert chunk["metadata"]["company"] == "TestPharma Inc"
     assert chunk["metadata"]["phase"] == "Phase 3"
+    assert "Matched On" not in chunk["text"]
+
+
+def test_chunk_clinical_trial_renders_search_match():
+    trial = {"nct_id": "NCT12345678", "sponsor": "OtherCo", "matched_on": ["intervention"]}
+    chunk = next(Chunker.chunk_clinical_trial(trial))
+    assert "Sponsor: OtherCo\nMatched On: intervention\n" in chunk["text"]
 
 
 def test_chunk_fda_approval():
@@ -43,7 +50,7 @@ def test_chunk_fda_approval():
             {"submission_type": "ORIG", "submission_status": "AP", "submission_status_date": "20050617", "submission_class_code_description": "New Molecular Entity"}
         ],
     }
-    chunks = Chunker.chunk_fda_approval(approval)
+    chunks = list(Chunker.chunk_fda_approval(approval))
     assert len(chunks) >= 1
     chunk = chunks[0]
     assert "TYGACIL" in chunk["text"]
@@ -62,7 +69,7 @@ def test_chunk_fda_label():
         "warnings": "Anaphylaxis reported...",
         "adverse_reactions": "Nausea and vomiting are common...",
     }
-    chunks = Chunker.chunk_fda_label(label)
+    chunks = list(Chunker.chunk_fda_label(label))
     assert len(chunks) >= 1
     texts = [c["text"] for c in chunks]
     all_text = " ".join(texts)
@@ -81,7 +88,7 @@ def test_chunk_device_clearance():
         "decision_description": "Substantially Equivalent",
         "advisory_committee_description": "Radiology",
     }
-    chunks = Chunker.chunk_device_clearance(clearance)
+    chunks = list(Chunker.chunk_device_clearance(clearance))
     assert len(chunks) == 1
     chunk = chunks[0]
     assert "K223456" in chunk["text"]
@@ -101,7 +108,7 @@ def test_chunk_device_recalls():
             "status": "Terminated",
         }
     ]
-    chunks = Chunker.chunk_device_recalls("DeepSight", recalls)
+    chunks = list(Chunker.chunk_device_recalls("DeepSight", recalls))
     assert len(chunks) == 1
     chunk = chunks[0]
     assert "Software error" in chunk["text"]
@@ -114,7 +121,7 @@ def test_chunk_device_adverse_events():
         "serious_count": 5,
         "sample_events": ["Patient experienced irritation"],
     }
-    chunks = Chunker.chunk_device_adverse_events("DeepSight AI", ae_summary)
+    chunks = list(Chunker.chunk_device_adverse_events("DeepSight AI", ae_summary))
     assert len(chunks) == 1
     chunk = chunks[0]
     assert "120" in chunk["text"]
@@ -134,7 +141,7 @@ def test_chunk_sec_filings():
             "company_name": "Moderna, Inc.",
         }
     ]
-    chunks = Chunker.chunk_sec_filings("Moderna, Inc.", filings)
+    chunks = list(Chunker.chunk_sec_filings("Moderna, Inc.", filings))
     assert len(chunks) == 1
     assert "10-K" in chunks[0]["text"]
     assert "2024-02-22" in chunks[0]["text"]
@@ -143,7 +150,7 @@ def test_chunk_sec_filings():
 
 
 def test_chunk_sec_filings_empty():
-    chunks = Chunker.chunk_sec_filings("Test Corp", [])
+    chunks = list(Chunker.chunk_sec_filings("Test Corp", []))
     assert chunks == []
 
 
@@ -160,7 +167,7 @@ def test_chunk_company_financials_with_market_data():
         "sector": "Healthcare",
         "industry": "Biotechnology",
     }
-    chunks = Chunker.chunk_company_financials("Moderna, Inc.", facts, market)
+    chunks = list(Chunker.chunk_company_financials("Moderna, Inc.", facts, market))
     assert len(chunks) == 2
     sources = [c["metadata"]["source"] for c in chunks]
     assert "sec_financials" in sources
@@ -174,7 +181,7 @@ def test_chunk_adverse_events():
         "sample_reactions": ["Nausea", "Headache", "Vomiting"],
         "serious_count": 3,
     }
-    chunks = Chunker.chunk_adverse_events("TYGACIL", ae_summary)
+    chunks = list(Chunker.chunk_adverse_events("TYGACIL", ae_summary))
     assert len(chunks) == 1
     chunk = chunks[0]
     assert "5000" in chunk["text"] or "5,000" in chunk["text"]
@@ -182,13 +189,29 @@ def test_chunk_adverse_events():
     assert chunk["metadata"]["drug_name"] == "TYGACIL"
 
 
+def test_chunk_adverse_events_aggregated_counts():
+    ae_summary = {
+        "total_reports": 5000,
+        "sample_reactions": ["NAUSEA", "HEADACHE"],
+        "serious_count": 1250,
+        "reaction_counts": [{"reaction": "NAUSEA", "count": 1200}, {"reaction": "HEADACHE", "count": 800}],
+        "outcome_counts": {"Recovered/resolved": 2500, "Fatal": 40},
+    }
+    chunks = list(Chunker.chunk_adverse_events("TYGACIL", ae_summary))
+    text = chunks[0]["text"]
+    assert "Serious Reports: 1,250 (25.0%)" in text
+    assert "NAUSEA (1,200)" in text
+    assert "Fatal: 40" in text
+    assert "in Sample" not in text
+
+
 # ── Edge case tests ──
 
 
 def test_chunk_clinical_trial_missing_fields():
     """Trial with minimal fields should not crash."""
     trial = {"nct_id": "NCT99999999", "title": "Minimal Trial"}
-    chunks = Chunker.chunk_clinical_trial(trial)
+    chunks = list(Chunker.chunk_clinical_trial(trial))
     assert len(chunks) == 1
     assert "NCT99999999" in chunks[0]["text"]
     assert chunks[0]["metadata"]["company"] == "Unknown"
@@ -197,7 +220,7 @@ def test_chunk_clinical_trial_missing_fields():
 
 def test_chunk_clinical_trial_empty_dict():
     """Completely empty trial dict should not crash."""
-    chunks = Chunker.chunk_clinical_trial({})
+    chunks = list(Chunker.chunk_clinical_trial({}))
     assert len(chunks) == 1
     assert chunks[0]["metadata"]["nct_id"] == ""
 
@@ -205,7 +228,7 @@ def test_chunk_clinical_trial_empty_dict():
 def test_chunk_fda_approval_missing_fields():
     """Approval with missing keys should not crash."""
     approval = {"manufacturer": "TestCo"}
-    chunks = Chunker.chunk_fda_approval(approval)
+    chunks = list(Chunker.chunk_fda_approval(approval))
     assert len(chunks) == 1
     assert chunks[0]["metadata"]["source"] == "fda_approval"
     assert chunks[0]["metadata"]["drug_name"] == "Unknown"
@@ -214,7 +237,7 @@ def test_chunk_fda_approval_missing_fields():
 def test_chunk_adverse_events_none_reactions():
     """Adverse events with sample_reactions=None should not crash."""
     ae_summary = {"total_reports": 100, "sample_reactions": None}
-    chunks = Chunker.chunk_adverse_events("TestDrug", ae_summary)
+    chunks = list(Chunker.chunk_adverse_events("TestDrug", ae_summary))
     assert len(chunks) == 1
     assert "100" in chunks[0]["text"]
 
@@ -222,7 +245,7 @@ def test_chunk_adverse_events_none_reactions():
 def test_chunk_adverse_events_missing_total():
     """Adverse events with missing total_reports should not crash."""
     ae_summary = {}
-    chunks = Chunker.chunk_adverse_events("TestDrug", ae_summary)
+    chunks = list(Chunker.chunk_adverse_events("TestDrug", ae_summary))
     assert len(chunks) == 1
     assert "0" in chunks[0]["text"]
 
@@ -230,7 +253,7 @@ def test_chunk_adverse_events_missing_total():
 def test_chunk_device_clearance_missing_device_name():
     """Device clearance without device_name should not crash."""
     clearance = {"k_number": "K999999"}
-    chunks = Chunker.chunk_device_clearance(clearance)
+    chunks = list(Chunker.chunk_device_clearance(clearance))
     assert len(chunks) == 1
     assert "Unknown" in chunks[0]["text"]
 
@@ -242,11 +265,51 @@ def test_chunk_company_financials_string_value():
         "revenue": {"value": "not_a_number", "period_end": "2024-01-01"},
     }
     market = {"ticker": "TEST", "current_price": "bad_value"}
-    chunks = Chunker.chunk_company_financials("Test Corp", facts, market)
+    chunks = list(Chunker.chunk_company_financials("Test Corp", facts, market))
     assert len(chunks) >= 1
 
 
 def test_chunk_company_financials_no_data():
     """Empty facts and no market data should return no chunks."""
-    chunks = Chunker.chunk_company_financials("Empty Corp", {}, None)
+    chunks = list(Chunker.chunk_company_financials("Empty Corp", {}, None))
     assert chunks == []
+
+
+def test_chunk_device_adverse_events_aggregated_counts():
+    ae_summary = {
+        "total_reports": 1000,
+        "serious_count": 100,
+        "sample_events": [],
+        "event_type_counts": {"Malfunction": 900, "Injury": 90, "Death": 10},
+        "device_class_counts": {"2": 1000},
+        "product_code_counts": {"QBS": 1000},
+        "reports_by_year": {"2022": 400, "2023": 600},
+    }
+    chunks = list(Chunker.chunk_device_adverse_events("DeepSight AI", ae_summary))
+    text = chunks[0]["text"]
+    assert "Serious Reports (Death/Injury): 100" in text
+    assert "Malfunction: 900" in text
+    assert "2023: 600" in text
+    assert "Narratives" not in text
+
+
+def test_chunk_company_financials_renders_trends():
+    facts = {
+        "revenue": {"value": 120_000_000, "period_end": "2023-12-31", "form": "10-K"},
+        "trends": {
+            "revenue_history": [
+                {"period_end": "2022-12-31", "value": 150_000_000, "yoy_growth": None},
+                {"period_end": "2023-12-31", "value": 120_000_000, "yoy_growth": -0.2},
+            ],
+            "rd_ttm": {"value": 530_000_000, "period_end": "2024-06-30"},
+            "quarterly_cash_burn": 200_000_000,
+            "cash_runway_quarters": 4.5,
+            "cash_as_of": "2024-03-31",
+        },
+    }
+    text = list(Chunker.chunk_company_financials("Burner Bio", facts, None))[0]["text"]
+
+    assert "$120.0M (period ending 2023-12-31) (-20.0% YoY)" in text
+    assert "R&D Expense (trailing 12 months): $530.0M (period ending 2024-06-30)" in text
+    assert "Quarterly Cash Burn: $200.0M" in text
+    assert "Cash Runway: 4.5 quarters" in text
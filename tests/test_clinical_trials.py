@@ -1,7 +1,7 @@
 # tests/test_clinical_trials.py
 import pytest
 from unittest.mock import patch, AsyncMock, MagicMock
-from src.api.clinical_trials import ClinicalTrialsClient
+from src.api.clinical_trials import ClinicalTrialsClient, phase_codes
 
 
 SAMPLE_API_RESPONSE = {
@@ -103,3 +103,163 @@ async def test_search_by_drug_returns_parsed_trials():
 
     assert len(results) == 1
     assert results[0]["nct_id"] == "NCT12345678"
+
+
+@pytest.mark.asyncio
+async def test_search_by_sponsor_pushes_phase_and_status_filters_to_api():
+    client = ClinicalTrialsClient()
+    mock_response = AsyncMock()
+    mock_response.json = MagicMock(return_value={"studies": [], "nextPageToken": None})
+    mock_response.raise_for_status = MagicMock(return_value=None)
+
+    with patch.object(client._client, "get", return_value=mock_response) as mock_get:
+        await client.search_by_sponsor(
+            "Moderna", condition="Oncology", phases=["Phase 1", "PHASE3"], statuses=["recruiting", "COMPLETED"],
+        )
+
+    params = mock_get.call_args.kwargs["params"]
+    assert params["query.cond"] == "Oncology"
+    assert params["filter.advanced"] == "AREA[Phase](EARLY_PHASE1 OR PHASE1 OR PHASE3)"
+    assert params["filter.overallStatus"] == "RECRUITING,COMPLETED"
+
+
+def test_phase_filter_is_case_insensitive_and_rejects_unknown_phases():
+    assert ClinicalTrialsClient._filter_params(phases=["phase 2"]) == {"filter.advanced": "AREA[Phase](PHASE2)"}
+    assert ClinicalTrialsClient._filter_params(phases=["2", "early phase 1"]) == {
+        "filter.advanced": "AREA[Phase](PHASE2 OR EARLY_PHASE1)"
+    }
+    assert phase_codes(["phase1", "n/a"]) == ["PHASE1", "NA"]
+    with pytest.raises(ValueError, match="Phase 9"):
+        ClinicalTrialsClient._filter_params(phases=["Phase 9"])
+
+
+@pytest.mark.asyncio
+async def test_search_by_drug_without_filters_sends_no_filter_params():
+    client = ClinicalTrialsClient()
+    mock_response = AsyncMock()
+    mock_response.json = MagicMock(return_value={"studies": [], "nextPageToken": None})
+    mock_response.raise_for_status = MagicMock(return_value=None)
+
+    with patch.object(client._client, "get", return_value=mock_response) as mock_get:
+        await client.search_by_drug("Drug X")
+
+    params = mock_get.call_args.kwargs["params"]
+    assert "filter.advanced" not in params
+    assert "filter.overallStatus" not in params
+
+
+def _project(node, paths):
+    """Mimic the v2 API's ``fields`` projection on a raw study."""
+    heads = {}
+    for path in paths:
+        head, _, rest = path.partition(".")
+        heads.setdefault(head, []).append(rest)
+    if isinstance(node, list):
+        return [_project(item, paths) for item in node]
+    projected = {}
+    for head, rests in heads.items():
+        if head in node:
+            projected[head] = node[head] if "" in rests else _project(node[head], rests)
+    return projected
+
+
+@pytest.mark.asyncio
+async def test_search_requests_only_parsed_fields():
+    from src.api.clinical_trials import STUDY_FIELDS
+
+    client = ClinicalTrialsClient()
+    raw_study = SAMPLE_API_RESPONSE["studies"][0]
+    projected = {"studies": [_project(raw_study, STUDY_FIELDS)], "nextPageToken": None}
+    mock_response = AsyncMock()
+    mock_response.json = MagicMock(return_value=projected)
+    mock_response.raise_for_status = MagicMock(return_value=None)
+
+    with patch.object(client._client, "get", return_value=mock_response) as mock_get:
+        results = await client.search_by_sponsor("TestPharma")
+
+    assert mock_get.call_args.kwargs["params"]["fields"] == ",".join(STUDY_FIELDS)
+    # The projection drops modules we never read but keeps everything _parse_study needs
+    assert "organization" not in projected["studies"][0]["protocolSection"]["identificationModule"]
+    assert results == [client._parse_study(raw_study)]
+
+
+@pytest.mark.asyncio
+async def test_iter_studies_prefetches_next_page_before_parsing_current():
+    client = ClinicalTrialsClient()
+    study = SAMPLE_API_RESPONSE["studies"][0]
+    pages = [
+        {"studies": [study, study], "nextPageToken": "page-2"},
+        {"studies": [study], "nextPageToken": "page-3"},
+        {"studies": [study], "nextPageToken": None},
+    ]
+    requested_tokens = []
+
+    async def fake_get(url, params):
+        requested_tokens.append(params.get("pageToken"))
+        response = MagicMock()
+        response.json = MagicMock(return_value=pages[len(requested_tokens) - 1])
+        return response
+
+    with patch.object(client._client, "get", side_effect=fake_get):
+        iterator = client.iter_by_sponsor("TestPharma")
+        first = await iterator.__anext__()
+        # Page 2 is already in flight while page 1 is still being consumed
+        assert requested_tokens == [None, "page-2"]
+        rest = [s async for s in iterator]
+
+    assert first["nct_id"] == "NCT12345678"
+    assert len(rest) == 3
+    assert requested_tokens == [None, "page-2", "page-3"]
+
+
+@pytest.mark.asyncio
+async def test_search_stops_paging_at_max_results():
+    client = ClinicalTrialsClient()
+    study = SAMPLE_API_RESPONSE["studies"][0]
+    mock_response = MagicMock()
+    mock_response.json = MagicMock(return_value={"studies": [study] * 3, "nextPageToken": "more"})
+
+    with patch.object(client._client, "get", return_value=mock_response) as mock_get:
+        results = await client.search_by_sponsor("TestPharma", max_results=3)
+
+    assert len(results) == 3
+    mock_get.assert_called_once()
+    assert mock_get.call_args.kwargs["params"]["pageSize"] == 3
+
+
+@pytest.mark.asyncio
+async def test_search_by_sponsor_or_drug_issues_one_query_and_tags_matches():
+    import copy
+
+    client = ClinicalTrialsClient()
+    sponsored = SAMPLE_API_RESPONSE["studies"][0]
+    licensed = copy.deepcopy(sponsored)
+    licensed["protocolSection"]["identificationModule"]["nctId"] = "NCT87654321"
+    licensed["protocolSection"]["sponsorCollaboratorsModule"] = {
+        "leadSponsor": {"name": "Academic Center"},
+        "collaborators": [{"name": "TestPharma Inc"}],
+    }
+    licensed["protocolSection"]["armsInterventionsModule"]["interventions"] = [{"name": "Placebo", "type": "DRUG"}]
+    by_drug = copy.deepcopy(sponsored)
+    by_drug["protocolSection"]["identificationModule"]["nctId"] = "NCT11111111"
+    by_drug["protocolSection"]["sponsorCollaboratorsModule"] = {"leadSponsor": {"name": "Other Co"}}
+    by_drug["protocolSection"]["armsInterventionsModule"]["interventions"] = [
+        {"name": "TestPharma-123 tablets", "type": "DRUG"}
+    ]
+
+    mock_response = AsyncMock()
+    mock_response.json = MagicMock(return_value={"studies": [by_drug, sponsored, licensed], "nextPageToken": None})
+    mock_response.raise_for_status = MagicMock(return_value=None)
+
+    with patch.object(client._client, "get", return_value=mock_response) as mock_get:
+        results = await client.search_by_sponsor_or_drug("TestPharma", phases=["Phase 3"])
+
+    mock_get.assert_called_once()
+    params = mock_get.call_args.kwargs["params"]
+    assert params["query.term"] == 'AREA[SponsorSearch]"TestPharma" OR AREA[InterventionSearch]"TestPharma"'
+    assert params["filter.advanced"] == "AREA[Phase](PHASE3)"
+    assert [(r["nct_id"], r["matched_on"]) for r in results] == [
+        ("NCT12345678", ["sponsor"]),
+        ("NCT87654321", ["sponsor"]),
+        ("NCT11111111", ["intervention"]),
+    ]
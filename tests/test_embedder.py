@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from src.ingestion.embedder import Embedder
+from src.ingestion.embedder import Embedder, chunk_id
 
 
 @pytest.fixture
@@ -20,6 +20,7 @@ def mock_chroma():
         mock_client = MagicMock()
         mock_mod.PersistentClient.return_value = mock_client
         mock_collection = MagicMock()
+        mock_collection.get.return_value = {"ids": []}
         mock_client.get_or_create_collection.return_value = mock_collection
         yield mock_collection
 
@@ -49,3 +50,21 @@ def test_embed_and_store_batches_large_inputs(mock_openai, mock_chroma):
     mock_openai.embeddings.create.side_effect = side_effect
     embedder.embed_and_store(chunks, collection_name="test_company")
     assert mock_openai.embeddings.create.call_count >= 2
+    # Each batch is upserted as soon as it is embedded
+    assert mock_chroma.upsert.call_count == mock_openai.embeddings.create.call_count
+
+
+def test_embed_and_store_skips_chunks_already_stored(mock_openai, mock_chroma):
+    embedder = Embedder(openai_api_key="test-key", chroma_path="/tmp/test_chroma")
+    stored = {"text": "Clinical trial NCT123", "metadata": {"source": "clinicaltrials"}}
+    new = {"text": "FDA approval NDA456", "metadata": {"source": "fda_approval"}}
+    mock_chroma.get.return_value = {"ids": [chunk_id(stored)]}
+
+    embedder.embed_and_store([stored, new], collection_name="test_company")
+    assert mock_openai.embeddings.create.call_args.kwargs["input"] == ["FDA approval NDA456"]
+    assert mock_chroma.upsert.call_args.kwargs["ids"] == [chunk_id(new)]
+
+    mock_openai.embeddings.create.reset_mock()
+    mock_chroma.get.return_value = {"ids": [chunk_id(stored), chunk_id(new)]}
+    embedder.embed_and_store([stored, new], collection_name="test_company")
+    mock_openai.embeddings.create.assert_not_called()
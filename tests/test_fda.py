@@ -1,7 +1,10 @@
 # tests/test_fda.py
+import asyncio
+
+import httpx
 import pytest
 from unittest.mock import patch, AsyncMock, MagicMock
-from src.api.fda import FDAClient
+from src.api.fda import LABEL_BATCH_MAX_PAGES, FDAClient
 
 
 SAMPLE_DRUGSFDA_RESPONSE = {
@@ -133,13 +136,54 @@ async def test_get_adverse_event_summary():
     mock_response.raise_for_status = MagicMock(return_value=None)
 
     with patch.object(client._client, "get", return_value=mock_response):
-        summary = await client.get_adverse_events_summary("TYGACIL")
+        summary = await client.get_adverse_events_summary("TYGACIL", mode="sample")
 
     assert summary["total_reports"] == 5000
     assert summary["sample_reactions"] == ["Nausea", "Headache"]
     assert summary["serious_count"] >= 0
 
 
+@pytest.mark.asyncio
+async def test_get_adverse_event_summary_uses_count_queries():
+    client = FDAClient()
+    count_results = {
+        "patient.reaction.reactionmeddrapt.exact": [
+            {"term": "NAUSEA", "count": 1200}, {"term": "HEADACHE", "count": 800},
+        ],
+        "serious": [{"term": 1, "count": 3000}, {"term": 2, "count": 2000}],
+        "patient.reaction.reactionoutcome": [{"term": 1, "count": 2500}, {"term": 5, "count": 40}],
+    }
+
+    async def fake_get(url, params):
+        response = MagicMock(status_code=200)
+        response.json = MagicMock(return_value={"results": count_results[params["count"]]})
+        return response
+
+    with patch.object(client._client, "get", side_effect=fake_get) as mock_get:
+        summary = await client.get_adverse_events_summary("TYGACIL")
+
+    assert mock_get.call_count == 3
+    assert all("limit" in c.kwargs["params"] and "count" in c.kwargs["params"] for c in mock_get.call_args_list)
+    assert summary["total_reports"] == 5000
+    assert summary["serious_count"] == 3000
+    assert summary["sample_reactions"] == ["NAUSEA", "HEADACHE"]
+    assert summary["reaction_counts"][0] == {"reaction": "NAUSEA", "count": 1200}
+    assert summary["outcome_counts"] == {"Recovered/resolved": 2500, "Fatal": 40}
+
+
+@pytest.mark.asyncio
+async def test_get_adverse_event_summary_count_mode_handles_no_matches():
+    client = FDAClient()
+    not_found = MagicMock(status_code=404)
+
+    with patch.object(client._client, "get", return_value=not_found):
+        summary = await client.get_adverse_events_summary("UnknownDrug")
+
+    assert summary["total_reports"] == 0
+    assert summary["sample_reactions"] == []
+    assert summary["serious_count"] == 0
+
+
 SAMPLE_DEVICE_510K_RESPONSE = {
     "meta": {"results": {"total": 1}},
     "results": [
@@ -217,7 +261,7 @@ async def test_get_device_adverse_events_summary():
     mock_response.raise_for_status = MagicMock(return_value=None)
 
     with patch.object(client._client, "get", return_value=mock_response):
-        summary = await client.get_device_adverse_events_summary("DeepSight AI")
+        summary = await client.get_device_adverse_events_summary("DeepSight AI", mode="sample")
 
     assert summary["total_reports"] == 120
     assert summary["serious_count"] == 1  # "Injury" counts as serious
@@ -252,3 +296,165 @@ async def test_search_approvals_handles_no_results():
         results = await client.search_approvals("NonexistentPharma")
 
     assert results == []
+
+
+@pytest.mark.asyncio
+async def test_get_device_adverse_events_summary_aggregates_counts():
+    client = FDAClient()
+    count_results = {
+        "event_type.exact": [{"term": "Malfunction", "count": 900}, {"term": "Injury", "count": 90},
+                             {"term": "Death", "count": 10}],
+        "device.openfda.device_class": [{"term": "2", "count": 1000}],
+        "device.device_report_product_code.exact": [{"term": "QBS", "count": 1000}],
+        "date_received": [{"time": "20221231", "count": 400}, {"time": "20230105", "count": 350},
+                          {"time": "20230610", "count": 250}],
+    }
+
+    async def fake_get(url, params):
+        response = MagicMock(status_code=200)
+        response.json = MagicMock(return_value={"results": count_results[params["count"]]})
+        return response
+
+    with patch.object(client._client, "get", side_effect=fake_get) as mock_get:
+        summary = await client.get_device_adverse_events_summary("DeepSight AI")
+
+    assert mock_get.call_count == 4
+    assert summary["total_reports"] == 1000
+    assert summary["serious_count"] == 100
+    assert summary["sample_events"] == []
+    assert summary["device_class_counts"] == {"2": 1000}
+    assert summary["product_code_counts"] == {"QBS": 1000}
+    assert summary["reports_by_year"] == {"2022": 400, "2023": 600}
+
+
+@pytest.mark.asyncio
+async def test_get_device_event_narratives():
+    client = FDAClient()
+    mock_response = AsyncMock()
+    mock_response.json = MagicMock(return_value=SAMPLE_DEVICE_EVENT_RESPONSE)
+    mock_response.raise_for_status = MagicMock(return_value=None)
+
+    with patch.object(client._client, "get", return_value=mock_response):
+        narratives = await client.get_device_event_narratives("DeepSight AI", limit=1)
+
+    assert narratives == ["Patient experienced minor skin irritation during use of device."]
+
+
+def _label_record(set_id, brand, generic):
+    return {"set_id": set_id, "openfda": {"brand_name": [brand], "generic_name": [generic]}}
+
+
+@pytest.mark.asyncio
+async def test_search_labels_batch_fans_out_and_dedupes():
+    client = FDAClient()
+    records = [
+        _label_record("s1", "TYGACIL", "TIGECYCLINE"),
+        _label_record("s1", "TYGACIL", "TIGECYCLINE"),
+        _label_record("s2", "Eliquis", "APIXABAN"),
+        _label_record("s3", "Tigecycline Injection", "TIGECYCLINE"),
+    ]
+    mock_response = MagicMock(status_code=200)
+    mock_response.json = MagicMock(return_value={"meta": {"results": {"total": 4}}, "results": records})
+
+    with patch.object(client._client, "get", return_value=mock_response) as mock_get:
+        labels = await client.search_labels_batch(["TYGACIL", "Eliquis", "Tigecycline", "Nothing"])
+
+    assert mock_get.call_count == 1
+    search = mock_get.call_args.kwargs["params"]["search"]
+    assert 'openfda.brand_name:"TYGACIL"' in search and 'openfda.generic_name:"Eliquis"' in search
+    assert [label["set_id"] for label in labels["TYGACIL"]] == ["s1"]
+    assert [label["set_id"] for label in labels["Eliquis"]] == ["s2"]
+    assert [label["set_id"] for label in labels["Tigecycline"]] == ["s1", "s3"]
+    assert labels["Nothing"] == []
+
+
+@pytest.mark.asyncio
+async def test_search_labels_batch_requeries_names_crowded_out_by_page_cap():
+    sertraline = [_label_record(f"ser-{i}", "SERTRALINE HYDROCHLORIDE", "SERTRALINE HYDROCHLORIDE")
+                  for i in range(800)]
+    lipitor = _label_record("lip-1", "LIPITOR", "ATORVASTATIN CALCIUM")
+    searches = []
+
+    def handler(request):
+        params = request.url.params
+        searches.append(params["search"])
+        records = sertraline + [lipitor] if "SERTRALINE" in params["search"] else [lipitor]
+        skip, limit = int(params.get("skip", 0)), int(params["limit"])
+        return httpx.Response(200, json={
+            "meta": {"results": {"total": len(records)}}, "results": records[skip:skip + limit],
+        })
+
+    client = FDAClient()
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    labels = await client.search_labels_batch(["SERTRALINE HYDROCHLORIDE", "LIPITOR"])
+
+    assert len(labels["SERTRALINE HYDROCHLORIDE"]) == 10
+    assert [label["set_id"] for label in labels["LIPITOR"]] == ["lip-1"]
+    assert len(searches) == LABEL_BATCH_MAX_PAGES + 1
+    assert "SERTRALINE" not in searches[-1]
+
+
+def test_label_batches_respect_query_budget():
+    from urllib.parse import quote_plus
+    from src.api.fda import LABEL_BATCH_MAX_QUERY_CHARS
+
+    names = [f"Drug Name Number {i}" for i in range(100)]
+    batches = FDAClient._label_batches(names)
+
+    assert 1 < len(batches) < 20
+    assert [name for batch in batches for name in batch] == names
+    for batch in batches:
+        search = "+".join(FDAClient._label_search(name) for name in batch)
+        assert len(quote_plus(search)) <= LABEL_BATCH_MAX_QUERY_CHARS
+
+
+@pytest.mark.asyncio
+async def test_search_device_clearances_pages_concurrently_up_to_limit():
+    client = FDAClient()
+    total = 250
+
+    async def fake_get(url, params):
+        skip = params.get("skip", 0)
+        records = [{"k_number": f"K{i:05d}"} for i in range(skip, min(skip + params["limit"], total))]
+        response = MagicMock(status_code=200)
+        response.json = MagicMock(return_value={"meta": {"results": {"total": total}}, "results": records})
+        return response
+
+    with patch.object(client._client, "get", side_effect=fake_get) as mock_get:
+        results = await client.search_device_clearances("BigDevices")
+
+    assert mock_get.call_count == 3
+    assert [r["k_number"] for r in results] == [f"K{i:05d}" for i in range(total)]
+
+    with patch.object(client._client, "get", side_effect=fake_get) as mock_get:
+        capped = await client.search_device_clearances("BigDevices", limit=150)
+
+    assert mock_get.call_count == 2
+    assert len(capped) == 150
+    assert mock_get.call_args_list[1].kwargs["params"] == {
+        "search": 'applicant:"BigDevices"+device_name:"BigDevices"', "limit": 50, "skip": 100,
+    }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_skip_pages_are_returned_in_page_order():
+    client = FDAClient()
+    total = 450
+    finished = []
+
+    async def fake_get(url, params):
+        skip = params.get("skip", 0)
+        # Later pages answer first
+        await asyncio.sleep((total - skip) / 5000)
+        finished.append(skip)
+        records = [{"k_number": f"K{i:05d}"} for i in range(skip, min(skip + params["limit"], total))]
+        response = MagicMock(status_code=200)
+        response.json = MagicMock(return_value={"meta": {"results": {"total": total}}, "results": records})
+        return response
+
+    with patch.object(client._client, "get", side_effect=fake_get):
+        results = await client.search_device_clearances("BigDevices", limit=total)
+
+    assert finished == [0, 400, 300, 200, 100]
+    assert [r["k_number"] for r in results] == [f"K{i:05d}" for i in range(total)]
@@ -0,0 +1,53 @@
+# tests/test_filings_index.py
+import datetime
+
+from src.api.filings_index import CompanyFilings, FilingsIndex
+
+RECENT = {
+    "form": ["8-K", "10-Q", "8-K", "4", "10-K"],
+    "filingDate": ["2024-06-15", "2024-08-01", "2024-03-10", "2024-05-01", "2024-02-22"],
+    "accessionNumber": ["a-1", "a-2", "a-3", "a-4", "a-5"],
+    "primaryDocument": ["d1.htm", "d2.htm", "d3.htm", "d4.htm", "d5.htm"],
+    "primaryDocDescription": ["8-K", "10-Q"],
+}
+
+
+def test_query_filters_by_form_and_date_newest_first():
+    index = FilingsIndex.from_columns(RECENT)
+
+    assert list(index.query()) == [1, 0, 3, 2, 4]
+    assert list(index.query(["8-K"])) == [0, 2]
+    assert list(index.query(["8-K", "10-K"], since="2024-03-10")) == [0, 2]
+    assert list(index.query(until=datetime.date(2024, 3, 10))) == [2, 4]
+
+
+def test_records_pad_missing_descriptions_and_build_urls():
+    index = FilingsIndex.from_columns(RECENT)
+
+    records = index.records(index.query(["10-K"]), "0001682852", "Moderna, Inc.")
+
+    assert records == [{
+        "form_type": "10-K",
+        "filing_date": "2024-02-22",
+        "accession_number": "a-5",
+        "primary_document": "d5.htm",
+        "description": "",
+        "filing_url": "https://www.sec.gov/Archives/edgar/data/1682852/a5/d5.htm",
+        "company_name": "Moderna, Inc.",
+    }]
+
+
+def test_next_page_skips_pages_outside_the_window():
+    filings = CompanyFilings({"filings": {"recent": RECENT, "files": [
+        {"name": "p1.json", "filingFrom": "2020-01-01", "filingTo": "2023-12-31"},
+        {"name": "p2.json", "filingFrom": "2010-01-01", "filingTo": "2019-12-31"},
+    ]}})
+
+    assert filings.next_page(since="2024-01-01", until=None) is None
+    assert filings.next_page(since="2015-01-01", until="2019-06-30")["name"] == "p2.json"
+    assert filings.next_page(None, None, newer_than=filings.index.filing_date[4]) is None
+
+    filings.add_page(filings.pending_pages[0], {"form": ["10-K"], "filingDate": ["2023-02-24"],
+                                                 "accessionNumber": ["a-6"], "primaryDocument": ["d6.htm"]})
+    assert len(filings.index) == 6
+    assert [p["name"] for p in filings.pending_pages] == ["p2.json"]
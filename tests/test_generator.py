@@ -75,3 +75,16 @@ def test_generate_chat_response_empty_response():
         generator = Generator(api_key="test-key")
         result = generator.generate_chat_response("test?", [], [])
         assert "try again" in result.lower()
+
+
+def test_stream_report_yields_text_deltas(mock_anthropic):
+    stream = MagicMock()
+    stream.text_stream = iter(["## Due Diligence", " Report"])
+    mock_anthropic.messages.stream.return_value.__enter__.return_value = stream
+
+    generator = Generator(api_key="test-key")
+    parts = list(generator.stream_report("TestPharma", [{"text": "data", "metadata": {}}]))
+
+    assert parts == ["## Due Diligence", " Report"]
+    call_kwargs = mock_anthropic.messages.stream.call_args.kwargs
+    assert call_kwargs["model"] == "claude-sonnet-4-5-20250929"
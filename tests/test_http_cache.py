@@ -0,0 +1,91 @@
+import httpx
+import pytest
+
+from src.api.http_cache import CacheTransport, HTTPCache, cache_key
+
+RULES = (("api.fda.gov", "/", 60),)
+
+
+def _client(handler, cache, rules=RULES):
+    return httpx.AsyncClient(transport=CacheTransport(httpx.MockTransport(handler), cache, rules))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    http_cache = HTTPCache(str(tmp_path / "http_cache.db"))
+    yield http_cache
+    http_cache.close()
+
+
+@pytest.mark.asyncio
+async def test_fresh_entries_are_served_without_network(cache):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"results": [1]})
+
+    async with _client(handler, cache) as client:
+        first = await client.get("https://api.fda.gov/drug/label.json", params={"search": "x", "api_key": "k1"})
+        second = await client.get("https://api.fda.gov/drug/label.json", params={"search": "x", "api_key": "k2"})
+
+    assert len(calls) == 1
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == {"results": [1]}
+
+
+@pytest.mark.asyncio
+async def test_stale_entries_are_revalidated_with_etag(cache):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"ETag": '"v1"'}, json={"results": [1]})
+
+    async with _client(handler, cache, rules=(("api.fda.gov", "/", 0),)) as client:
+        await client.get("https://api.fda.gov/drug/label.json")
+        revalidated = await client.get("https://api.fda.gov/drug/label.json")
+
+    assert len(calls) == 2
+    assert revalidated.status_code == 200
+    assert revalidated.headers["X-Cache"] == "REVALIDATED"
+    assert revalidated.json() == {"results": [1]}
+
+
+@pytest.mark.asyncio
+async def test_unmatched_paths_and_errors_are_not_cached(cache):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500) if request.url.host == "api.fda.gov" else httpx.Response(200)
+
+    async with _client(handler, cache) as client:
+        for _ in range(2):
+            await client.get("https://api.fda.gov/drug/event.json")
+            await client.get("https://example.com/other")
+
+    assert len(calls) == 4
+    assert cache.total_bytes() == 0
+
+
+def test_lru_eviction_keeps_total_under_max_bytes(tmp_path):
+    cache = HTTPCache(str(tmp_path / "http_cache.db"), max_bytes=250)
+    cache.put("a", 200, [], b"a" * 100, ttl=60)
+    cache.put("b", 200, [], b"b" * 100, ttl=60)
+    cache.get("a")
+    cache.put("c", 200, [], b"c" * 100, ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.total_bytes() == 200
+    cache.close()
+
+
+def test_cache_key_ignores_api_key():
+    with_key = httpx.Request("GET", "https://api.fda.gov/x", params={"search": "y", "api_key": "secret"})
+    without_key = httpx.Request("GET", "https://api.fda.gov/x", params={"search": "y"})
+    assert cache_key(with_key) == cache_key(without_key)
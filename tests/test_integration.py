@@ -16,8 +16,7 @@ async def test_full_pipeline_with_mocked_apis():
     """Test the complete flow: fetch -> chunk -> embed -> retrieve -> generate."""
     # Mock ClinicalTrials API
     ct_client = AsyncMock(spec=ClinicalTrialsClient)
-    ct_client.search_by_drug.return_value = []
-    ct_client.search_by_sponsor.return_value = [
+    trials = [
         {
             "nct_id": "NCT99999999",
             "title": "Phase 3 Study of MagicDrug in Oncology",
@@ -37,6 +36,12 @@ async def test_full_pipeline_with_mocked_apis():
         }
     ]
 
+    async def iter_trials(*args, **kwargs):
+        for trial in trials:
+            yield trial
+
+    ct_client.iter_by_sponsor_or_drug.side_effect = iter_trials
+
     # Mock FDA API
     fda_client = AsyncMock(spec=FDAClient)
     fda_client.search_approvals.return_value = [
@@ -50,8 +55,9 @@ async def test_full_pipeline_with_mocked_apis():
             "submissions": [{"submission_type": "ORIG", "submission_status": "AP", "submission_status_date": "20220101", "submission_class_code_description": "New Molecular Entity"}],
         }
     ]
-    fda_client.search_labels.return_value = [
+    fda_client.search_labels_batch.return_value = {"MagicDrug": [
         {
+            "set_id": "label-1",
             "brand_name": "MagicDrug",
             "generic_name": "magicdruginib",
             "manufacturer": "IntegrationPharma",
@@ -60,7 +66,7 @@ async def test_full_pipeline_with_mocked_apis():
             "warnings": "Monitor liver function",
             "adverse_reactions": "Common: fatigue, nausea",
         }
-    ]
+    ]}
     fda_client.get_adverse_events_summary.return_value = {
         "total_reports": 250,
         "sample_reactions": ["Fatigue", "Nausea", "Headache"],
@@ -104,10 +110,9 @@ async def test_full_pipeline_with_mocked_apis():
     report = await builder.build_report("IntegrationPharma")
 
     # Verify the pipeline executed correctly
-    ct_client.search_by_sponsor.assert_called_once_with("IntegrationPharma", condition=None)
-    ct_client.search_by_drug.assert_called_once_with("IntegrationPharma", condition=None)
+    ct_client.iter_by_sponsor_or_drug.assert_called_once_with("IntegrationPharma", condition=None, phases=None)
     fda_client.search_approvals.assert_called_once_with("IntegrationPharma")
-    fda_client.search_labels.assert_called_once_with("MagicDrug")
+    fda_client.search_labels_batch.assert_called_once_with(["MagicDrug"])
     fda_client.get_adverse_events_summary.assert_called_once_with("MagicDrug")
     embedder.embed_and_store.assert_called_once()
 
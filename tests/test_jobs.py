@@ -0,0 +1,120 @@
+# tests/test_jobs.py
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+from unittest.mock import MagicMock
+from api.jobs import JobStore, QueueFullError, ReportJobQueue
+
+
+class FakeBuilder:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    async def build_report(self, company, condition=None, phases=None, on_event=None):
+        on_event({"stage": "sources", "counts": {"trials": 1}, "errors": 0})
+        if self.fail:
+            raise RuntimeError("pipeline exploded")
+        report = f"## Report for {company}"
+        on_event({"stage": "done", "report": report, "collection_id": company.lower(), "cache_status": "miss"})
+        return report
+
+
+async def _wait_for_status(store, job_id, statuses=("succeeded", "failed")):
+    for _ in range(100):
+        job = store.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.mark.asyncio
+async def test_job_runs_and_persists_result(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    queue = ReportJobQueue(FakeBuilder(), JobStore(db_path), workers=1)
+    await queue.start()
+    job_id = await queue.submit("TestCo", phases=["Phase 3"], user_id="user-123")
+    job = await _wait_for_status(queue._store, job_id)
+    await queue.stop()
+
+    assert job["status"] == "succeeded"
+    assert job["report"] == "## Report for TestCo"
+    assert job["collection_id"] == "testco"
+    assert job["cache_status"] == "miss"
+    assert set(job["stage_timings"]) == {"sources", "done"}
+
+    # A new store on the same file (i.e. after a restart) still has the result
+    reopened = JobStore(db_path).get(job_id)
+    assert reopened["report"] == "## Report for TestCo"
+    assert reopened["phases"] == ["Phase 3"]
+
+
+@pytest.mark.asyncio
+async def test_store_writes_stay_off_the_event_loop(tmp_path, monkeypatch):
+    writer_threads = set()
+    update = JobStore._update
+
+    def recording_update(self, job_id, **fields):
+        writer_threads.add(threading.current_thread())
+        update(self, job_id, **fields)
+
+    monkeypatch.setattr(JobStore, "_update", recording_update)
+    queue = ReportJobQueue(FakeBuilder(), JobStore(str(tmp_path / "jobs.db")), workers=1)
+    await queue.start()
+    job_id = await queue.submit("TestCo")
+    await _wait_for_status(queue._store, job_id)
+    await queue.stop()
+
+    assert writer_threads and threading.current_thread() not in writer_threads
+    assert len(writer_threads) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_job_records_generic_error(tmp_path):
+    queue = ReportJobQueue(FakeBuilder(fail=True), JobStore(str(tmp_path / "jobs.db")), workers=1)
+    await queue.start()
+    job_id = await queue.submit("BrokenCo")
+    job = await _wait_for_status(queue._store, job_id)
+    await queue.stop()
+
+    assert job["status"] == "failed"
+    assert job["error"] == "Report generation failed. Please try again."
+    assert "sources" in job["stage_timings"]
+
+
+@pytest.mark.asyncio
+async def test_queue_rejects_jobs_when_full(tmp_path):
+    queue = ReportJobQueue(MagicMock(), JobStore(str(tmp_path / "jobs.db")), workers=0, max_pending=1)
+    await queue.start()
+    await queue.submit("FirstCo")
+    with pytest.raises(QueueFullError):
+        await queue.submit("SecondCo")
+
+
+def test_unfinished_jobs_fail_after_restart(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    queued = store.create("QueuedCo")
+    running = store.create("RunningCo")
+    store.mark_running(running)
+
+    assert store.fail_unfinished() == 2
+    assert store.get(queued)["status"] == "failed"
+    assert store.get(running)["error"] == "Interrupted by server restart"
+
+
+def test_store_adds_cache_status_to_an_existing_database(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE report_jobs (id TEXT PRIMARY KEY, user_id TEXT, company TEXT NOT NULL, "
+            "condition TEXT, phases TEXT, status TEXT NOT NULL, created_at REAL NOT NULL, started_at REAL, "
+            "finished_at REAL, stage_timings TEXT NOT NULL DEFAULT '{}', report TEXT, collection_id TEXT, "
+            "error TEXT)"
+        )
+    store = JobStore(db_path)
+    job_id = store.create("OldCo")
+    store.complete(job_id, "## Report", "oldco", "hit")
+
+    assert store.get(job_id)["cache_status"] == "hit"
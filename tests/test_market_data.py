@@ -0,0 +1,166 @@
+# tests/test_market_data.py
+import asyncio
+import threading
+
+import pytest
+from unittest.mock import patch
+
+from src.api.market_data import MarketDataBackend, MarketDataService
+
+
+class StubBackend(MarketDataBackend):
+    def __init__(self, quotes=None, fundamentals=None):
+        self.quotes = quotes or {}
+        self.fundamentals = fundamentals or {}
+        self.quote_calls = []
+        self.fundamental_calls = []
+
+    def fetch_quotes(self, tickers):
+        self.quote_calls.append(list(tickers))
+        return {t: self.quotes[t] for t in tickers if t in self.quotes}
+
+    def fetch_fundamentals(self, tickers):
+        self.fundamental_calls.append(list(tickers))
+        return {t: self.fundamentals[t] for t in tickers if t in self.fundamentals}
+
+
+QUOTES = {
+    "PFE": {"price": 30.0, "fifty_two_week_high": 40.0, "fifty_two_week_low": 25.0},
+    "MRNA": {"price": 100.0, "fifty_two_week_high": 160.0, "fifty_two_week_low": 90.0},
+}
+FUNDAMENTALS = {
+    "PFE": {
+        "shares_outstanding": 5_000_000_000, "trailing_eps": 2.0, "forward_eps": 3.0,
+        "book_value": 15.0, "total_cash": 10_000_000_000, "total_debt": 60_000_000_000,
+        "sector": "Healthcare",
+    },
+}
+
+
+@pytest.mark.asyncio
+async def test_get_merges_quote_with_fundamentals_and_derives_ratios():
+    service = MarketDataService(backend=StubBackend(QUOTES, FUNDAMENTALS))
+
+    data = await service.get("pfe")
+
+    assert data["ticker"] == "PFE"
+    assert data["current_price"] == 30.0
+    assert data["market_cap"] == 150_000_000_000
+    assert data["enterprise_value"] == 200_000_000_000
+    assert data["trailing_pe"] == 15.0
+    assert data["forward_pe"] == 10.0
+    assert data["price_to_book"] == 2.0
+    assert data["fifty_two_week_low"] == 25.0
+    assert data["sector"] == "Healthcare"
+
+
+@pytest.mark.asyncio
+async def test_get_many_batches_stale_tickers_and_caches():
+    backend = StubBackend(QUOTES, FUNDAMENTALS)
+    service = MarketDataService(backend=backend)
+
+    results = await service.get_many(["PFE", "MRNA", "pfe"])
+    await service.get("MRNA")
+
+    assert set(results) == {"PFE", "MRNA"}
+    assert results["MRNA"]["market_cap"] is None
+    assert backend.quote_calls == [["PFE", "MRNA"]]
+    # MRNA had no fundamentals, so it is cached as missing rather than retried
+    assert backend.fundamental_calls == [["PFE", "MRNA"]]
+
+
+@pytest.mark.asyncio
+async def test_missing_tickers_are_retried_after_the_missing_ttl():
+    backend = StubBackend(QUOTES, FUNDAMENTALS)
+    service = MarketDataService(backend=backend, missing_ttl=60)
+
+    with patch("src.api.market_data.time.monotonic", return_value=1000.0):
+        assert await service.get("NOPE") is None
+        assert await service.get("NOPE") is None
+    with patch("src.api.market_data.time.monotonic", return_value=1100.0):
+        assert await service.get("NOPE") is None
+
+    assert backend.quote_calls == [["NOPE"], ["NOPE"]]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gets_share_one_backend_fetch():
+    release = threading.Event()
+
+    class SlowBackend(StubBackend):
+        def fetch_quotes(self, tickers):
+            release.wait(5)
+            return super().fetch_quotes(tickers)
+
+    backend = SlowBackend(QUOTES, FUNDAMENTALS)
+    service = MarketDataService(backend=backend)
+
+    first = asyncio.create_task(service.get("PFE"))
+    await asyncio.sleep(0.05)
+    second = asyncio.create_task(service.get_many(["PFE", "MRNA"]))
+    await asyncio.sleep(0.05)
+    release.set()
+    results = await asyncio.gather(first, second)
+
+    assert results[0]["current_price"] == 30.0
+    assert set(results[1]) == {"PFE", "MRNA"}
+    # Both quote fetches wait on the same event, so they may record in either order
+    assert sorted(backend.quote_calls) == [["MRNA"], ["PFE"]]
+    assert backend.fundamental_calls == [["PFE"], ["MRNA"]]
+
+
+@pytest.mark.asyncio
+async def test_quotes_expire_before_fundamentals():
+    backend = StubBackend(QUOTES, FUNDAMENTALS)
+    service = MarketDataService(backend=backend, quote_ttl=60, fundamentals_ttl=3600)
+
+    with patch("src.api.market_data.time.monotonic", return_value=1000.0):
+        await service.get("PFE")
+    with patch("src.api.market_data.time.monotonic", return_value=1100.0):
+        await service.get("PFE")
+
+    assert backend.quote_calls == [["PFE"], ["PFE"]]
+    assert backend.fundamental_calls == [["PFE"]]
+
+
+@pytest.mark.asyncio
+async def test_backend_failure_returns_none():
+    class FailingBackend(StubBackend):
+        def fetch_quotes(self, tickers):
+            raise RuntimeError("rate limited")
+
+    service = MarketDataService(backend=FailingBackend(QUOTES, FUNDAMENTALS))
+
+    assert await service.get("PFE") is None
+
+
+@pytest.mark.asyncio
+async def test_unknown_ticker_returns_none():
+    service = MarketDataService(backend=StubBackend(QUOTES, FUNDAMENTALS))
+    assert await service.get("NOPE") is None
+
+
+def test_backend_interface_is_abstract():
+    class Partial(MarketDataBackend):
+        def fetch_quotes(self, tickers):
+            return {}
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+@pytest.mark.asyncio
+async def test_cache_drops_expired_entries_and_caps_size():
+    quotes = {f"T{i}": {"price": 1.0} for i in range(5)}
+    service = MarketDataService(backend=StubBackend(quotes), quote_ttl=60)
+    service._quotes.max_entries = 3
+
+    with patch("src.api.market_data.time.monotonic", return_value=1000.0):
+        await service.get_many(["T0", "T1"])
+    with patch("src.api.market_data.time.monotonic", return_value=1100.0):
+        # T0 and T1 have expired; reading one drops it, the sweep drops the other
+        assert service._quotes.get("T0") is None
+        await service.get_many(["T2", "T3", "T4"])
+        assert service._quotes.keys() == ["T2", "T3", "T4"]
+        await service.get("T0")
+        assert service._quotes.keys() == ["T3", "T4", "T0"]
@@ -47,3 +47,4 @@ def test_retrieve_for_chat_uses_similarity_search(mock_embedder):
     mock_collection.query.assert_called_once()
     assert len(results) == 1
     assert results[0]["text"] == "Trial NCT123 Phase 3"
+
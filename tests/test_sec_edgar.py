@@ -1,7 +1,15 @@
 # tests/test_sec_edgar.py
+import asyncio
+import json
+
+import httpx
 import pytest
 from unittest.mock import patch, AsyncMock, MagicMock
-from src.api.sec_edgar import SECEdgarClient
+from src.api import sec_edgar
+from src.api.http_cache import CacheTransport, HTTPCache
+from src.api.market_data import MarketDataBackend, MarketDataService
+from src.api.sec_edgar import TICKER_INDEX_MAX_AGE, SECEdgarClient
+from src.api.ticker_index import TickerIndex
 
 
 SAMPLE_TICKERS = {
@@ -108,7 +116,6 @@ async def test_lookup_company_not_found():
 @pytest.mark.asyncio
 async def test_get_filings_filters_and_parses():
     client = SECEdgarClient()
-    client._tickers_cache = SAMPLE_TICKERS
     mock_response = AsyncMock()
     mock_response.json = MagicMock(return_value=SAMPLE_SUBMISSIONS)
     mock_response.raise_for_status = MagicMock()
@@ -119,19 +126,22 @@ async def test_get_filings_filters_and_parses():
     # Should exclude form "4", keep 10-K, 10-Q, 8-K
     assert len(filings) == 3
     assert all(f["form_type"] in ("10-K", "10-Q", "8-K") for f in filings)
-    assert filings[0]["filing_date"] == "2024-02-22"
+    # Newest first
+    assert [f["filing_date"] for f in filings] == ["2024-08-01", "2024-06-15", "2024-02-22"]
     assert "sec.gov" in filings[0]["filing_url"]
 
 
+def _serving(payload):
+    """HTTP client answering every request with ``payload``; companyfacts is read as a stream."""
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json=payload)))
+
+
 @pytest.mark.asyncio
 async def test_get_company_facts_extracts_latest():
     client = SECEdgarClient()
-    mock_response = AsyncMock()
-    mock_response.json = MagicMock(return_value=SAMPLE_COMPANY_FACTS)
-    mock_response.raise_for_status = MagicMock()
+    client._client = _serving(SAMPLE_COMPANY_FACTS)
 
-    with patch.object(client._client, "get", return_value=mock_response):
-        facts = await client.get_company_facts("0001682852")
+    facts = await client.get_company_facts("0001682852")
 
     assert facts["company_name"] == "Moderna, Inc."
     assert facts["revenue"]["value"] == 6671000000
@@ -140,14 +150,95 @@ async def test_get_company_facts_extracts_latest():
     assert facts["total_assets"]["value"] == 18100000000
 
 
+@pytest.mark.asyncio
+async def test_company_facts_are_streamed_past_the_http_cache(tmp_path, monkeypatch):
+    body = json.dumps(SAMPLE_COMPANY_FACTS).encode()
+    pieces = [body[i:i + 64] for i in range(0, len(body), 64)]
+    pulled = []
+
+    class Body(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for piece in pieces:
+                pulled.append(piece)
+                yield piece
+
+    pulled_when_read = []
+    read_company_facts = sec_edgar.read_company_facts
+
+    async def recording_read(response):
+        pulled_when_read.append(len(pulled))
+        return await read_company_facts(response)
+
+    monkeypatch.setattr(sec_edgar, "read_company_facts", recording_read)
+    cache = HTTPCache(str(tmp_path / "http_cache.db"))
+    client = SECEdgarClient(http_cache=cache)
+    client._client = httpx.AsyncClient(transport=CacheTransport(
+        httpx.MockTransport(lambda request: httpx.Response(200, stream=Body())), cache,
+    ))
+
+    facts = await client.get_company_facts("0001682852")
+
+    assert facts["revenue"]["value"] == 6671000000
+    # The scanner started before any of the body was read, and nothing was stored whole
+    assert pulled_when_read == [0]
+    assert len(pulled) == len(pieces)
+    assert cache.total_bytes() == 0
+    cache.close()
+
+
 @pytest.mark.asyncio
 async def test_get_market_data_returns_none_on_failure():
-    client = SECEdgarClient()
-    with patch.object(client, "_fetch_yfinance", return_value=None):
-        result = await client.get_market_data("INVALID")
+    class FailingBackend(MarketDataBackend):
+        def fetch_quotes(self, tickers):
+            raise RuntimeError("upstream down")
+
+        def fetch_fundamentals(self, tickers):
+            return {}
+
+    client = SECEdgarClient(market_data=MarketDataService(backend=FailingBackend()))
+    result = await client.get_market_data("INVALID")
     assert result is None
 
 
+@pytest.mark.asyncio
+async def test_get_filings_loads_overflow_pages_only_when_needed():
+    submissions = {
+        "name": "Moderna, Inc.",
+        "filings": {
+            "recent": SAMPLE_SUBMISSIONS["filings"]["recent"],
+            "files": [{"name": "CIK0001682852-submissions-001.json",
+                       "filingFrom": "2018-01-01", "filingTo": "2023-12-31"}],
+        },
+    }
+    overflow = {
+        "form": ["10-K", "8-K"],
+        "filingDate": ["2023-02-24", "2019-03-01"],
+        "accessionNumber": ["0001682852-23-000005", "0001682852-19-000001"],
+        "primaryDocument": ["mrna-20221231.htm", "mrna-8k-2019.htm"],
+    }
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.path)
+        return httpx.Response(200, json=overflow if "submissions-001" in request.url.path else submissions)
+
+    client = SECEdgarClient()
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    recent_8ks = await client.get_filings("1682852", ["8-K"], since="2024-03-01")
+    assert [f["filing_date"] for f in recent_8ks] == ["2024-06-15"]
+    assert len(requested) == 1
+
+    ten_ks = await client.get_filings("1682852", ["10-K"], limit=2)
+    assert [f["filing_date"] for f in ten_ks] == ["2024-02-22", "2023-02-24"]
+    assert requested[-1].endswith("CIK0001682852-submissions-001.json")
+    assert len(requested) == 2
+
+    # Everything is loaded and parsed once; later queries make no requests
+    assert len(await client.get_filings("1682852", limit=None)) == 5
+    assert len(requested) == 2
+
+
 @pytest.mark.asyncio
 async def test_get_filings_mismatched_arrays():
     """SEC returns arrays of different lengths — should not crash."""
@@ -193,17 +284,124 @@ async def test_get_filings_empty_recent():
     assert filings == []
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit", [0, -1])
+async def test_get_filings_non_positive_limit_returns_nothing(limit):
+    client = SECEdgarClient()
+
+    with patch.object(client._client, "get") as mock_get:
+        # With no matching filings this used to raise IndexError on matches[limit - 1]
+        assert await client.get_filings("0001682852", filing_types=["20-F"], limit=limit) == []
+    mock_get.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_get_company_facts_empty_gaap():
     """Company with no us-gaap data should return only company_name."""
     client = SECEdgarClient()
     data = {"entityName": "New Startup Inc.", "facts": {}}
-    mock_response = AsyncMock()
-    mock_response.json = MagicMock(return_value=data)
-    mock_response.raise_for_status = MagicMock()
+    client._client = _serving(data)
 
-    with patch.object(client._client, "get", return_value=mock_response):
-        facts = await client.get_company_facts("0000000001")
+    facts = await client.get_company_facts("0000000001")
 
     assert facts["company_name"] == "New Startup Inc."
     assert "revenue" not in facts
+
+
+@pytest.mark.asyncio
+async def test_lookup_company_persists_ticker_index(tmp_path):
+    path = str(tmp_path / "ticker_index.json.gz")
+    client = SECEdgarClient(ticker_index_path=path)
+    mock_response = AsyncMock()
+    mock_response.json = MagicMock(return_value=SAMPLE_TICKERS)
+    mock_response.raise_for_status = MagicMock()
+
+    with patch.object(client._client, "get", return_value=mock_response) as mock_get:
+        assert (await client.lookup_company("Moderna"))["ticker"] == "MRNA"
+    assert mock_get.call_count == 1
+
+    cold_start = SECEdgarClient(ticker_index_path=path)
+    with patch.object(cold_start._client, "get") as mock_get:
+        assert (await cold_start.lookup_company("Microsoft"))["ticker"] == "MSFT"
+    mock_get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stale_ticker_index_is_served_while_refreshing(tmp_path):
+    path = str(tmp_path / "ticker_index.json.gz")
+    TickerIndex.from_sec_json(SAMPLE_TICKERS).save(path)
+    stale = TickerIndex.load(path)
+    stale.created_at -= TICKER_INDEX_MAX_AGE + 1
+    stale.save(path)
+
+    refreshed = {**SAMPLE_TICKERS, "2": {"cik_str": "78003", "ticker": "PFE", "title": "PFIZER INC"}}
+    client = SECEdgarClient(ticker_index_path=path)
+    client._client = _serving(refreshed)
+
+    assert (await client.lookup_company("Moderna"))["ticker"] == "MRNA"
+    assert await client.lookup_company("Pfizer") is None
+    await client._ticker_refresh
+
+    assert (await client.lookup_company("Pfizer"))["ticker"] == "PFE"
+    assert not TickerIndex.load(path).is_stale(TICKER_INDEX_MAX_AGE)
+
+
+@pytest.mark.asyncio
+async def test_warm_up_logs_a_malformed_ticker_download(caplog):
+    client = SECEdgarClient()
+    client._client = _serving(["not", "a", "ticker", "mapping"])
+
+    await client.warm_ticker_index()
+
+    assert "Ticker index warm-up failed" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cold_lookups_share_one_download():
+    client = SECEdgarClient()
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=SAMPLE_TICKERS)
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    results = await asyncio.gather(*(client.lookup_company(q) for q in ("MRNA", "MSFT", "Moderna")))
+
+    assert [r["ticker"] for r in results] == ["MRNA", "MSFT", "MRNA"]
+    assert len(requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_company_facts_concept_mode_falls_back_through_names():
+    client = SECEdgarClient(facts_mode="concept")
+    concepts = {
+        "SalesRevenueNet": {"units": {"USD": [{"val": 6671000000, "end": "2023-12-31", "form": "10-K"}]}},
+        "NetIncomeLoss": SAMPLE_COMPANY_FACTS["facts"]["us-gaap"]["NetIncomeLoss"],
+        "ProfitLoss": {"units": {"USD": [{"val": 1, "end": "2023-12-31", "form": "10-K"}]}},
+    }
+    requested = []
+
+    def handler(request):
+        concept = request.url.path.rsplit("/", 1)[-1].removesuffix(".json")
+        requested.append(concept)
+        if concept not in concepts:
+            return httpx.Response(404, json={})
+        return httpx.Response(200, json={"entityName": "Moderna, Inc.", **concepts[concept]})
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    facts = await client.get_company_facts("1682852")
+
+    assert facts["company_name"] == "Moderna, Inc."
+    assert facts["revenue"]["value"] == 6671000000
+    assert facts["net_income"]["value"] == -4714000000
+    assert "total_assets" not in facts
+    assert "ProfitLoss" not in requested
+    assert requested.index("Revenues") < requested.index("SalesRevenueNet")
+    assert "RevenueFromContractWithCustomerIncludingAssessedTax" not in requested
+
+
+def test_invalid_facts_mode_rejected():
+    with pytest.raises(ValueError):
+        SECEdgarClient(facts_mode="everything")
@@ -0,0 +1,48 @@
+import json
+
+from src.api.ticker_index import TickerIndex
+
+SEC_TICKERS = {
+    "0": {"cik_str": 78003, "ticker": "PFE", "title": "PFIZER INC"},
+    "1": {"cik_str": 1682852, "ticker": "MRNA", "title": "MODERNA INC"},
+    "2": {"cik_str": 310158, "ticker": "MRK", "title": "Merck & Co., Inc."},
+    "3": {"cik_str": 1800, "ticker": "ABT", "title": "ABBOTT LABORATORIES"},
+    "4": {"cik_str": 1551152, "ticker": "ABBV", "title": "AbbVie Inc."},
+    "5": {"cik_str": 1999999, "ticker": "PFZB", "title": "Pfizer Biopharma Holdings Group"},
+    "6": {"cik_str": 872589, "ticker": "REGN", "title": "REGENERON PHARMACEUTICALS, INC."},
+}
+
+
+def test_exact_ticker_and_normalized_name():
+    index = TickerIndex.from_sec_json(SEC_TICKERS)
+    assert index.lookup("pfe") == {"cik": "0000078003", "ticker": "PFE", "name": "PFIZER INC"}
+    assert index.lookup("Pfizer")["ticker"] == "PFE"
+    assert index.lookup("Merck & Co")["ticker"] == "MRK"
+    assert index.lookup("abbvie, inc")["ticker"] == "ABBV"
+
+
+def test_ranked_token_and_fuzzy_matches():
+    index = TickerIndex.from_sec_json(SEC_TICKERS)
+    assert index.lookup("Regeneron")["ticker"] == "REGN"
+    assert index.lookup("Pfizer Biopharma")["ticker"] == "PFZB"
+    assert index.lookup("Abbot Labs")["ticker"] == "ABT"
+    assert index.lookup("Regeneraon")["ticker"] == "REGN"
+    assert index.lookup("NonexistentCorp") is None
+    assert index.lookup("  ") is None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "ticker_index.json")
+    index = TickerIndex.from_sec_json(SEC_TICKERS)
+    index.save(path)
+
+    loaded = TickerIndex.load(path)
+    assert len(loaded) == len(index)
+    assert loaded.lookup("Moderna")["ticker"] == "MRNA"
+    assert loaded.lookup("Regeneron")["cik"] == "0000872589"
+    assert TickerIndex.load(path, max_age=-1) is None
+
+    with open(path, "w") as f:
+        json.dump({"version": 0}, f)
+    assert TickerIndex.load(path) is None
+    assert TickerIndex.load(str(tmp_path / "missing.json")) is None
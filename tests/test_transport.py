@@ -0,0 +1,120 @@
+import httpx
+import pytest
+
+from src.api.transport import RateLimiter, RetryingTransport, TokenBucket, _retry_after_seconds
+
+
+def _client(handler, limiter=None, max_retries=3):
+    transport = RetryingTransport(
+        httpx.MockTransport(handler), limiter=limiter or RateLimiter(limits={}, default=(1000.0, 1000)),
+        max_retries=max_retries, backoff_base=0.0,
+    )
+    return httpx.AsyncClient(transport=transport)
+
+
+def test_token_bucket_reserves_wait_once_burst_is_spent():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_rate_limiter_shares_bucket_across_host_suffix():
+    limiter = RateLimiter(limits={"sec.gov": (10.0, 10)})
+    assert limiter.bucket_for("www.sec.gov") is limiter.bucket_for("data.sec.gov")
+    assert limiter.bucket_for("api.fda.gov") is not limiter.bucket_for("www.sec.gov")
+
+
+def test_retry_after_parses_seconds_and_missing_header():
+    assert _retry_after_seconds(httpx.Response(429, headers={"Retry-After": "3"})) == 3.0
+    assert _retry_after_seconds(httpx.Response(429)) is None
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_statuses_then_succeeds():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        if len(calls) == 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"ok": True})
+
+    limiter = RateLimiter(limits={}, default=(1000.0, 1000))
+    async with _client(handler, limiter) as client:
+        response = await client.get("https://api.fda.gov/drug/label.json")
+
+    assert response.json() == {"ok": True}
+    assert len(calls) == 3
+    metrics = limiter.metrics.snapshot()["api.fda.gov"]
+    assert metrics["requests"] == 3
+    assert metrics["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries_and_returns_last_response():
+    limiter = RateLimiter(limits={}, default=(1000.0, 1000))
+    async with _client(lambda request: httpx.Response(502), limiter, max_retries=2) as client:
+        response = await client.get("https://data.sec.gov/submissions/CIK0000000001.json")
+
+    assert response.status_code == 502
+    metrics = limiter.metrics.snapshot()["data.sec.gov"]
+    assert metrics["retries"] == 2
+    assert metrics["gave_up"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_transport_errors_and_skips_non_idempotent_methods():
+    attempts = {"GET": 0, "POST": 0}
+
+    def handler(request):
+        attempts[request.method] += 1
+        if attempts[request.method] == 1:
+            raise httpx.ConnectError("connection reset")
+        return httpx.Response(200)
+
+    async with _client(handler) as client:
+        assert (await client.get("https://clinicaltrials.gov/api/v2/studies")).status_code == 200
+        with pytest.raises(httpx.ConnectError):
+            await client.post("https://clinicaltrials.gov/api/v2/studies")
+
+    assert attempts == {"GET": 2, "POST": 1}
+
+
+@pytest.mark.asyncio
+async def test_throttle_waits_are_recorded():
+    limiter = RateLimiter(limits={}, default=(100.0, 1))
+    async with _client(lambda request: httpx.Response(200), limiter) as client:
+        for _ in range(3):
+            await client.get("https://api.fda.gov/drug/event.json")
+
+    metrics = limiter.metrics.snapshot()["api.fda.gov"]
+    assert metrics["throttled"] == 2
+    assert metrics["throttle_wait_seconds"] > 0
+
+
+def test_shared_pool_is_per_loop_and_survives_client_close():
+    import asyncio
+    from src.api.transport import SharedPoolTransport
+
+    shared = SharedPoolTransport(http2=False)
+
+    async def use_pool():
+        async with httpx.AsyncClient(transport=shared):
+            pass  # closing the client must not close the shared pool
+        first, second = shared.pool(), shared.pool()
+        assert first is second
+        return first
+
+    loop = asyncio.new_event_loop()
+    try:
+        pool = loop.run_until_complete(use_pool())
+        assert loop.run_until_complete(use_pool()) is pool
+        assert asyncio.run(use_pool()) is not pool
+        loop.run_until_complete(shared.close_pool())
+        assert loop.run_until_complete(use_pool()) is not pool
+    finally:
+        loop.close()
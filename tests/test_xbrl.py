@@ -0,0 +1,131 @@
+import json
+
+import httpx
+import pytest
+
+from src.api.xbrl import (
+    ConceptScanner, ConceptSeries, extract_facts, read_company_facts, trailing_twelve_months,
+)
+
+COMPANY_FACTS = {
+    "cik": 1682852,
+    "entityName": "Moderna, \"Inc.\"",
+    "facts": {
+        "dei": {"EntityCommonStockSharesOutstanding": {"units": {"shares": [{"val": 1, "end": "2024-01-01"}]}}},
+        "us-gaap": {
+            "AccountsPayableCurrent": {
+                "label": 'Tricky "Revenues": {label} \\ with braces',
+                "units": {"USD": [{"val": 5, "end": "2023-12-31", "form": "10-K"}]},
+            },
+            "Revenues": {"label": "Revenues {total}", "units": {"USD": [
+                {"val": 100, "end": "2022-12-31", "form": "10-K"},
+                {"val": 300, "end": "2023-12-31", "form": "10-K"},
+                {"val": 90, "end": "2024-03-31", "form": "10-Q"},
+            ]}},
+            "EarningsPerShareDiluted": {"units": {"USD/shares": [{"val": -12.5, "end": "2023-12-31", "form": "10-K"}]}},
+        },
+        "ifrs-full": {"Assets": {"units": {"USD": [{"val": 999, "end": "2023-12-31", "form": "20-F"}]}}},
+    },
+}
+EXPECTED = {name: COMPANY_FACTS["facts"]["us-gaap"][name] for name in ("Revenues", "EarningsPerShareDiluted")}
+
+
+def _scan(body: bytes, chunk_size: int):
+    scanner = ConceptScanner()
+    for i in range(0, len(body), chunk_size):
+        scanner.feed(body[i:i + chunk_size])
+    return scanner.finish()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_scanner_extracts_only_wanted_us_gaap_concepts(chunk_size, indent):
+    body = json.dumps(COMPANY_FACTS, indent=indent).encode()
+    company_name, concepts = _scan(body, chunk_size)
+
+    assert company_name == 'Moderna, "Inc."'
+    assert concepts == EXPECTED
+
+
+def test_scanner_rejects_truncated_document():
+    body = json.dumps(COMPANY_FACTS).encode()
+    cut = body.index(b'"EarningsPerShareDiluted"') + 40
+    with pytest.raises(ValueError):
+        _scan(body[:cut], 64)
+
+
+class _ChunkedStream(httpx.AsyncByteStream):
+    def __init__(self, body: bytes, size: int):
+        self._body = body
+        self._size = size
+
+    async def __aiter__(self):
+        for i in range(0, len(self._body), self._size):
+            yield self._body[i:i + self._size]
+
+
+@pytest.mark.asyncio
+async def test_read_company_facts_from_response_stream():
+    body = json.dumps(COMPANY_FACTS).encode()
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=_ChunkedStream(body, 16)))
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with client.stream("GET", "https://data.sec.gov/api/xbrl/companyfacts/CIK0001682852.json") as response:
+            company_name, us_gaap = await read_company_facts(response)
+
+    facts = extract_facts(company_name, us_gaap)
+    assert facts["revenue"] == {"value": 300, "period_end": "2023-12-31", "form": "10-K"}
+    assert facts["eps"]["value"] == -12.5
+    assert "total_assets" not in facts
+
+
+R_AND_D = {"units": {"USD": [
+    {"start": "2022-01-01", "end": "2022-12-31", "val": 400, "form": "10-K", "filed": "2023-02-20"},
+    {"start": "2022-01-01", "end": "2022-12-31", "val": 410, "form": "10-K", "filed": "2024-02-20"},
+    {"start": "2023-01-01", "end": "2023-12-31", "val": 480, "form": "10-K", "filed": "2024-02-20"},
+    {"start": "2024-01-01", "end": "2024-03-31", "val": 130, "form": "10-Q", "filed": "2024-05-01"},
+    {"start": "2023-01-01", "end": "2023-06-30", "val": 220, "form": "10-Q", "filed": "2023-08-01"},
+    {"start": "2024-01-01", "end": "2024-06-30", "val": 270, "form": "10-Q", "filed": "2024-08-01"},
+]}}
+
+
+def test_concept_series_dedupes_periods_keeping_latest_filing():
+    series = ConceptSeries.from_concept(R_AND_D)
+    annual = series.annual()
+
+    assert len(series) == 5
+    assert annual.value.tolist() == [410.0, 480.0]
+    assert series.quarterly().value.tolist() == [130.0]
+    assert series.year_to_date().value.tolist() == [220.0, 270.0]
+
+
+def test_trailing_twelve_months_rolls_annual_forward_with_ytd():
+    assert trailing_twelve_months(ConceptSeries.from_concept(R_AND_D)) == (530.0, "2024-06-30")
+
+    quarters = {"units": {"USD": [
+        {"start": s, "end": e, "val": v, "form": "10-Q", "filed": e}
+        for s, e, v in [("2023-04-01", "2023-06-30", 10), ("2023-07-01", "2023-09-30", 20),
+                        ("2023-10-01", "2023-12-31", 30), ("2024-01-01", "2024-03-31", 40)]
+    ]}}
+    assert trailing_twelve_months(ConceptSeries.from_concept(quarters)) == (100.0, "2024-03-31")
+
+
+def test_trend_metrics_growth_burn_and_runway():
+    us_gaap = {
+        "Revenues": {"units": {"USD": [
+            {"start": f"{y}-01-01", "end": f"{y}-12-31", "val": v, "form": "10-K", "filed": f"{y + 1}-02-20"}
+            for y, v in [(2021, 100), (2022, 150), (2023, 120)]
+        ]}},
+        "NetCashProvidedByUsedInOperatingActivities": {"units": {"USD": [
+            {"start": "2023-01-01", "end": "2023-12-31", "val": -800, "form": "10-K", "filed": "2024-02-20"},
+        ]}},
+        "CashAndCashEquivalentsAtCarryingValue": {"units": {"USD": [
+            {"end": "2023-12-31", "val": 1000, "form": "10-K", "filed": "2024-02-20"},
+            {"end": "2024-03-31", "val": 900, "form": "10-Q", "filed": "2024-05-01"},
+        ]}},
+    }
+    trends = extract_facts("Burner Bio", us_gaap)["trends"]
+
+    assert [p["yoy_growth"] for p in trends["revenue_history"]] == [None, 0.5, -0.2]
+    assert trends["quarterly_cash_burn"] == 200.0
+    assert trends["cash_runway_quarters"] == 4.5
+    assert trends["cash_as_of"] == "2024-03-31"